@@ -0,0 +1,197 @@
+"""
+Answer Cache for Frequent Questions
+
+Most traffic is the same few questions per grade and intent (often the
+suggestion chips verbatim). Answers generated from a generic prompt (no
+conversation history, no lead details) are cached per (grade, intent,
+language, normalized query) and replayed without an LLM call; their audio
+comes back from the TTS cache. Replies shaped by one lead's conversation
+or contact details are never stored.
+
+Near-duplicates ("what are the fees" / "what are fees?") can match by
+character-trigram similarity. Entries expire after a TTL and are dropped
+whenever the grade/course knowledge is reloaded.
+"""
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from .grade_context import normalize_grade, on_context_invalidated
+from .suggestions import get_all_starter_texts, CONTEXTUAL_SUGGESTIONS
+
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() != "false"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_TTL_HOURS = float(os.getenv("ANSWER_CACHE_TTL_HOURS", "24"))
+# Minimum trigram similarity for a fuzzy hit (0 = exact matches only)
+ANSWER_CACHE_FUZZY_THRESHOLD = float(os.getenv("ANSWER_CACHE_FUZZY_THRESHOLD", "0.8"))
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = re.sub(r"[^\w\s]", " ", text.lower(), flags=re.UNICODE)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two trigram sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+_DEVANAGARI = re.compile(r"[\u0900-\u097F]")
+
+
+def answer_language(query: str, detected: Optional[str] = None, last_reply: str = "") -> str:
+    """Language the reply will be in: the query's script, else the session's, else the last reply's"""
+    if _DEVANAGARI.search(query):
+        return "hi"
+    if detected:
+        return detected
+    return "hi" if _DEVANAGARI.search(last_reply) else "en"
+
+
+# Suggestion chips that ask a standalone question vs ones that refer to the previous answer
+_STARTERS = {normalize_query(t) for t in get_all_starter_texts()}
+_CONTEXTUAL = {normalize_query(s["text"]) for s in CONTEXTUAL_SUGGESTIONS}
+
+
+@dataclass
+class CachedAnswer:
+    text: str
+    grams: FrozenSet[str]
+    # True for suggestion-chip questions (safe to replay mid-conversation)
+    starter: bool
+    created: float
+    hits: int = 0
+
+
+class AnswerCache:
+    """LRU of answers keyed by (normalized grade, intent, language, normalized query)"""
+
+    def __init__(self, max_entries: int, ttl: float, fuzzy_threshold: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fuzzy_threshold = fuzzy_threshold
+        self._entries: "OrderedDict[Tuple[str, str, str, str], CachedAnswer]" = OrderedDict()
+        # (grade, intent, language) -> normalized queries, for fuzzy lookups within a bucket
+        self._buckets: Dict[Tuple[str, str, str], set] = {}
+
+        # Metrics
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def cacheable(query: str, generic: bool) -> bool:
+        """Only answers generated without history or lead details, to questions that stand alone"""
+        normalized = normalize_query(query)
+        return generic and bool(normalized) and normalized not in _CONTEXTUAL
+
+    def lookup(self, grade: str, intent: str, language: str, query: str, first_turn: bool) -> Optional[str]:
+        """Cached answer text for the query, or None"""
+        normalized = normalize_query(query)
+        if not normalized or normalized in _CONTEXTUAL:
+            return None
+        grade = normalize_grade(grade)
+        key = (grade, intent, language, normalized)
+        entry = self._live(key)
+        if entry and (entry.starter or first_turn):
+            self.exact_hits += 1
+            return self._hit(key, entry)
+
+        if self.fuzzy_threshold > 0:
+            grams = trigrams(normalized)
+            best_key, best_score = None, self.fuzzy_threshold
+            for candidate in list(self._buckets.get((grade, intent, language), ())):
+                other = self._live((grade, intent, language, candidate))
+                if not other or not (other.starter or first_turn):
+                    continue
+                score = similarity(grams, other.grams)
+                if score >= best_score:
+                    best_key, best_score = (grade, intent, language, candidate), score
+            if best_key:
+                self.fuzzy_hits += 1
+                return self._hit(best_key, self._entries[best_key])
+
+        self.misses += 1
+        return None
+
+    def contains(self, grade: str, intent: str, language: str, query: str) -> bool:
+        """Exact live entry present (no hit/miss accounting)"""
+        return self._live((normalize_grade(grade), intent, language, normalize_query(query))) is not None
+
+    def store(self, grade: str, intent: str, language: str, query: str, answer: str, generic: bool):
+        if not answer or not self.cacheable(query, generic):
+            return
+        grade = normalize_grade(grade)
+        normalized = normalize_query(query)
+        key = (grade, intent, language, normalized)
+        self._drop(key)
+        self._entries[key] = CachedAnswer(
+            text=answer,
+            grams=trigrams(normalized),
+            starter=normalized in _STARTERS,
+            created=time.monotonic(),
+        )
+        self._buckets.setdefault((grade, intent, language), set()).add(normalized)
+        self.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+
+    def _hit(self, key, entry: CachedAnswer) -> str:
+        entry.hits += 1
+        self._entries.move_to_end(key)
+        return entry.text
+
+    def _live(self, key) -> Optional[CachedAnswer]:
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry.created > self.ttl:
+            self._drop(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _drop(self, key):
+        if self._entries.pop(key, None) is not None:
+            bucket = self._buckets.get(key[:3])
+            if bucket:
+                bucket.discard(key[3])
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.fuzzy_hits + self.misses
+        return {
+            "enabled": ANSWER_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round((self.exact_hits + self.fuzzy_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+answer_cache = AnswerCache(ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_HOURS * 3600, ANSWER_CACHE_FUZZY_THRESHOLD)
+
+# Answers were generated from the old grade/course files
+on_context_invalidated(answer_cache.clear)
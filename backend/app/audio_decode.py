@@ -0,0 +1,97 @@
+"""
+In-memory Audio Decoding for STT
+
+Turns uploaded/streamed audio bytes into 16 kHz mono samples without temp
+files or a shell. Order of attempts:
+1. WAV (PCM16) parsed directly with the stdlib `wave` module
+2. PyAV (bundled with faster-whisper) for webm/ogg/mp3/m4a
+3. ffmpeg over stdin/stdout pipes, only for exotic containers
+"""
+import io
+import wave
+import subprocess
+from typing import Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# Magic bytes -> (filename, mime) for providers that need a file name
+_FORMATS = [
+    (b"RIFF", ("audio.wav", "audio/wav")),
+    (b"\x1a\x45\xdf\xa3", ("audio.webm", "audio/webm")),
+    (b"OggS", ("audio.ogg", "audio/ogg")),
+    (b"ID3", ("audio.mp3", "audio/mpeg")),
+    (b"fLaC", ("audio.flac", "audio/flac")),
+]
+
+
+def guess_audio_format(data: bytes) -> Tuple[str, str]:
+    """Guess (filename, mime type) from the container's magic bytes"""
+    for magic, fmt in _FORMATS:
+        if data.startswith(magic):
+            return fmt
+    if data[4:8] == b"ftyp":
+        return ("audio.m4a", "audio/mp4")
+    if data[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return ("audio.mp3", "audio/mpeg")
+    # Browsers record webm by default
+    return ("audio.webm", "audio/webm")
+
+
+def pcm16_to_float32(pcm: np.ndarray) -> np.ndarray:
+    """Scale int16 samples to float32 in [-1, 1] (what faster-whisper expects)"""
+    return pcm.astype(np.float32) / 32768.0
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Linear-interpolation resample (adequate for speech recognition)"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    duration = len(samples) / src_rate
+    dst_len = int(round(duration * dst_rate))
+    src_x = np.arange(len(samples), dtype=np.float64) / src_rate
+    dst_x = np.arange(dst_len, dtype=np.float64) / dst_rate
+    return np.interp(dst_x, src_x, samples).astype(samples.dtype)
+
+
+def _decode_wav(data: bytes) -> np.ndarray:
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"unsupported WAV sample width: {wav.getsampwidth()}")
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    pcm = np.frombuffer(frames, dtype="<i2")
+    samples = pcm16_to_float32(pcm)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return resample(samples, rate)
+
+
+def _decode_pyav(data: bytes) -> np.ndarray:
+    from faster_whisper.audio import decode_audio
+    return decode_audio(io.BytesIO(data), sampling_rate=SAMPLE_RATE)
+
+
+def _decode_ffmpeg(data: bytes) -> np.ndarray:
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+    ]
+    proc = subprocess.run(cmd, input=data, capture_output=True, check=True)
+    return pcm16_to_float32(np.frombuffer(proc.stdout, dtype="<i2"))
+
+
+def decode_audio_bytes(data: bytes) -> np.ndarray:
+    """Decode any supported container to float32 mono 16 kHz samples"""
+    if data.startswith(b"RIFF"):
+        try:
+            return _decode_wav(data)
+        except (wave.Error, ValueError, EOFError):
+            pass  # Non-PCM16 WAV, let the general decoders handle it
+    try:
+        return _decode_pyav(data)
+    except Exception as e:
+        print(f"[AUDIO] In-process decode failed ({e}), falling back to ffmpeg")
+    return _decode_ffmpeg(data)
@@ -0,0 +1,52 @@
+"""
+Binary Audio Frames for /ws/realtime
+
+Besides base64-in-JSON messages, the realtime socket accepts binary frames
+carrying raw PCM16 (24 kHz mono) behind a 4-byte header:
+
+    byte 0     frame kind (FRAME_AUDIO)
+    byte 1     flags (FLAG_COMMIT: end of utterance, commit the input buffer)
+    bytes 2-3  sequence number, uint16 big-endian (wraps)
+
+Clients opt in to binary frames for reply audio with ?audio=binary; the
+default stays {"type": "audio", "audio": <base64>} for existing clients.
+"""
+import re
+import struct
+from typing import Tuple
+
+
+FRAME_HEADER = struct.Struct("!BBH")
+FRAME_AUDIO = 0x01
+
+FLAG_COMMIT = 0x01
+
+_BASE64 = re.compile(r"[A-Za-z0-9+/]*={0,2}")
+
+
+class FrameError(ValueError):
+    """Malformed binary frame"""
+
+
+def pack_frame(payload: bytes, seq: int, kind: int = FRAME_AUDIO, flags: int = 0) -> bytes:
+    return FRAME_HEADER.pack(kind, flags, seq & 0xFFFF) + payload
+
+
+def parse_frame(data: bytes) -> Tuple[int, int, int, memoryview]:
+    """(kind, flags, seq, payload) of a binary frame; the payload is not copied"""
+    if len(data) < FRAME_HEADER.size:
+        raise FrameError(f"frame too short ({len(data)} bytes)")
+    kind, flags, seq = FRAME_HEADER.unpack_from(data)
+    if kind != FRAME_AUDIO:
+        raise FrameError(f"unknown frame kind {kind}")
+    return kind, flags, seq, memoryview(data)[FRAME_HEADER.size:]
+
+
+def b64_decoded_len(audio_b64: str) -> int:
+    """Byte length of base64 data without decoding it"""
+    return len(audio_b64) * 3 // 4 - audio_b64.count("=", -2)
+
+
+def is_base64(audio_b64: str) -> bool:
+    """Standard base64 alphabet only (safe to splice into JSON unescaped)"""
+    return len(audio_b64) % 4 == 0 and _BASE64.fullmatch(audio_b64) is not None
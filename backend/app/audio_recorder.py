@@ -0,0 +1,94 @@
+"""
+Streaming WAV Recorder for Realtime Replies
+
+Writes the assistant's PCM16 reply audio to a .wav file as it streams, so
+realtime turns get an audio_file like chained ones. Chunks are collected
+in a small bytearray and appended to disk (in a worker thread) whenever it
+passes RECORD_FLUSH_BYTES: constant cost per chunk, bounded memory however
+long the reply runs. The RIFF header is patched when the file is finished,
+optionally cut to the part of the reply the user actually heard.
+"""
+import os
+import struct
+import asyncio
+from typing import Optional
+
+
+REALTIME_RECORD_AUDIO = os.getenv("REALTIME_RECORD_AUDIO", "true").lower() != "false"
+RECORD_FLUSH_BYTES = 64 * 1024
+
+WAV_HEADER_BYTES = 44
+
+
+def wav_header(data_bytes: int, sample_rate: int = 24000, channels: int = 1, sample_width: int = 2) -> bytes:
+    """Canonical 44-byte PCM WAV header"""
+    byte_rate = sample_rate * channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8,
+        b"data", data_bytes,
+    )
+
+
+class WavRecorder:
+    """Append-only PCM16 mono WAV writer fed chunk by chunk"""
+
+    def __init__(self, path: str, sample_rate: int = 24000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._file = None
+        self._pending = bytearray()
+        self.bytes_written = 0
+
+    def _open(self):
+        self._file = open(self.path, "wb")
+        # Sizes are patched on finish
+        self._file.write(wav_header(0, self.sample_rate))
+
+    def _write(self, data: bytes):
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+
+    async def add(self, chunk: bytes):
+        self._pending += chunk
+        self.bytes_written += len(chunk)
+        if len(self._pending) >= RECORD_FLUSH_BYTES:
+            data, self._pending = bytes(self._pending), bytearray()
+            await asyncio.to_thread(self._write, data)
+
+    def _finish(self, data: bytes, max_bytes: Optional[int]) -> Optional[str]:
+        self._write(data)
+        size = self.bytes_written if max_bytes is None else min(self.bytes_written, max_bytes)
+        size -= size % 2  # whole samples
+        self._file.truncate(WAV_HEADER_BYTES + size)
+        self._file.seek(0)
+        self._file.write(wav_header(size, self.sample_rate))
+        self._file.close()
+        if size == 0:
+            os.remove(self.path)
+            return None
+        return self.path
+
+    async def finish(self, max_bytes: Optional[int] = None) -> Optional[str]:
+        """Flush, cut to max_bytes of audio and close; returns the path (None if empty)"""
+        data, self._pending = bytes(self._pending), bytearray()
+        try:
+            return await asyncio.to_thread(self._finish, data, max_bytes)
+        except Exception as e:
+            print(f"[RECORDER] Error finishing {self.path}: {e}")
+            return None
+
+    def _discard(self):
+        if self._file is not None:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def discard(self):
+        self._pending = bytearray()
+        try:
+            await asyncio.to_thread(self._discard)
+        except OSError as e:
+            print(f"[RECORDER] Error discarding {self.path}: {e}")
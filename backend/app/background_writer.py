@@ -0,0 +1,216 @@
+"""
+Background Persistence / Notification Worker
+
+Jobs (session writes, lead saves, lead emails) go on bounded queues and are
+handed to registered batch handlers in worker threads. Request handlers
+only enqueue, so their latency no longer depends on disk or SMTP speed.
+
+Each job kind has a handler taking a list of payloads, which lets handlers
+coalesce a batch into one database transaction or one SMTP session. Kinds
+are grouped into lanes: every lane has its own queue, consumer task and
+lock, so handlers in one lane never run concurrently (they share a SQLite
+or SMTP connection) while a stalled SMTP send never holds up a database
+write in another lane.
+"""
+import os
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+WRITER_QUEUE_SIZE = int(os.getenv("WRITER_QUEUE_SIZE", "1000"))
+WRITER_BATCH_SIZE = int(os.getenv("WRITER_BATCH_SIZE", "200"))
+WRITER_BATCH_WINDOW_MS = float(os.getenv("WRITER_BATCH_WINDOW_MS", "50"))
+
+# Queued by stop(): the worker flushes what it has and exits
+_STOP = object()
+
+DEFAULT_LANE = "default"
+
+
+class _Lane:
+    """One queue + consumer task; its lock serializes the lane's handlers"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        # Held around handler and closer calls from the worker and inline threads
+        self.lock = threading.Lock()
+        self.max_depth = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+
+class BackgroundWriter:
+    """Bounded queues + one consumer per lane, flushing jobs in batches"""
+
+    def __init__(self, max_queue: int, batch_size: int, batch_window: float):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._handlers: Dict[str, Callable[[List[Any]], Any]] = {}
+        self._lanes: Dict[str, _Lane] = {}
+        self._lane_of: Dict[str, str] = {}
+        self._closers: List[Tuple[_Lane, Callable[[], Any]]] = []
+        self._started = False
+        self._stopping = False
+
+        # Metrics
+        self.enqueued = 0
+        self.processed = 0
+        self.batches = 0
+        self.errors = 0
+        self.inline = 0
+        self.blocked = 0
+
+    def register(
+        self,
+        kind: str,
+        handler: Callable[[List[Any]], Any],
+        close: Optional[Callable[[], Any]] = None,
+        lane: str = DEFAULT_LANE,
+    ):
+        """Register a batch handler (runs in a thread on its lane) and optional shutdown hook"""
+        self._handlers[kind] = handler
+        self._lane_of[kind] = lane
+        target = self._lanes.setdefault(lane, _Lane(lane))
+        if close:
+            self._closers.append((target, close))
+
+    def _lane(self, kind: str) -> _Lane:
+        name = self._lane_of.get(kind, DEFAULT_LANE)
+        return self._lanes.setdefault(name, _Lane(name))
+
+    @property
+    def running(self) -> bool:
+        return self._started and not self._stopping and any(lane.alive for lane in self._lanes.values())
+
+    async def submit(self, kind: str, payload: Any):
+        """Enqueue a job (waiting while its queue is full); runs it in a thread if its worker is not running"""
+        lane = self._lane(kind)
+        if self._started and not self._stopping and lane.alive:
+            if lane.queue.full():
+                # Backpressure: the producer waits, job order is kept
+                self.blocked += 1
+            await lane.queue.put((kind, payload))
+            self.enqueued += 1
+            lane.max_depth = max(lane.max_depth, lane.queue.qsize())
+            return
+        self.inline += 1
+        await self.run_now(kind, payload)
+
+    async def run_now(self, kind: str, payload: Any):
+        """Run one job in a thread and wait for it (serialized with its lane's batches only)"""
+        await asyncio.to_thread(self._handle, kind, [payload])
+
+    async def start(self):
+        if self.running:
+            return
+        self._stopping = False
+        self._started = True
+        for lane in self._lanes.values():
+            lane.queue = asyncio.Queue(maxsize=self.max_queue)
+            lane.task = asyncio.create_task(self._run(lane))
+
+    async def stop(self):
+        """Flush whatever is queued, then close handler resources"""
+        if self._started:
+            # New jobs now run inline; each worker drains up to the sentinel and exits
+            self._stopping = True
+            lanes = [lane for lane in self._lanes.values() if lane.task]
+            for lane in lanes:
+                if not lane.task.done():
+                    await lane.queue.put(_STOP)
+            for lane in lanes:
+                try:
+                    await lane.task
+                except Exception as e:
+                    print(f"[WRITER] {lane.name} worker failed: {e}")
+                lane.task = None
+            self._started = False
+        for lane, close in self._closers:
+            try:
+                await asyncio.to_thread(self._close, lane, close)
+            except Exception as e:
+                print(f"[WRITER] Error closing handler: {e}")
+
+    async def _run(self, lane: _Lane):
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            job = await lane.queue.get()
+            if job is _STOP:
+                return
+            batch = [job]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(lane.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if job is _STOP:
+                    stop = True
+                    break
+                batch.append(job)
+            # Shielded: a cancelled worker still waits for the thread, so the
+            # batch is never lost or flushed alongside stop()'s closers
+            flush = asyncio.ensure_future(asyncio.to_thread(self._flush, batch))
+            try:
+                await asyncio.shield(flush)
+            except asyncio.CancelledError:
+                await flush
+                raise
+
+    @staticmethod
+    def _close(lane: _Lane, close: Callable[[], Any]):
+        with lane.lock:
+            close()
+
+    def _flush(self, batch: List[Tuple[str, Any]]):
+        """Group a batch by kind (keeping order within a kind) and run handlers"""
+        grouped: Dict[str, List[Any]] = {}
+        for kind, payload in batch:
+            grouped.setdefault(kind, []).append(payload)
+        for kind, payloads in grouped.items():
+            self._handle(kind, payloads)
+        self.batches += 1
+
+    def _handle(self, kind: str, payloads: List[Any]):
+        handler = self._handlers.get(kind)
+        if not handler:
+            print(f"[WRITER] No handler for {kind}, dropping {len(payloads)} jobs")
+            self.errors += len(payloads)
+            return
+        try:
+            with self._lane(kind).lock:
+                handler(payloads)
+            self.processed += len(payloads)
+        except Exception as e:
+            self.errors += len(payloads)
+            print(f"[WRITER] {kind} batch failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": sum(lane.queue.qsize() for lane in self._lanes.values() if lane.queue),
+            "queue_max": self.max_queue,
+            "max_depth": max((lane.max_depth for lane in self._lanes.values()), default=0),
+            "lanes": {
+                name: lane.queue.qsize() if lane.queue else 0 for name, lane in self._lanes.items()
+            },
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "inline": self.inline,
+            "blocked": self.blocked,
+        }
+
+
+background_writer = BackgroundWriter(WRITER_QUEUE_SIZE, WRITER_BATCH_SIZE, WRITER_BATCH_WINDOW_MS / 1000.0)
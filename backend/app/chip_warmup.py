@@ -0,0 +1,164 @@
+"""
+Suggestion Chip Warm-up
+
+Precomputes the answer (LLM) and its audio (TTS) for every conversation
+starter chip of every grade/course x intent, so a chip click on /ws is
+served from the answer cache and the TTS cache without waiting on either.
+
+Runs in the background with a concurrency limit, re-runs when the grade or
+course files change (context snapshot swapped) and periodically before cached
+answers expire. Off by default because it spends LLM/TTS credits
+(CHIP_WARMUP=true to enable).
+
+Contextual chips ("Tell me more", ...) depend on the previous answer and
+are not precomputed.
+"""
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from .answer_cache import answer_cache, answer_language
+from .grade_context import get_available_grades, get_available_courses, normalize_grade, on_context_invalidated
+from .session_manager import Session
+from .suggestions import get_conversation_starters, INTENT_STARTERS
+from .tts_pipeline import SentenceSplitter, clean_text_for_tts
+
+
+CHIP_WARMUP = os.getenv("CHIP_WARMUP", "false").lower() == "true"
+CHIP_WARMUP_CONCURRENCY = int(os.getenv("CHIP_WARMUP_CONCURRENCY", "2"))
+# Comma-separated grades/courses to warm (empty = all)
+CHIP_WARMUP_GRADES = [g.strip() for g in os.getenv("CHIP_WARMUP_GRADES", "").split(",") if g.strip()]
+# Re-run interval; keep below ANSWER_CACHE_TTL_HOURS so chips never go cold
+CHIP_WARMUP_INTERVAL_HOURS = float(os.getenv("CHIP_WARMUP_INTERVAL_HOURS", "12"))
+
+
+def chip_jobs() -> List[Tuple[str, str, str]]:
+    """Every (grade, intent, chip text) to precompute"""
+    grades = CHIP_WARMUP_GRADES or (get_available_grades() + get_available_courses())
+    jobs = []
+    for grade in map(normalize_grade, grades):
+        for intent in INTENT_STARTERS:
+            for chip in get_conversation_starters(grade, intent):
+                jobs.append((grade, intent, chip["text"]))
+    return list(dict.fromkeys(jobs))
+
+
+def tts_segments(text: str) -> List[str]:
+    """Split an answer exactly like the /ws TTS pipeline does"""
+    splitter = SentenceSplitter()
+    segments = splitter.feed(text)
+    rest = splitter.flush()
+    if rest:
+        segments.append(rest)
+    return [t for t in (clean_text_for_tts(s) for s in segments) if t]
+
+
+class ChipWarmer:
+    """
+    Background job filling the answer and TTS caches for suggestion chips.
+
+    answer(session, query) returns the LLM reply; synthesize(text) renders
+    one TTS segment (into the TTS cache).
+    """
+
+    def __init__(
+        self,
+        answer: Callable[[Session, str], Awaitable[str]],
+        synthesize: Callable[[str], Awaitable[Optional[str]]],
+        concurrency: int = CHIP_WARMUP_CONCURRENCY,
+        interval: float = CHIP_WARMUP_INTERVAL_HOURS * 3600,
+    ):
+        self._answer = answer
+        self._synthesize = synthesize
+        self._limit = asyncio.Semaphore(max(1, concurrency))
+        self.interval = interval
+        self._refresh: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.runs = 0
+        self.warmed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.last_run_seconds: Optional[float] = None
+
+        # Registered once; a no-op until start() sets the loop
+        on_context_invalidated(self.request_refresh)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._refresh = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def request_refresh(self):
+        """Re-warm soon (safe to call from any thread)"""
+        if self._loop and self._refresh and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._refresh.set)
+
+    async def _run(self):
+        while True:
+            self._refresh.clear()
+            await self.warm()
+            try:
+                await asyncio.wait_for(self._refresh.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def warm(self):
+        """Precompute every chip not already cached"""
+        started = time.perf_counter()
+        jobs = chip_jobs()
+        print(f"[WARMUP] Warming {len(jobs)} suggestion chips")
+        await asyncio.gather(*(self._warm_one(*job) for job in jobs))
+        self.runs += 1
+        self.last_run_seconds = round(time.perf_counter() - started, 1)
+        print(f"[WARMUP] Done in {self.last_run_seconds}s: {self.warmed} warmed, "
+              f"{self.skipped} already cached, {self.failed} failed")
+
+    async def _warm_one(self, grade: str, intent: str, chip: str):
+        language = answer_language(chip)
+        if answer_cache.contains(grade, intent, language, chip):
+            self.skipped += 1
+            return
+        async with self._limit:
+            # Anonymous session: no lead details or history in the prompt
+            session = Session(session_id="warmup", grade=grade, name="", email="", mobile="", intent=intent)
+            try:
+                # Provider errors (e.g. a missing API key) raise; never cache a placeholder
+                reply = (await self._answer(session, chip)).strip()
+                if not reply:
+                    raise ValueError("empty reply")
+                for segment in tts_segments(reply):
+                    await self._synthesize(segment)
+                answer_cache.store(grade, intent, language, chip, reply, generic=True)
+                self.warmed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[WARMUP] {grade}/{intent} '{chip}' failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "warmed": self.warmed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "last_run_seconds": self.last_run_seconds,
+        }
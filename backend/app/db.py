@@ -1,16 +1,21 @@
 import sqlite3
 import os
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, List, Tuple, Iterator
 
 ROOT = os.path.dirname(__file__)
 PROJECT_ROOT = os.path.abspath(os.path.join(ROOT, "..", ".."))
 DATA_DIR = os.path.join(PROJECT_ROOT, "backend", "data")
 os.makedirs(DATA_DIR, exist_ok=True)
-DB_PATH = os.path.join(DATA_DIR, "agent.db")
+# Absolute paths (e.g. a volume shared by several workers) are used as-is
+DB_PATH = os.path.join(DATA_DIR, os.getenv("DB_PATH", "agent.db"))
 
 def _conn():
-    return sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
+    c = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
+    # WAL: appends go to the write-ahead log, readers never block writers
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
+    return c
 
 def init_db():
     c = _conn()
@@ -26,6 +31,58 @@ def init_db():
       model TEXT
     );
     """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS sessions (
+      session_id TEXT PRIMARY KEY,
+      grade TEXT,
+      name TEXT,
+      email TEXT,
+      mobile TEXT,
+      intent TEXT,
+      created_at TEXT,
+      updated_at TEXT,
+      detected_language TEXT,
+      summary TEXT,
+      summary_upto INTEGER DEFAULT 0
+    );
+    """)
+    # Columns added after the first release
+    existing = {row[1] for row in cur.execute("PRAGMA table_info(sessions)")}
+    for column, decl in (("summary", "TEXT"), ("summary_upto", "INTEGER DEFAULT 0")):
+        if column not in existing:
+            cur.execute(f"ALTER TABLE sessions ADD COLUMN {column} {decl}")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS session_turns (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      session_id TEXT NOT NULL,
+      role TEXT,
+      text TEXT,
+      audio_file TEXT,
+      timestamp TEXT,
+      language TEXT,
+      heard_ms INTEGER
+    );
+    """)
+    existing = {row[1] for row in cur.execute("PRAGMA table_info(session_turns)")}
+    if "heard_ms" not in existing:
+        cur.execute("ALTER TABLE session_turns ADD COLUMN heard_ms INTEGER")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_created ON sessions (created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_turns_session ON session_turns (session_id, id)")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS leads (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      session_id TEXT,
+      name TEXT,
+      email TEXT,
+      mobile TEXT,
+      grade TEXT,
+      intent TEXT,
+      created_at TEXT
+    );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_leads_session ON leads (session_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_leads_email ON leads (email COLLATE NOCASE)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_leads_created ON leads (created_at)")
     c.commit()
     c.close()
     return True
@@ -49,3 +106,238 @@ def list_messages(limit=100):
     rows = cur.fetchall()
     c.close()
     return rows
+
+
+# ========== Sessions (append-only: one row per session, one row per turn) ==========
+SESSION_COLUMNS = ("session_id", "grade", "name", "email", "mobile", "intent",
+                   "created_at", "updated_at", "detected_language", "summary", "summary_upto")
+TURN_COLUMNS = ("role", "text", "audio_file", "timestamp", "language", "heard_ms")
+
+
+def insert_session(session: Dict, turns: Optional[List[Dict]] = None):
+    c = _conn()
+    cur = c.cursor()
+    cur.execute(
+        f"INSERT OR REPLACE INTO sessions ({', '.join(SESSION_COLUMNS)}) VALUES ({', '.join('?' * len(SESSION_COLUMNS))})",
+        tuple(session.get(k) for k in SESSION_COLUMNS)
+    )
+    for turn in turns or []:
+        cur.execute(
+            f"INSERT INTO session_turns (session_id, {', '.join(TURN_COLUMNS)}) VALUES (?, {', '.join('?' * len(TURN_COLUMNS))})",
+            (session["session_id"],) + tuple(turn.get(k) for k in TURN_COLUMNS)
+        )
+    c.commit()
+    c.close()
+
+
+def apply_session_ops(ops: List[tuple]):
+    """
+    Apply a batch of session writes in one transaction.
+
+    Ops: ("session", dict) | ("turn", session_id, turn, updated_at, language)
+         | ("update", session_id, fields) | ("delete", session_id)
+    Row updates for the same session are coalesced into a single UPDATE.
+    """
+    updates: Dict[str, Dict] = {}
+    c = _conn()
+    cur = c.cursor()
+    for op in ops:
+        kind = op[0]
+        if kind == "session":
+            session = op[1]
+            cur.execute(
+                f"INSERT OR REPLACE INTO sessions ({', '.join(SESSION_COLUMNS)}) VALUES ({', '.join('?' * len(SESSION_COLUMNS))})",
+                tuple(session.get(k) for k in SESSION_COLUMNS)
+            )
+        elif kind == "turn":
+            _, session_id, turn, updated_at, language = op
+            cur.execute(
+                f"INSERT INTO session_turns (session_id, {', '.join(TURN_COLUMNS)}) VALUES (?, {', '.join('?' * len(TURN_COLUMNS))})",
+                (session_id,) + tuple(turn.get(k) for k in TURN_COLUMNS)
+            )
+            fields = updates.setdefault(session_id, {})
+            fields["updated_at"] = updated_at
+            if language:
+                fields["detected_language"] = language
+        elif kind == "update":
+            _, session_id, fields = op
+            updates.setdefault(session_id, {}).update(
+                {k: v for k, v in fields.items() if k in SESSION_COLUMNS and k != "session_id"}
+            )
+        elif kind == "delete":
+            session_id = op[1]
+            updates.pop(session_id, None)
+            cur.execute("DELETE FROM session_turns WHERE session_id = ?", (session_id,))
+            cur.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+    for session_id, fields in updates.items():
+        if fields:
+            cur.execute(
+                f"UPDATE sessions SET {', '.join(f'{k} = ?' for k in fields)} WHERE session_id = ?",
+                tuple(fields.values()) + (session_id,)
+            )
+    c.commit()
+    c.close()
+
+
+def count_sessions() -> int:
+    c = _conn()
+    cur = c.cursor()
+    cur.execute("SELECT COUNT(*) FROM sessions")
+    count = cur.fetchone()[0]
+    c.close()
+    return count
+
+
+def load_sessions(created_after: str) -> List[Dict]:
+    """Load sessions created after a cutoff, with their turns in order"""
+    c = _conn()
+    c.row_factory = sqlite3.Row
+    cur = c.cursor()
+    cur.execute(
+        f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions WHERE created_at >= ?",
+        (created_after,)
+    )
+    sessions = {row["session_id"]: {**dict(row), "conversation": []} for row in cur.fetchall()}
+    cur.execute(
+        f"""SELECT t.session_id, {', '.join('t.' + k for k in TURN_COLUMNS)}
+        FROM session_turns t JOIN sessions s ON s.session_id = t.session_id
+        WHERE s.created_at >= ? ORDER BY t.id""",
+        (created_after,)
+    )
+    for row in cur.fetchall():
+        session = sessions.get(row["session_id"])
+        if session is not None:
+            session["conversation"].append({k: row[k] for k in TURN_COLUMNS})
+    c.close()
+    return list(sessions.values())
+
+
+def load_session(session_id: str, created_after: str) -> Optional[Dict]:
+    """Load one non-expired session with its turns, or None"""
+    c = _conn()
+    c.row_factory = sqlite3.Row
+    cur = c.cursor()
+    cur.execute(
+        f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions WHERE session_id = ? AND created_at >= ?",
+        (session_id, created_after)
+    )
+    row = cur.fetchone()
+    if row is None:
+        c.close()
+        return None
+    session = {**dict(row), "conversation": []}
+    cur.execute(
+        f"SELECT {', '.join(TURN_COLUMNS)} FROM session_turns WHERE session_id = ? ORDER BY id",
+        (session_id,)
+    )
+    session["conversation"] = [{k: r[k] for k in TURN_COLUMNS} for r in cur.fetchall()]
+    c.close()
+    return session
+
+
+def session_revision(session_id: str) -> Optional[str]:
+    """updated_at of a session (cheap check for changes made by another worker)"""
+    c = _conn()
+    cur = c.cursor()
+    cur.execute("SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,))
+    row = cur.fetchone()
+    c.close()
+    return row[0] if row else None
+
+
+def compact_sessions(created_before: str) -> int:
+    """Drop expired sessions and fold the WAL back into the main database"""
+    c = _conn()
+    cur = c.cursor()
+    cur.execute(
+        "DELETE FROM session_turns WHERE session_id IN (SELECT session_id FROM sessions WHERE created_at < ?)",
+        (created_before,)
+    )
+    cur.execute("DELETE FROM sessions WHERE created_at < ?", (created_before,))
+    removed = cur.rowcount
+    c.commit()
+    cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    c.close()
+    return removed
+
+
+# ========== Leads (append-only, indexed by session_id / email / created_at) ==========
+LEAD_COLUMNS = ("session_id", "name", "email", "mobile", "grade", "intent", "created_at")
+
+
+def insert_leads(leads: List[Dict]) -> int:
+    """Append a batch of leads atomically (one transaction)"""
+    c = _conn()
+    cur = c.cursor()
+    cur.executemany(
+        f"INSERT INTO leads ({', '.join(LEAD_COLUMNS)}) VALUES ({', '.join('?' * len(LEAD_COLUMNS))})",
+        [tuple(lead.get(k) for k in LEAD_COLUMNS) for lead in leads]
+    )
+    c.commit()
+    c.close()
+    return len(leads)
+
+
+def _lead_filters(session_id: Optional[str] = None, email: Optional[str] = None,
+                  created_from: Optional[str] = None, created_before: Optional[str] = None) -> Tuple[str, list]:
+    clauses, params = [], []
+    if session_id:
+        clauses.append("session_id = ?")
+        params.append(session_id)
+    if email:
+        clauses.append("email = ? COLLATE NOCASE")
+        params.append(email)
+    if created_from:
+        clauses.append("created_at >= ?")
+        params.append(created_from)
+    if created_before:
+        clauses.append("created_at < ?")
+        params.append(created_before)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def query_leads(limit: int = 50, offset: int = 0, **filters) -> Tuple[List[Dict], int]:
+    """Newest-first page of leads matching the filters, plus the total count"""
+    where, params = _lead_filters(**filters)
+    c = _conn()
+    c.row_factory = sqlite3.Row
+    cur = c.cursor()
+    cur.execute(f"SELECT COUNT(*) FROM leads{where}", params)
+    total = cur.fetchone()[0]
+    cur.execute(
+        f"SELECT id, {', '.join(LEAD_COLUMNS)} FROM leads{where} ORDER BY id DESC LIMIT ? OFFSET ?",
+        params + [limit, offset]
+    )
+    rows = [dict(row) for row in cur.fetchall()]
+    c.close()
+    return rows, total
+
+
+def iter_leads(batch_size: int = 500, **filters) -> Iterator[Dict]:
+    """Yield all matching leads oldest-first, paging by id (for exports)"""
+    where, params = _lead_filters(**filters)
+    where = where + (" AND" if where else " WHERE") + " id > ?"
+    last_id = 0
+    while True:
+        c = _conn()
+        c.row_factory = sqlite3.Row
+        cur = c.cursor()
+        cur.execute(
+            f"SELECT id, {', '.join(LEAD_COLUMNS)} FROM leads{where} ORDER BY id LIMIT ?",
+            params + [last_id, batch_size]
+        )
+        rows = [dict(row) for row in cur.fetchall()]
+        c.close()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1]["id"]
+
+
+def count_leads() -> int:
+    c = _conn()
+    cur = c.cursor()
+    cur.execute("SELECT COUNT(*) FROM leads")
+    count = cur.fetchone()[0]
+    c.close()
+    return count
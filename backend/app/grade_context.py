@@ -1,7 +1,19 @@
-"""Grade & Course Context Service - Load grade and course-specific curriculum info"""
+"""Grade & Course Context Service - Load grade and course-specific curriculum info
+
+All markdown in grade_data/ and course_data/ is read once into an immutable
+snapshot; lookups never touch the filesystem. A background watcher polls the
+directories' mtimes, swaps in a new snapshot when a file changes and runs the
+invalidation hooks (prompt prefixes, retrieval index, answer cache, ...).
+"""
 import os
-from typing import Optional, Dict
-from functools import lru_cache
+import time
+import asyncio
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional, Dict, Callable, List, Mapping, Tuple
+
+# Seconds between checks for edited markdown (0 disables the watcher)
+CONTEXT_POLL_SECONDS = float(os.getenv("CONTEXT_POLL_SECONDS", "5"))
 
 # Path to data directories
 ROOT = os.path.dirname(__file__)
@@ -61,85 +73,186 @@ def normalize_grade(grade: str) -> str:
     return GRADE_ALIASES.get(grade, grade)
 
 
-@lru_cache(maxsize=30)
+@dataclass(frozen=True)
+class ContextDocument:
+    """One markdown knowledge file"""
+    name: str  # Grade or course name, e.g. "Grade 5", "Coding" (file stem if unmapped)
+    kind: str  # "grade" or "course"
+    filename: str
+    text: str
+
+
+@dataclass(frozen=True)
+class ContextSnapshot:
+    """Every knowledge file as read at one point in time (never mutated)"""
+    version: int
+    loaded_at: float
+    documents: Tuple[ContextDocument, ...]
+    grades: Mapping[str, str]  # Grade name -> markdown
+    courses: Mapping[str, str]  # Course name -> markdown
+    # (directory kind, filename, mtime_ns, size) of every file, to detect edits
+    signature: Tuple[Tuple[str, str, int, int], ...]
+
+
+_SOURCES = (
+    ("grade", GRADE_DATA_DIR, GRADE_FILES),
+    ("course", COURSE_DATA_DIR, COURSE_FILES),
+)
+
+
+def _scan_signature() -> Tuple[Tuple[str, str, int, int], ...]:
+    """Cheap stat-only fingerprint of the markdown directories"""
+    entries = []
+    for kind, directory, _ in _SOURCES:
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".md") and entry.is_file():
+                        st = entry.stat()
+                        entries.append((kind, entry.name, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            continue
+    return tuple(sorted(entries))
+
+
+def _read_snapshot(version: int) -> ContextSnapshot:
+    signature = _scan_signature()
+    documents = []
+    named: Dict[str, Dict[str, str]] = {"grade": {}, "course": {}}
+    for kind, directory, mapping in _SOURCES:
+        names = {filename: name for name, filename in mapping.items()}
+        for entry_kind, filename, _, _ in signature:
+            if entry_kind != kind:
+                continue
+            try:
+                with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except Exception as e:
+                print(f"Error loading {kind} context {filename}: {e}")
+                continue
+            name = names.get(filename, filename[:-3])
+            documents.append(ContextDocument(name=name, kind=kind, filename=filename, text=text))
+            if filename in names:
+                named[kind][name] = text
+    # Keep the declared order of GRADE_FILES / COURSE_FILES
+    grades = {g: named["grade"][g] for g in GRADE_FILES if g in named["grade"]}
+    courses = {c: named["course"][c] for c in COURSE_FILES if c in named["course"]}
+    return ContextSnapshot(
+        version=version,
+        loaded_at=time.time(),
+        documents=tuple(documents),
+        grades=MappingProxyType(grades),
+        courses=MappingProxyType(courses),
+        signature=signature,
+    )
+
+
+_snapshot: Optional[ContextSnapshot] = None
+
+
+def get_snapshot() -> ContextSnapshot:
+    """Current knowledge snapshot (read from disk on first use only)"""
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = _read_snapshot(1)
+    return _snapshot
+
+
 def load_grade_context(grade_or_course: str) -> Optional[str]:
-    """Load grade or course context from markdown file (cached)
+    """Grade or course markdown from the current snapshot
     
     This function works for both grades (Nursery, LKG, Grade 1-12)
     and courses (Indian Languages, Coding, etc.)
     """
-    normalized = normalize_grade(grade_or_course)
-    
-    # First check if it's a grade
-    filename = GRADE_FILES.get(normalized)
-    if filename:
-        filepath = os.path.join(GRADE_DATA_DIR, filename)
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    return f.read()
-            except Exception as e:
-                print(f"Error loading grade context for {grade_or_course}: {e}")
-                return None
-    
-    # If not a grade, check if it's a course
-    filename = COURSE_FILES.get(grade_or_course.strip())
-    if filename:
-        filepath = os.path.join(COURSE_DATA_DIR, filename)
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    return f.read()
-            except Exception as e:
-                print(f"Error loading course context for {grade_or_course}: {e}")
-                return None
-    
-    return None
+    snapshot = get_snapshot()
+    return snapshot.grades.get(normalize_grade(grade_or_course)) or snapshot.courses.get(grade_or_course.strip())
 
 
-@lru_cache(maxsize=15)
 def load_course_context(course: str) -> Optional[str]:
-    """Load course context from markdown file (cached)"""
-    filename = COURSE_FILES.get(course.strip())
-    
-    if not filename:
-        return None
-    
-    filepath = os.path.join(COURSE_DATA_DIR, filename)
-    
-    if not os.path.exists(filepath):
-        return None
-    
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            return f.read()
-    except Exception as e:
-        print(f"Error loading course context for {course}: {e}")
-        return None
+    """Course markdown from the current snapshot"""
+    return get_snapshot().courses.get(course.strip())
 
 
 def get_available_grades() -> list:
     """Get list of available grades"""
-    available = []
-    for grade, filename in GRADE_FILES.items():
-        filepath = os.path.join(GRADE_DATA_DIR, filename)
-        if os.path.exists(filepath):
-            available.append(grade)
-    return available
+    return list(get_snapshot().grades)
 
 
 def get_available_courses() -> list:
     """Get list of available courses"""
-    available = []
-    for course, filename in COURSE_FILES.items():
-        filepath = os.path.join(COURSE_DATA_DIR, filename)
-        if os.path.exists(filepath):
-            available.append(course)
-    return available
+    return list(get_snapshot().courses)
+
+
+# Callbacks run after a new snapshot is swapped in (caches derived from the markdown)
+_invalidation_hooks: List[Callable[[], None]] = []
+
+
+def on_context_invalidated(hook: Callable[[], None]):
+    """Register a callback to run whenever the context snapshot is replaced"""
+    _invalidation_hooks.append(hook)
+
+
+# Callbacks run with a freshly read snapshot in the loading thread, before it
+# is swapped in (build expensive derived data there, off the event loop)
+_prepare_hooks: List[Callable[[ContextSnapshot], None]] = []
+
+
+def on_context_loaded(hook: Callable[[ContextSnapshot], None]):
+    """Register a callback to prepare derived data for a new snapshot before it goes live"""
+    _prepare_hooks.append(hook)
+
+
+def _read_and_prepare(version: int) -> ContextSnapshot:
+    snapshot = _read_snapshot(version)
+    for hook in _prepare_hooks:
+        try:
+            hook(snapshot)
+        except Exception as e:
+            print(f"[CONTEXT] Prepare hook failed: {e}")
+    return snapshot
+
+
+def _swap(snapshot: ContextSnapshot):
+    global _snapshot
+    _snapshot = snapshot
+    for hook in _invalidation_hooks:
+        try:
+            hook()
+        except Exception as e:
+            print(f"[CONTEXT] Invalidation hook failed: {e}")
 
 
 def clear_context_cache():
-    """Clear the cached contexts (useful for updates)"""
-    load_grade_context.cache_clear()
-    load_course_context.cache_clear()
+    """Re-read every knowledge file now and invalidate dependent caches"""
+    current = _snapshot.version if _snapshot else 0
+    _swap(_read_and_prepare(current + 1))
+
+
+async def watch_context_files(interval: float = CONTEXT_POLL_SECONDS):
+    """Background loop: reload the snapshot when a markdown file is added, edited or removed"""
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            signature = await asyncio.to_thread(_scan_signature)
+            current = get_snapshot()
+            if signature == current.signature:
+                continue
+            # Read and prepare in a worker thread; swap and run hooks on the event loop
+            snapshot = await asyncio.to_thread(_read_and_prepare, current.version + 1)
+            _swap(snapshot)
+            print(f"[CONTEXT] Reloaded {len(snapshot.documents)} knowledge files (version {snapshot.version})")
+        except Exception as e:
+            print(f"[CONTEXT] Watch error: {e}")
+
 
+def context_stats() -> dict:
+    snapshot = get_snapshot()
+    return {
+        "version": snapshot.version,
+        "documents": len(snapshot.documents),
+        "bytes": sum(len(d.text.encode("utf-8")) for d in snapshot.documents),
+        "loaded_at": snapshot.loaded_at,
+        "poll_seconds": CONTEXT_POLL_SECONDS,
+    }
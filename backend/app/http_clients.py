@@ -0,0 +1,76 @@
+"""
+Shared HTTP Clients for Provider APIs
+
+One pooled httpx.AsyncClient per provider (OpenAI, OpenRouter), created at
+app startup and closed from the FastAPI lifespan. Reusing clients keeps
+TCP+TLS connections alive between STT, LLM and TTS calls instead of paying
+a fresh handshake on every stage of every turn.
+"""
+import os
+import httpx
+from typing import Dict
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 support in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# Keep-alive pool sizes per provider
+PROVIDER_LIMITS: Dict[str, httpx.Limits] = {
+    "openai": httpx.Limits(
+        max_connections=int(os.getenv("OPENAI_POOL_SIZE", "20")),
+        max_keepalive_connections=int(os.getenv("OPENAI_POOL_KEEPALIVE", "10")),
+        keepalive_expiry=60.0,
+    ),
+    "openrouter": httpx.Limits(
+        max_connections=int(os.getenv("OPENROUTER_POOL_SIZE", "10")),
+        max_keepalive_connections=int(os.getenv("OPENROUTER_POOL_KEEPALIVE", "5")),
+        keepalive_expiry=60.0,
+    ),
+}
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=5)
+
+# Per-stage timeouts (short connect, read sized for model latency)
+STAGE_TIMEOUTS: Dict[str, httpx.Timeout] = {
+    "stt": httpx.Timeout(120.0, connect=10.0),
+    "llm": httpx.Timeout(90.0, connect=10.0),
+    "tts": httpx.Timeout(60.0, connect=10.0),
+}
+
+DEFAULT_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """Get the shared client for a provider, creating it on first use"""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=PROVIDER_LIMITS.get(provider, DEFAULT_LIMITS),
+            timeout=DEFAULT_TIMEOUT,
+        )
+        _clients[provider] = client
+    return client
+
+
+def init_http_clients():
+    """Create the provider clients up front (called from app lifespan)"""
+    for provider in PROVIDER_LIMITS:
+        get_http_client(provider)
+    print(f"[HTTP] Provider clients ready (http2={HTTP2_AVAILABLE})")
+
+
+async def close_http_clients():
+    """Close all provider clients and their pooled connections"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            print(f"[HTTP] Error closing client: {e}")
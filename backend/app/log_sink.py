@@ -0,0 +1,211 @@
+"""
+Buffered JSONL Event Log
+
+write_log() used to open, append and close the daily log file in a thread
+for every event. Events now go into an in-memory ring buffer and a single
+writer task appends them in batches: one write() per batch on an O_APPEND
+descriptor, so worker processes sharing the day's file never split a line.
+
+- Flushes every LOG_FLUSH_INTERVAL_MS or once LOG_FLUSH_LINES are buffered
+- Files rotate daily (log-YYYY-MM-DD.jsonl) and optionally by size
+- When the buffer is full the oldest events are dropped and counted
+- Line schema is unchanged: {"timestamp", "stage", "payload"}
+- Events are serialized when emitted, so later changes to a payload dict
+  do not leak into the log
+"""
+import os
+import json
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Any, List, Optional
+
+# Directory for log files
+ROOT = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(ROOT, "..", ".."))
+LOG_DIR = os.path.join(PROJECT_ROOT, "backend", "logs")
+os.makedirs(LOG_DIR, exist_ok=True)
+
+LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "10000"))
+LOG_FLUSH_INTERVAL_MS = float(os.getenv("LOG_FLUSH_INTERVAL_MS", "1000"))
+LOG_FLUSH_LINES = int(os.getenv("LOG_FLUSH_LINES", "256"))
+# Roll the day's file over to log-YYYY-MM-DD-N.jsonl past this size (0 = daily only)
+LOG_MAX_FILE_MB = float(os.getenv("LOG_MAX_FILE_MB", "0"))
+
+
+class JSONLLogSink:
+    """Ring buffer of log events drained by one writer task"""
+
+    def __init__(self, directory: str, capacity: int, flush_interval: float, flush_lines: int, max_file_bytes: int = 0):
+        self.directory = directory
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.flush_lines = flush_lines
+        self.max_file_bytes = max_file_bytes
+        self._buffer: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._fd: Optional[int] = None
+        self._file_date: Optional[str] = None
+
+        # Metrics
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.errors = 0
+        self.rotations = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def emit(self, stage: str, payload: Any):
+        """Buffer one event (never blocks; drops the oldest event when full)"""
+        ts = datetime.utcnow()
+        line = json.dumps(
+            {"timestamp": ts.isoformat() + "Z", "stage": stage, "payload": payload},
+            ensure_ascii=False, default=str
+        )
+        if len(self._buffer) >= self.capacity:
+            self._buffer.popleft()
+            self.dropped += 1
+        self._buffer.append((ts.date().isoformat(), line))
+        self.emitted += 1
+        if self._wakeup and len(self._buffer) >= self.flush_lines:
+            self._wakeup.set()
+
+    async def start(self):
+        if self.running:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write out everything still buffered and close the file"""
+        if self._task:
+            # Let the writer finish its in-flight batch and exit, so the file
+            # handle is never used by two threads
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await self._task
+            except Exception as e:
+                print(f"[LOG] Writer failed: {e}")
+            self._task = None
+        self._wakeup = None
+        await asyncio.to_thread(self._write_and_close, self._drain())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._buffer:
+                # Shielded: if the task is cancelled the write still completes first
+                write = asyncio.ensure_future(asyncio.to_thread(self._write, self._drain()))
+                try:
+                    await asyncio.shield(write)
+                except asyncio.CancelledError:
+                    await write
+                    raise
+
+    def _drain(self) -> list:
+        records = list(self._buffer)
+        self._buffer.clear()
+        return records
+
+    def _write_and_close(self, records: list):
+        self._write(records)
+        self._close_file()
+
+    def _write(self, records: list):
+        if not records:
+            return
+        try:
+            # Consecutive records of one day go out in a single write
+            groups: List[tuple] = []
+            for date, line in records:
+                if groups and groups[-1][0] == date:
+                    groups[-1][1].append(line)
+                else:
+                    groups.append((date, [line]))
+            for date, lines in groups:
+                if date != self._file_date or self._rolled_elsewhere():
+                    self._open_file(date)
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+                while data:
+                    data = data[os.write(self._fd, data):]
+                self.written += len(lines)
+            self.flushes += 1
+            if self.max_file_bytes and os.fstat(self._fd).st_size >= self.max_file_bytes:
+                self._roll_over()
+        except Exception as e:
+            self.errors += 1
+            print(f"[LOG] Failed to write {len(records)} events: {e}")
+            self._close_file()
+
+    def _path(self, date: str) -> str:
+        return os.path.join(self.directory, f"log-{date}.jsonl")
+
+    def _open_file(self, date: str):
+        self._close_file()
+        self._fd = os.open(self._path(date), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._file_date = date
+
+    def _close_file(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+        self._fd = None
+        self._file_date = None
+
+    def _rolled_elsewhere(self) -> bool:
+        """Another worker moved the day's file aside: reopen the new one"""
+        if not self.max_file_bytes or self._fd is None:
+            return False
+        try:
+            return os.stat(self._path(self._file_date)).st_ino != os.fstat(self._fd).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _roll_over(self):
+        """Move the full file aside so the day's name always holds the newest events"""
+        date = self._file_date
+        rolled = self._rolled_elsewhere()
+        self._close_file()
+        if rolled:
+            return
+        n = 1
+        while os.path.exists(os.path.join(self.directory, f"log-{date}-{n}.jsonl")):
+            n += 1
+        os.replace(self._path(date), os.path.join(self.directory, f"log-{date}-{n}.jsonl"))
+        self.rotations += 1
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "emitted": self.emitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "rotations": self.rotations,
+        }
+
+
+log_sink = JSONLLogSink(
+    LOG_DIR,
+    LOG_BUFFER_SIZE,
+    LOG_FLUSH_INTERVAL_MS / 1000.0,
+    LOG_FLUSH_LINES,
+    int(LOG_MAX_FILE_MB * 1024 * 1024),
+)
@@ -6,46 +6,67 @@ except ImportError:
     pass  # dotenv optional
 
 import os
+import hmac
 import json
 import asyncio
-import shlex
-import subprocess
+import signal
 import base64
-from datetime import datetime
-from typing import Optional
-from fastapi import FastAPI, File, UploadFile, Form, WebSocket, WebSocketDisconnect, Query, HTTPException
+import csv
+import io
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Optional, AsyncIterator, Union
+from fastapi import FastAPI, File, UploadFile, Form, WebSocket, WebSocketDisconnect, Query, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import PlainTextResponse, JSONResponse
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from gtts import gTTS
 import httpx
 
 # Import our modules
 from .session_manager import (
-    create_session, get_session, update_session, delete_session,
-    list_sessions, get_transcript_text, Session, save_and_notify_lead
+    create_session, get_session_async, update_session, delete_session,
+    list_sessions, get_transcript_text, Session, save_and_notify_lead,
+    run_session_maintenance, session_cache_stats
 )
-from .grade_context import load_grade_context, get_available_grades
-from .prompting import build_messages_for_llm
+from .grade_context import load_grade_context, get_available_grades, get_snapshot, watch_context_files, context_stats
+from .prompting import build_messages_for_llm, prompt_stats
+from .memory import schedule_summary, history_budget
+from .retrieval import RETRIEVAL_ENABLED, get_index
+from .answer_cache import answer_cache, answer_language, ANSWER_CACHE_ENABLED
+from .chip_warmup import ChipWarmer, CHIP_WARMUP
 
 # Import voice architecture modules
 from .voice_config import (
-    get_config, update_config, ArchitectureMode,
+    get_config, update_config, reload_config, VoiceConfig, ArchitectureMode,
     STTProvider, LLMProvider, TTSProvider
 )
 from .voice_openai import (
     transcribe_audio_openai, chat_completion_openai,
-    text_to_speech_openai, chat_completion_openrouter
+    text_to_speech_openai, chat_completion_openrouter,
+    stream_chat_completion_openai, stream_chat_completion_openrouter
 )
-from .realtime_handler import RealtimeHandler, create_realtime_session
+from .realtime_handler import RealtimeHandler, create_realtime_session, open_realtime_socket
+from .realtime_pool import RealtimePool
+from .send_queue import (
+    SendQueue, register_queues, unregister_queues, send_queue_stats,
+    REALTIME_DOWNSTREAM_MAX_KB, REALTIME_UPSTREAM_MAX_KB
+)
+from .audio_frames import pack_frame, parse_frame, is_base64, FrameError, FLAG_COMMIT
+from .http_clients import init_http_clients, close_http_clients
+from .tts_pipeline import TTSPipeline, clean_text_for_tts, join_segments
+from .tts_cache import tts_cache, tts_cache_key
+from .stt_pool import get_stt_pool, shutdown_stt_pool, stt_pool_stats, STTPoolBusy
+from .audio_decode import decode_audio_bytes
+from .background_writer import background_writer
+from .log_sink import log_sink
+from .db import query_leads, iter_leads, LEAD_COLUMNS
 
 # ========== Directories ==========
 ROOT = os.path.dirname(__file__)
 PROJECT_ROOT = os.path.abspath(os.path.join(ROOT, "..", ".."))
-LOG_DIR = os.path.join(PROJECT_ROOT, "backend", "logs")
 DATA_DIR = os.path.join(PROJECT_ROOT, "backend", "data")
-os.makedirs(LOG_DIR, exist_ok=True)
 os.makedirs(DATA_DIR, exist_ok=True)
 
 # ========== Helpers ==========
@@ -53,14 +74,8 @@ def now_str():
     return datetime.utcnow().isoformat() + "Z"
 
 async def write_log(stage, payload):
-    """Write JSONL log safely"""
-    fn = os.path.join(LOG_DIR, f"log-{datetime.utcnow().date()}.jsonl")
-    line = json.dumps({"timestamp": now_str(), "stage": stage, "payload": payload}, ensure_ascii=False) + "\n"
-    try:
-        async with asyncio.Lock():
-            await asyncio.to_thread(lambda: open(fn, "a", encoding="utf-8").write(line))
-    except Exception:
-        pass
+    """Queue a JSONL log event (written in batches by the log sink)"""
+    log_sink.emit(stage, payload)
 
 # ========== TTS (configurable) ==========
 def _tts_gtts_sync(text, path):
@@ -70,96 +85,227 @@ def _tts_gtts_sync(text, path):
     return os.path.exists(path)
 
 
-async def tts_save(text: str, filename: str) -> str:
-    """Save text as audio using configured TTS provider"""
-    config = get_config()
-    path = os.path.join(DATA_DIR, filename)
+async def tts_save(text: str, config: Optional[VoiceConfig] = None) -> str:
+    """Render text to an mp3 using configured TTS provider (cached by content)"""
+    config = config or get_config()
 
     try:
         if config.tts_provider == TTSProvider.OPENAI:
+            key = tts_cache_key(text, TTSProvider.OPENAI.value, config.tts_model, config.tts_voice)
+            cached = await tts_cache.lookup(key)
+            if cached:
+                await write_log("tts_cache_hit", {"key": key[:12]})
+                return cached
+
             # Use OpenAI TTS
-            ok = await text_to_speech_openai(text, path)
-            if ok:
-                await write_log("tts_openai_done", {"file": filename})
+            tmp = tts_cache.temp_path_for(key)
+            try:
+                ok = await text_to_speech_openai(text, tmp, config=config)
+            except Exception as e:
+                ok = False
+                await write_log("tts_openai_error", {"error": str(e)})
+            path = await tts_cache.commit(key, tmp) if ok else None
+            if path:
+                await write_log("tts_openai_done", {"key": key[:12]})
                 return path
+            await tts_cache.discard(tmp)
             # Fallback to gTTS if OpenAI fails
             await write_log("tts_openai_fallback", {"reason": "OpenAI TTS failed"})
 
         # gTTS fallback
-        ok = await asyncio.to_thread(_tts_gtts_sync, text, path)
-        await write_log("tts_gtts_done", {"file": filename})
-        return path if ok else ""
+        key = tts_cache_key(text, TTSProvider.GTTS.value, "gtts", "en")
+        cached = await tts_cache.lookup(key)
+        if cached:
+            await write_log("tts_cache_hit", {"key": key[:12]})
+            return cached
+
+        tmp = tts_cache.temp_path_for(key)
+        ok = await asyncio.to_thread(_tts_gtts_sync, text, tmp)
+        path = await tts_cache.commit(key, tmp) if ok else None
+        if not path:
+            await tts_cache.discard(tmp)
+        await write_log("tts_gtts_done", {"key": key[:12]})
+        return path or ""
     except Exception as e:
         await write_log("tts_error", {"error": str(e)})
         return ""
 
 
 # ========== LLM (configurable) ==========
-async def call_llm(messages: list[dict]) -> str:
+async def call_llm(messages: list[dict], config: Optional[VoiceConfig] = None) -> str:
     """Call LLM using configured provider"""
-    config = get_config()
+    config = config or get_config()
 
     if config.llm_provider == LLMProvider.OPENAI:
-        return await chat_completion_openai(messages)
+        return await chat_completion_openai(messages, config=config)
     else:
-        return await chat_completion_openrouter(messages)
+        return await chat_completion_openrouter(messages, config=config)
+
 
+def llm_model_name(config: VoiceConfig) -> str:
+    """Model the configured LLM provider will use (sizes the history budget)"""
+    return config.llm_model if config.llm_provider == LLMProvider.OPENAI else config.openrouter_model
 
-async def call_llm_with_session(session: Session, user_query: str) -> str:
+
+async def call_llm_with_session(session: Session, user_query: str, config: Optional[VoiceConfig] = None) -> str:
     """Call LLM with session context and prompting strategy"""
-    messages = build_messages_for_llm(session, user_query)
-    return await call_llm(messages)
+    config = config or get_config()
+    messages = build_messages_for_llm(session, user_query, model=llm_model_name(config))
+    return await call_llm(messages, config=config)
+
+
+def stream_llm(messages: list[dict], config: Optional[VoiceConfig] = None) -> AsyncIterator[str]:
+    """Stream LLM content deltas using configured provider"""
+    config = config or get_config()
+
+    if config.llm_provider == LLMProvider.OPENAI:
+        return stream_chat_completion_openai(messages, config=config)
+    else:
+        return stream_chat_completion_openrouter(messages, config=config)
+
+
+def stream_llm_with_session(session: Optional[Session], user_query: str, config: Optional[VoiceConfig] = None) -> AsyncIterator[str]:
+    """Stream LLM deltas with session context (plain query without a session)"""
+    config = config or get_config()
+    if session:
+        messages = build_messages_for_llm(session, user_query, model=llm_model_name(config))
+    else:
+        messages = [{"role": "user", "content": user_query}]
+    return stream_llm(messages, config=config)
+
+
+async def replay_answer(text: str) -> AsyncIterator[str]:
+    """Stand-in for the LLM stream when the answer comes from the answer cache"""
+    yield text
+
+
+def session_language(session: Session, query: str) -> str:
+    """Language key for the answer cache"""
+    last_reply = next((t.text for t in reversed(session.conversation) if t.role == "assistant"), "")
+    return answer_language(query, session.detected_language, last_reply)
 
-# ========== STT: Local Whisper (fallback) ==========
-_TRANSCRIBE_MODEL_OBJ = None
 
+def anonymous_session(session: Session) -> Session:
+    """Copy without lead details or history, so the reply can be shared across leads"""
+    return Session(session_id=session.session_id, grade=session.grade, name="", email="", mobile="", intent=session.intent)
 
-def _init_transcribe_model():
-    """Initialize local Whisper model if needed"""
-    global _TRANSCRIBE_MODEL_OBJ
-    if _TRANSCRIBE_MODEL_OBJ:
+
+def remember_answer(session: Session, query: str, reply: str, language: str, generic: bool):
+    """Cache the answer only if its prompt held nothing specific to this lead"""
+    if not ANSWER_CACHE_ENABLED:
         return
-    config = get_config()
-    try:
-        from faster_whisper import WhisperModel
-        _TRANSCRIBE_MODEL_OBJ = WhisperModel(
-            config.local_whisper_model, device="cpu", compute_type="float32"
-        )
-        print(f"[INIT] faster-whisper loaded: {config.local_whisper_model}")
-    except Exception as e:
-        print(f"[INIT] faster-whisper failed: {e}")
-        _TRANSCRIBE_MODEL_OBJ = None
+    answer_cache.store(session.grade, session.intent, language, query, reply, generic)
 
 
-async def transcribe_audio(audio_path: str) -> str:
-    """Transcribe audio using configured STT provider"""
-    config = get_config()
+async def _warm_chip_answer(session: Session, chip: str) -> str:
+    return await call_llm_with_session(session, chip, config=get_config())
+
+
+async def _warm_chip_audio(text: str) -> Optional[str]:
+    return await tts_save(text, config=get_config())
+
+
+# Pre-renders suggestion chip answers and audio (CHIP_WARMUP=true)
+chip_warmer = ChipWarmer(_warm_chip_answer, _warm_chip_audio)
+
+# Upstream Realtime sockets opened ahead of /ws/realtime connections
+realtime_pool = RealtimePool(open_realtime_socket)
+
+
+def update_memory_summary(session: Session, config: VoiceConfig):
+    """Fold turns that left the history window into the rolling summary (background)"""
+    async def summarize(messages: list[dict]) -> str:
+        return await call_llm(messages, config=config)
+    schedule_summary(session, summarize, history_budget(llm_model_name(config)))
+
+# ========== STT ==========
+async def transcribe_audio(audio: Union[str, bytes], config: Optional[VoiceConfig] = None) -> str:
+    """Transcribe audio (file path or in-memory bytes) using configured STT provider"""
+    config = config or get_config()
 
     if config.stt_provider == STTProvider.OPENAI:
         try:
-            result = await transcribe_audio_openai(audio_path)
+            result = await transcribe_audio_openai(audio, config=config)
             if result and not result.startswith("(no "):
                 await write_log("stt_openai_done", {"preview": result[:100]})
                 return result
         except Exception as e:
             await write_log("stt_openai_error", {"error": str(e)})
 
-    # Local Whisper fallback
-    _init_transcribe_model()
-    if _TRANSCRIBE_MODEL_OBJ:
-        def _do_transcribe():
-            segs, _ = _TRANSCRIBE_MODEL_OBJ.transcribe(audio_path, beam_size=5)
-            return " ".join([s.text for s in segs]).strip()
-
-        result = await asyncio.to_thread(_do_transcribe)
+    # Local Whisper (worker pool, warm-loaded at startup)
+    pool = await get_stt_pool(config)
+    if pool:
+        if isinstance(audio, bytes):
+            # Decode in-process to 16 kHz samples; no temp files or ffmpeg spawn
+            try:
+                audio = await asyncio.to_thread(decode_audio_bytes, audio)
+            except Exception as e:
+                await write_log("audio_decode_error", {"error": str(e)})
+                return "(transcription unavailable)"
+        try:
+            result = await pool.transcribe(audio)
+        except STTPoolBusy as e:
+            await write_log("stt_local_busy", {"error": str(e)})
+            return "(transcription busy)"
         await write_log("stt_local_done", {"preview": result[:100]})
         return result
 
     return "(transcription unavailable)"
 
 
+def reload_settings(clear_overrides: bool = False):
+    """Re-read .env and environment variables into a new config snapshot"""
+    try:
+        from dotenv import load_dotenv, find_dotenv
+        load_dotenv(find_dotenv(), override=True)
+    except ImportError:
+        pass
+    config = reload_config(clear_overrides=clear_overrides)
+    print(f"[CONFIG] Reloaded (version {config.version})")
+    return config
+
+
 # ========== FastAPI ==========
-app = FastAPI(title="Vikalp AI Voice Agent", version="2.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    await log_sink.start()
+    init_http_clients()
+    # Read every knowledge file once; the watcher swaps in edits
+    await asyncio.to_thread(get_snapshot)
+    context_watcher = asyncio.create_task(watch_context_files())
+    if RETRIEVAL_ENABLED:
+        # Build the knowledge index now rather than on the first question
+        await asyncio.to_thread(get_index)
+    try:
+        # `kill -HUP <pid>` reloads config without a restart
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_settings)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        pass  # Not supported on Windows / non-main thread
+    warmup = None
+    if get_config().stt_provider == STTProvider.LOCAL_WHISPER:
+        # Warm-load the model in the background so the first request does not stall
+        warmup = asyncio.create_task(get_stt_pool())
+    await background_writer.start()
+    maintenance = asyncio.create_task(run_session_maintenance())
+    if CHIP_WARMUP and ANSWER_CACHE_ENABLED:
+        await chip_warmer.start()
+    if get_config().architecture == ArchitectureMode.REALTIME:
+        await realtime_pool.start()
+    yield
+    await realtime_pool.stop()
+    await chip_warmer.stop()
+    context_watcher.cancel()
+    maintenance.cancel()
+    await background_writer.stop()
+    if warmup:
+        warmup.cancel()
+    await shutdown_stt_pool()
+    await close_http_clients()
+    await log_sink.stop()
+
+
+app = FastAPI(title="Vikalp AI Voice Agent", version="2.0.0", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 app.mount("/data", StaticFiles(directory=DATA_DIR), name="data")
 
@@ -182,12 +328,33 @@ async def health():
     return {"ok": True, "message": "backend alive", "time": now_str()}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for caches and queues"""
+    return {
+        "ok": True,
+        "time": now_str(),
+        "sessions": session_cache_stats(),
+        "context": context_stats(),
+        "prompt": prompt_stats(),
+        "answer_cache": answer_cache.stats(),
+        "realtime_pool": realtime_pool.stats(),
+        "realtime_queues": send_queue_stats(),
+        "chip_warmup": chip_warmer.stats(),
+        "tts_cache": tts_cache.stats(),
+        "stt_pool": stt_pool_stats(),
+        "background_writer": background_writer.stats(),
+        "log_sink": log_sink.stats(),
+    }
+
+
 # ========== CONFIGURATION ENDPOINTS ==========
 @app.get("/config")
 async def get_current_config():
     """Get current voice agent configuration"""
     config = get_config()
     return {
+        "version": config.version,
         "architecture": config.architecture.value,
         "stt_provider": config.stt_provider.value,
         "stt_model": config.stt_model,
@@ -221,30 +388,26 @@ async def update_config_endpoint(req: ConfigUpdate):
     if req.tts_provider:
         updates["tts_provider"] = TTSProvider(req.tts_provider)
 
-    update_config(**updates)
-    await write_log("config_updated", updates)
+    config = update_config(**updates)
+    await write_log("config_updated", {**updates, "version": config.version})
     return {"ok": True, "config": await get_current_config()}
 
 
-# ========== BACKGROUND TRANSCRIPTION ==========
-async def transcribe_and_save(orig_path: str, safe_name: str, user_id: Optional[str]):
-    """Convert, transcribe, log, save."""
-    ts = int(datetime.utcnow().timestamp() * 1000)
-    converted_path = os.path.join(DATA_DIR, f"conv-{ts}.wav")
+@app.post("/config/reload")
+async def reload_config_endpoint(clear_overrides: bool = False):
+    """Reload configuration from .env / environment variables"""
+    config = reload_settings(clear_overrides=clear_overrides)
+    await write_log("config_reloaded", {"version": config.version, "clear_overrides": clear_overrides})
+    return {"ok": True, "config": await get_current_config()}
 
-    try:
-        # Step 1: convert to 16k mono wav
-        cmd = f'ffmpeg -y -i {shlex.quote(orig_path)} -ar 16000 -ac 1 -vn {shlex.quote(converted_path)}'
-        await asyncio.to_thread(lambda: subprocess.run(cmd, shell=True, check=True))
-        await write_log("ffmpeg_done", {"src": orig_path, "converted": converted_path})
-    except Exception as e:
-        await write_log("ffmpeg_error", {"error": str(e)})
-        converted_path = orig_path
 
-    # Step 2: transcribe using configured provider
-    transcription = await transcribe_audio(converted_path)
+# ========== BACKGROUND TRANSCRIPTION ==========
+async def transcribe_and_save(contents: bytes, safe_name: str, user_id: Optional[str]):
+    """Transcribe uploaded audio from memory, log, save."""
+    # Step 1: transcribe using configured provider (decoding happens in-process)
+    transcription = await transcribe_audio(contents)
 
-    # Step 3: save transcription to file
+    # Step 2: save transcription to file
     try:
         tpath = os.path.join(DATA_DIR, safe_name + ".txt")
         await asyncio.to_thread(lambda: open(tpath, "w").write(transcription))
@@ -262,7 +425,7 @@ async def upload_audio(file: UploadFile = File(...), user_id: Optional[str] = Fo
     contents = await file.read()
     await asyncio.to_thread(lambda: open(path, "wb").write(contents))
     await write_log("audio_received", {"file": safe_name, "user": user_id})
-    asyncio.create_task(transcribe_and_save(path, safe_name, user_id))
+    asyncio.create_task(transcribe_and_save(contents, safe_name, user_id))
     return {"ok": True, "filename": safe_name, "processing": True}
 
 @app.get("/transcription/{filename}")
@@ -289,7 +452,7 @@ class CreateSessionRequest(BaseModel):
 @app.post("/sessions")
 async def create_session_endpoint(req: CreateSessionRequest):
     """Create a new session with lead capture info"""
-    session = create_session(
+    session = await create_session(
         grade=req.grade,
         name=req.name,
         email=req.email,
@@ -298,8 +461,8 @@ async def create_session_endpoint(req: CreateSessionRequest):
     )
     await write_log("session_created", {"session_id": session.session_id, "grade": req.grade})
 
-    # Save lead to JSON and send email notification (background task)
-    asyncio.create_task(save_and_notify_lead(session))
+    # Save lead to JSON and send email notification (queued for the background writer)
+    await save_and_notify_lead(session)
 
     return {
         "ok": True,
@@ -312,7 +475,7 @@ async def create_session_endpoint(req: CreateSessionRequest):
 @app.get("/sessions/{session_id}")
 async def get_session_endpoint(session_id: str):
     """Get session details"""
-    session = get_session(session_id)
+    session = await get_session_async(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     return {"ok": True, "session": session.to_dict()}
@@ -321,9 +484,10 @@ async def get_session_endpoint(session_id: str):
 @app.get("/sessions/{session_id}/transcript")
 async def get_session_transcript(session_id: str):
     """Download conversation transcript as text"""
-    transcript = get_transcript_text(session_id)
-    if not transcript:
+    session = await get_session_async(session_id)
+    if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    transcript = get_transcript_text(session)
     return PlainTextResponse(
         content=transcript,
         media_type="text/plain",
@@ -331,6 +495,84 @@ async def get_session_transcript(session_id: str):
     )
 
 
+# ========== LEADS (sales team) ==========
+# /leads endpoints require a matching X-API-Token header; unset = endpoints disabled
+LEADS_API_TOKEN = os.getenv("LEADS_API_TOKEN", "")
+
+
+def _lead_filters(session_id, email, date_from, date_to, token) -> dict:
+    """Validate access and turn YYYY-MM-DD query params into store filters"""
+    if not LEADS_API_TOKEN:
+        # Fail closed: lead PII is never served without a configured token
+        raise HTTPException(status_code=503, detail="Lead endpoints are disabled (LEADS_API_TOKEN not set)")
+    if not token or not hmac.compare_digest(token.encode(), LEADS_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid API token")
+    try:
+        start = datetime.strptime(date_from, "%Y-%m-%d") if date_from else None
+        end = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1) if date_to else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    return {
+        "session_id": session_id,
+        "email": email,
+        "created_from": start.date().isoformat() if start else None,
+        "created_before": end.date().isoformat() if end else None,
+    }
+
+
+@app.get("/leads")
+async def list_leads(
+    session_id: Optional[str] = None,
+    email: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=500),
+    x_api_token: Optional[str] = Header(None),
+):
+    """Query leads (newest first) by session, email and/or date range"""
+    filters = _lead_filters(session_id, email, date_from, date_to, x_api_token)
+    leads, total = await asyncio.to_thread(
+        query_leads, limit=page_size, offset=(page - 1) * page_size, **filters
+    )
+    return {"ok": True, "leads": leads, "page": page, "page_size": page_size, "total": total}
+
+
+@app.get("/leads/export")
+async def export_leads(
+    format: str = Query("csv", pattern="^(csv|jsonl)$"),
+    session_id: Optional[str] = None,
+    email: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    x_api_token: Optional[str] = Header(None),
+):
+    """Stream all matching leads as CSV or JSONL"""
+    filters = _lead_filters(session_id, email, date_from, date_to, x_api_token)
+
+    def rows():
+        if format == "jsonl":
+            for lead in iter_leads(**filters):
+                yield json.dumps(lead, ensure_ascii=False) + "\n"
+            return
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(("id",) + LEAD_COLUMNS)
+        for lead in iter_leads(**filters):
+            writer.writerow([lead["id"]] + [lead[k] for k in LEAD_COLUMNS])
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        yield buf.getvalue()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=leads.{format}"}
+    )
+
+
 @app.get("/grades")
 async def get_grades():
     """Get list of available grades"""
@@ -361,10 +603,12 @@ async def ws_handler_chained(ws: WebSocket, session_id: Optional[str] = Query(No
     """
     WebSocket handler for CHAINED architecture.
     Flow: text/audio → STT → LLM → TTS → audio
+    LLM output is streamed to the client as "delta" frames and each sentence
+    is voiced as soon as it is complete ("audio_segment" frames, in order).
+    A "final" frame then carries the full reply and the joined audio.
     """
     await ws.accept()
-    session = get_session(session_id) if session_id else None
-    config = get_config()
+    session = await get_session_async(session_id) if session_id else None
     await write_log("ws_chained_open", {
         "client": str(ws.client),
         "session_id": session_id,
@@ -376,6 +620,9 @@ async def ws_handler_chained(ws: WebSocket, session_id: Optional[str] = Query(No
             msg = await ws.receive_json()
             msg_type = msg.get("type", "text")
 
+            # One config snapshot per turn, so a reload mid-turn cannot mix providers
+            config = get_config()
+
             # Handle text message
             if msg_type == "text":
                 text = msg.get("text", "")
@@ -389,14 +636,9 @@ async def ws_handler_chained(ws: WebSocket, session_id: Optional[str] = Query(No
                 if not audio_b64:
                     continue
 
-                # Decode and save audio
-                ts = int(datetime.utcnow().timestamp() * 1000)
-                audio_path = os.path.join(DATA_DIR, f"user-audio-{ts}.wav")
+                # Transcribe straight from memory
                 audio_data = base64.b64decode(audio_b64)
-                await asyncio.to_thread(lambda: open(audio_path, "wb").write(audio_data))
-
-                # Transcribe audio
-                text = await transcribe_audio(audio_path)
+                text = await transcribe_audio(audio_data, config=config)
                 await ws.send_json({"type": "transcription", "text": text})
                 await write_log("user_audio_transcribed", {"text": text, "session_id": session_id})
             else:
@@ -404,38 +646,69 @@ async def ws_handler_chained(ws: WebSocket, session_id: Optional[str] = Query(No
 
             # Add user message to session history
             if session:
-                session.add_turn("user", text)
+                await session.add_turn("user", text)
+
+            # Frequent standalone questions are answered from the cache (no LLM call)
+            first_turn = bool(session) and len(session.conversation) <= 1
+            cached_reply = None
+            language = "en"
+            prompt_session = session
+            if session and ANSWER_CACHE_ENABLED:
+                language = session_language(session, text)
+                cached_reply = answer_cache.lookup(session.grade, session.intent, language, text, first_turn)
+                if cached_reply:
+                    await write_log("answer_cache_hit", {"query": text[:100], "session_id": session_id})
+                elif first_turn and answer_cache.cacheable(text, generic=True):
+                    # Opening standalone question: answer without lead details so the reply is shareable
+                    prompt_session = anonymous_session(session)
+            generic = prompt_session is not session
+
+            # Call LLM with full context, forwarding deltas as they arrive.
+            # Each completed sentence goes to TTS while the LLM keeps generating.
+            turn_ts = int(datetime.utcnow().timestamp() * 1000)
+
+            async def synthesize_segment(segment: str, index: int) -> Optional[str]:
+                tts_text = clean_text_for_tts(segment)
+                if not tts_text:
+                    return None
+                path = await tts_save(tts_text, config=config)
+                return os.path.relpath(path, DATA_DIR) if path else None
+
+            async def send_segment(index: int, segment: str, seg_name: Optional[str]):
+                await ws.send_json({
+                    "type": "audio_segment",
+                    "index": index,
+                    "text": segment,
+                    "audio_url": f"/data/{seg_name}" if seg_name else None
+                })
 
-            # Call LLM with full context
+            pipeline = TTSPipeline(synthesize_segment, send_segment)
             try:
-                reply = await call_llm_with_session(session, text) if session else await call_llm([
-                    {"role": "user", "content": text}
-                ])
+                parts = []
+                if cached_reply:
+                    reply_stream = replay_answer(cached_reply)
+                else:
+                    reply_stream = stream_llm_with_session(prompt_session, text, config=config)
+                async for delta in reply_stream:
+                    parts.append(delta)
+                    await ws.send_json({"type": "delta", "text": delta})
+                    pipeline.feed(delta)
+                reply = "".join(parts)
 
                 await write_log("llm_response", {"preview": reply[:200], "session_id": session_id})
 
+                segments = await pipeline.finish()
+                await write_log("tts_segments_done", {"segments": len(segments), "session_id": session_id})
 
-                # Generate TTS audio
-                # Clean text for TTS (remove emojis and markdown)
-                import re
-                def clean_text_for_tts(text: str) -> str:
-                    # Remove emojis (regex for common ranges)
-                    text = re.sub(r'[\U00010000-\U0010ffff]', '', text)
-                    # Remove markdown asterisks (bold/italic) and hashes
-                    text = text.replace('*', '').replace('#', '')
-                    return text.strip()
-
-                tts_text = clean_text_for_tts(reply)
-
-                
+                # Join the segments into one file for replay and the session transcript
                 fname = None
                 audio_url = None
-                
-                if tts_text:
-                    ts = int(datetime.utcnow().timestamp() * 1000)
-                    fname = f"ai-audio-{ts}.mp3"
+                seg_paths = [os.path.join(DATA_DIR, name) for _, _, name in segments if name]
+
+                if seg_paths:
+                    fname = f"ai-audio-{turn_ts}.mp3"
                     try:
-                        await tts_save(tts_text, fname)
+                        await asyncio.to_thread(join_segments, seg_paths, os.path.join(DATA_DIR, fname))
                         audio_url = f"/data/{fname}"
                     except Exception as e:
                         await write_log("tts_error", {"error": str(e)})
@@ -443,14 +716,19 @@ async def ws_handler_chained(ws: WebSocket, session_id: Optional[str] = Query(No
 
                 # Add assistant response to session history
                 if session:
-                    session.add_turn("assistant", reply, audio_file=fname)
+                    await session.add_turn("assistant", reply, audio_file=fname)
+                    update_memory_summary(session, config)
+                    if not cached_reply:
+                        remember_answer(session, text, reply, language, generic)
 
                 await ws.send_json({
                     "type": "final",
                     "text": reply,
-                    "audio_url": audio_url
+                    "audio_url": audio_url,
+                    "cached": bool(cached_reply)
                 })
             except Exception as e:
+                await pipeline.cancel()
                 error_msg = str(e)
                 await write_log("llm_tts_error", {"error": error_msg, "session_id": session_id})
                 await ws.send_json({
@@ -470,13 +748,21 @@ async def ws_handler_chained(ws: WebSocket, session_id: Optional[str] = Query(No
 
 # ========== WEBSOCKET: REALTIME ARCHITECTURE ==========
 @app.websocket("/ws/realtime")
-async def ws_handler_realtime(ws: WebSocket, session_id: Optional[str] = Query(None)):
+async def ws_handler_realtime(
+    ws: WebSocket,
+    session_id: Optional[str] = Query(None),
+    audio: str = Query("json"),
+):
     """
     WebSocket handler for REALTIME (speech-to-speech) architecture.
     Proxies audio to/from OpenAI Realtime API.
+
+    Mic audio may arrive as base64 JSON or as binary PCM16 frames (see
+    audio_frames.py). Reply audio goes out as base64 JSON, or as binary
+    frames with ?audio=binary.
     """
     await ws.accept()
-    session = get_session(session_id) if session_id else None
+    session = await get_session_async(session_id) if session_id else None
 
     if not session:
         await ws.send_json({"type": "error", "message": "Session required for realtime mode"})
@@ -490,8 +776,8 @@ async def ws_handler_realtime(ws: WebSocket, session_id: Optional[str] = Query(N
     })
 
     # Create realtime handler
-    realtime = RealtimeHandler(session)
-    connected = await realtime.connect()
+    realtime = RealtimeHandler(session, record_dir=DATA_DIR)
+    connected = await realtime.connect(pool=realtime_pool)
 
     if not connected:
         await ws.send_json({"type": "error", "message": "Failed to connect to OpenAI Realtime API"})
@@ -500,50 +786,147 @@ async def ws_handler_realtime(ws: WebSocket, session_id: Optional[str] = Query(N
 
     await ws.send_json({"type": "connected", "message": "Realtime session established"})
 
+    # Each direction gets a bounded queue and its own sender task, so a slow
+    # browser never stalls the upstream reader (and the other way round)
+    binary_audio = audio == "binary"
+    out_seq = 0
+
+    async def send_downstream(kind: str, payload):
+        nonlocal out_seq
+        if kind == "audio":
+            if binary_audio:
+                # One decode, then raw bytes: a third smaller than base64
+                await ws.send_bytes(pack_frame(base64.b64decode(payload), out_seq))
+                out_seq += 1
+            else:
+                # Pass the upstream base64 through untouched
+                await ws.send_text('{"type":"audio","audio":"' + payload + '"}')
+        elif kind == "close":
+            await ws.close(code=payload)
+        else:
+            await ws.send_json(payload)
+
+    async def send_upstream(kind: str, payload):
+        if kind == "audio":
+            await realtime.send_audio_b64(payload)
+        else:
+            # Control actions run in order with the audio queued before them
+            await payload()
+
+    downstream = SendQueue("downstream", send_downstream, REALTIME_DOWNSTREAM_MAX_KB * 1024)
+    upstream = SendQueue("upstream", send_upstream, REALTIME_UPSTREAM_MAX_KB * 1024)
+    connection_id = f"{session_id}:{id(ws):x}"
+    register_queues(connection_id, upstream=upstream, downstream=downstream)
+    downstream.start()
+    upstream.start()
+
     # Set up callbacks to forward events to client
-    async def on_audio(audio_chunk: bytes):
-        audio_b64 = base64.b64encode(audio_chunk).decode("utf-8")
-        await ws.send_json({"type": "audio", "audio": audio_b64})
+    async def on_audio(audio_b64: str):
+        downstream.put_audio(audio_b64)
 
     async def on_text(text: str):
-        await ws.send_json({"type": "transcript", "text": text})
-        if session:
-            session.add_turn("assistant", text)
+        downstream.put("json", {"type": "transcript", "text": text})
+
+    async def on_turn(text: str, heard_ms: Optional[int], audio_file: Optional[str]):
+        # Recorded once played in full, or cut to what was heard on barge-in
+        await session.add_turn("assistant", text, audio_file=audio_file, heard_ms=heard_ms)
+
+    async def on_user_turn(text: str):
+        # Typed text or the transcript of a spoken turn, in conversation order
+        await session.add_turn("user", text)
+
+    async def on_interrupt(heard_ms: int):
+        # Drop reply audio not yet sent and tell the client to drop what it has buffered
+        downstream.clear_audio()
+        downstream.put("json", {"type": "audio_flush", "audio_end_ms": heard_ms})
+        await write_log("realtime_interrupted", {"heard_ms": heard_ms, "session_id": session_id})
+
+    async def on_status(status: str, info: dict):
+        # Upstream dropped: mic audio keeps queueing (bounded) until it is back
+        downstream.put("json", {"type": "upstream_status", "status": status, **info})
+        await write_log("realtime_upstream_" + status, {**info, "session_id": session_id})
+        if status == "failed":
+            downstream.put("json", {"type": "error", "message": "Lost connection to OpenAI Realtime API"})
+            downstream.put("close", 1011)
 
     realtime.on_audio(on_audio)
     realtime.on_text(on_text)
+    realtime.on_turn(on_turn)
+    realtime.on_user_turn(on_user_turn)
+    realtime.on_interrupt(on_interrupt)
+    realtime.on_status(on_status)
 
-    # Start listening to realtime events in background
-    listen_task = asyncio.create_task(realtime.listen())
+    # Listen to realtime events in background, reconnecting if the upstream drops
+    listen_task = asyncio.create_task(realtime.run())
+
+    def send_user_text(text: str):
+        async def action():
+            # Typing while the reply plays interrupts it (and records it first)
+            await realtime.interrupt()
+            await realtime.send_text(text)
+        return action
 
     try:
         while True:
-            msg = await ws.receive_json()
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if upstream.closed or downstream.closed:
+                break
+
+            if message.get("bytes") is not None:
+                # Binary frame: header + raw PCM16
+                try:
+                    _, flags, _, payload = parse_frame(message["bytes"])
+                except FrameError as e:
+                    downstream.put("json", {"type": "error", "message": f"Bad audio frame: {e}"})
+                    continue
+                if payload:
+                    upstream.put_audio(base64.b64encode(payload).decode("ascii"))
+                if flags & FLAG_COMMIT:
+                    upstream.put("control", realtime.commit_audio)
+                continue
+
+            msg = json.loads(message.get("text") or "{}")
             msg_type = msg.get("type", "")
 
             if msg_type == "audio":
-                # Forward audio to realtime API
+                # Forward audio to realtime API without decoding it
                 audio_b64 = msg.get("audio", "")
-                if audio_b64:
-                    audio_data = base64.b64decode(audio_b64)
-                    await realtime.send_audio(audio_data)
+                if audio_b64 and is_base64(audio_b64):
+                    upstream.put_audio(audio_b64)
 
             elif msg_type == "audio_commit":
                 # Commit audio buffer
-                await realtime.commit_audio()
+                upstream.put("control", realtime.commit_audio)
 
             elif msg_type == "text":
                 # Send text directly
                 text = msg.get("text", "")
                 if text:
-                    if session:
-                        session.add_turn("user", text)
-                    await realtime.send_text(text)
+                    upstream.put("control", send_user_text(text))
+
+            elif msg_type == "interrupt":
+                # Client-side barge-in (e.g. a stop button)
+                upstream.put("control", realtime.interrupt)
 
     except WebSocketDisconnect:
         await write_log("ws_realtime_close", {"client": str(ws.client), "session_id": session_id})
     except Exception as e:
         await write_log("ws_realtime_error", {"error": str(e), "session_id": session_id})
     finally:
-        listen_task.cancel()
-        await realtime.disconnect()
\ No newline at end of file
+        await upstream.close()
+        await realtime.disconnect()
+        try:
+            # Let the listener record the last reply before it exits
+            await asyncio.wait_for(listen_task, timeout=2)
+        except (asyncio.TimeoutError, asyncio.CancelledError, Exception):
+            listen_task.cancel()
+        await downstream.close()
+        unregister_queues(connection_id)
+        await write_log("realtime_queue_stats", {
+            "session_id": session_id,
+            "reconnects": realtime.reconnects,
+            "upstream": upstream.stats(),
+            "downstream": downstream.stats(),
+        })
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Token-budgeted Conversation Memory
+
+The LLM sees recent turns as real chat messages, newest first until the
+model's history budget is used up. Turns that fall out of that window are
+folded into a rolling summary by a background LLM call, so the prompt stays
+bounded however long the conversation runs. Until the summary covers them,
+those turns stay in the prompt (up to UNSUMMARIZED_BUDGET_FACTOR x the
+budget), so the model never loses context in between:
+
+    system (static prefix + lead info + summary) | recent turns | current query
+"""
+import os
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .session_manager import Session, update_session
+
+
+# Rough bytes-per-token ratio (no tokenizer dependency)
+BYTES_PER_TOKEN = 4
+# Per-message overhead of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# History budget (tokens) by model name prefix; longest match wins
+MODEL_HISTORY_BUDGETS = {
+    "gpt-4.1": 4000,
+    "gpt-4o": 3000,
+    "gpt-4o-mini": 3000,
+    "mistralai/": 1500,
+}
+DEFAULT_HISTORY_BUDGET = 1500
+# Overrides the per-model budget when > 0
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "0"))
+
+# Summarize once this many turns have dropped out of the history window
+MEMORY_SUMMARY_TRIGGER_TURNS = int(os.getenv("MEMORY_SUMMARY_TRIGGER_TURNS", "4"))
+# Cap on the summary kept in the prompt
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "300"))
+# Turns not summarized yet may stretch the history to this multiple of the budget
+UNSUMMARIZED_BUDGET_FACTOR = 2
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a parent/student and "
+    "Vikalp AI, a school counselor and tutor. Merge the new turns into the existing "
+    "summary. Keep facts the assistant will need later: the child's needs, questions "
+    "asked, answers and figures given, preferred language, follow-ups promised. "
+    f"Write plain sentences, at most {MEMORY_SUMMARY_MAX_TOKENS * 3 // 4} words."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text.encode("utf-8")) // BYTES_PER_TOKEN
+
+
+def history_budget(model: Optional[str] = None) -> int:
+    """Token budget for chat history for the given model"""
+    if MEMORY_TOKEN_BUDGET > 0:
+        return MEMORY_TOKEN_BUDGET
+    matches = [prefix for prefix in MODEL_HISTORY_BUDGETS if model and model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_HISTORY_BUDGET
+    return MODEL_HISTORY_BUDGETS[max(matches, key=len)]
+
+
+def _history_end(session: Session, user_query: str) -> int:
+    """Index after the last past turn (the current query is usually already recorded)"""
+    turns = session.conversation
+    if turns and turns[-1].role == "user" and turns[-1].text == user_query:
+        return len(turns) - 1
+    return len(turns)
+
+
+def _window(session: Session, end: int, budget: int) -> int:
+    """Start index of the newest turns before `end` that fit in budget"""
+    used = 0
+    start = end
+    while start > session.summary_upto:
+        cost = estimate_tokens(session.conversation[start - 1].text or "") + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > budget and start < end:
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+def select_history(session: Session, user_query: str, budget: int) -> List[Dict[str, str]]:
+    """Recent turns as chat messages: the budget's worth, plus any older turns not summarized yet"""
+    end = _history_end(session, user_query)
+    # _window never goes below summary_upto, so the stretch only covers unsummarized turns
+    start = _window(session, end, budget * UNSUMMARIZED_BUDGET_FACTOR)
+    max_chars = budget * BYTES_PER_TOKEN
+    messages = []
+    for turn in session.conversation[start:end]:
+        text = turn.text or ""
+        if len(text) > max_chars:
+            # A single oversized turn still must not blow the budget
+            text = text[:max_chars] + "…"
+        messages.append({"role": "assistant" if turn.role == "assistant" else "user", "content": text})
+    return messages
+
+
+def summary_text(session: Session) -> str:
+    """The rolling summary, capped for the prompt"""
+    summary = (session.summary or "").strip()
+    max_chars = MEMORY_SUMMARY_MAX_TOKENS * BYTES_PER_TOKEN
+    return summary[:max_chars]
+
+
+# ========== Rolling summary ==========
+_summarizing: Set[str] = set()
+
+
+def _turns_to_fold(session: Session, budget: int) -> Tuple[int, int]:
+    """(first, end) of turns outside the history window not yet summarized"""
+    end = _history_end(session, "")
+    start = _window(session, end, budget)
+    return session.summary_upto, start
+
+
+def schedule_summary(
+    session: Session,
+    summarize: Callable[[List[dict]], Awaitable[str]],
+    budget: int,
+) -> Optional[asyncio.Task]:
+    """Start a background summary update if enough turns left the window"""
+    first, end = _turns_to_fold(session, budget)
+    # Also summarize early if unsummarized turns no longer fit the stretched window
+    overflowing = _window(session, _history_end(session, ""), budget * UNSUMMARIZED_BUDGET_FACTOR) > first
+    if end <= first or session.session_id in _summarizing:
+        return None
+    if end - first < MEMORY_SUMMARY_TRIGGER_TURNS and not overflowing:
+        return None
+    _summarizing.add(session.session_id)
+    task = asyncio.create_task(_update_summary(session, summarize, first, end))
+    task.add_done_callback(lambda _: _summarizing.discard(session.session_id))
+    return task
+
+
+async def _update_summary(session: Session, summarize: Callable[[List[dict]], Awaitable[str]], first: int, end: int):
+    lines = []
+    for turn in session.conversation[first:end]:
+        role_label = "Parent/Student" if turn.role == "user" else "Vikalp AI"
+        lines.append(f"{role_label}: {turn.text}")
+    messages = [
+        {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+        {"role": "user", "content": (
+            f"Summary so far:\n{session.summary or '(none)'}\n\n"
+            f"New turns:\n" + "\n".join(lines)
+        )},
+    ]
+    try:
+        summary = (await summarize(messages)).strip()
+    except Exception as e:
+        print(f"[MEMORY] Summary failed for {session.session_id}: {e}")
+        return
+    if summary:
+        session.summary = summary
+        session.summary_upto = end
+        await update_session(session.session_id, summary=summary, summary_upto=end)
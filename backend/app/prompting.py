@@ -1,18 +1,23 @@
 """Prompting Strategy for Vikalp AI Voice Tutor
 Implements the 5-part prompt structure: Actor, Context, Mission, Actions, Response
+
+The system prompt is assembled so that providers can cache its prefix:
+1. Static instructions (persona, mission, actions, response rules)
+2. Grade header for the session's (grade, intent), precomputed once
+3. Per-turn content last: knowledge sections retrieved for the query, lead
+   info and rolling summary, then recent turns
+   as chat messages and the current query (see memory.py)
 """
-from typing import Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
 from .session_manager import Session
-from .grade_context import load_grade_context
+from .grade_context import load_grade_context, on_context_invalidated
+from .memory import BYTES_PER_TOKEN, history_budget, select_history, summary_text
+from .retrieval import RETRIEVAL_ENABLED, retrieve_context, get_index
 
 
-def build_system_prompt(session: Session, user_query: str) -> str:
-    """Build the complete system prompt using 5-part structure"""
-    
-    grade_context = load_grade_context(session.grade) or "(Grade context not available)"
-    memory_snippets = session.get_memory_snippets(max_turns=10)
-    
-    prompt = f"""
+STATIC_INSTRUCTIONS = """
 Part 1: Actor:
 
 You are Vikalp AI Voice Tutor, an expert educational counselor and grade-specific academic tutor working at Vikalp Online School (CBSE/NIOS).
@@ -37,32 +42,9 @@ ALWAYS provides SHORT, TO-THE-POINT responses (2-3 sentences maximum unless spec
 
 CRITICAL: Always respond in ENGLISH by default. Only use Hindi if the user explicitly requests it.
 
-Part 2: Context:
-Context Includes:
-
-Grade Selected: {session.grade}
-
-Grade-Specific Knowledge Provided:
-{grade_context}
-
-Parent/Student Lead Info:
-
-Name: {session.name}
-
-Email: {session.email}
-
-Mobile: {session.mobile}
-
-What they are looking for: {session.intent}
+2. User Intent:
 
-Conversation Memory (Transcript so far):
-{memory_snippets}
-
-2. User Intent (from current query):
-
-{user_query}
-
-Interpret the user's message to understand:
+Interpret the user's latest message to understand:
 
 What they are trying to learn / ask
 
@@ -159,18 +141,140 @@ Be clear, friendly, and conversational.
 
 DO NOT write long paragraphs. Keep responses SHORT (under 50 words unless user asks for details).
 
-If user asks for Hindi, translate your English answer to Hindi - same content, different language."""
-    return prompt.strip()
+If user asks for Hindi, translate your English answer to Hindi - same content, different language.
+""".strip()
+
+
+def _full_grade_context(grade: str) -> str:
+    return (load_grade_context(grade) or "(Grade context not available)").strip()
+
 
+@lru_cache(maxsize=64)
+def get_prompt_prefix(grade: str, intent: str) -> str:
+    """Static instructions + grade header for (grade, intent), built once.
+
+    With retrieval disabled the whole grade file is part of the prefix;
+    otherwise the sections relevant to each query follow it (see retrieval.py).
+    """
+    knowledge = "" if RETRIEVAL_ENABLED else f"""
+Grade-Specific Knowledge Provided:
+{_full_grade_context(grade)}
+"""
+    context = f"""
+Part 2: Context:
+Context Includes:
 
-def build_messages_for_llm(session: Session, user_query: str) -> list:
+Grade Selected: {grade}
+{knowledge}
+What they are looking for: {intent}"""
+    return STATIC_INSTRUCTIONS + "\n\n" + context.strip()
+
+
+# Grade files changed: drop prefixes built from the old content
+on_context_invalidated(get_prompt_prefix.cache_clear)
+
+
+@dataclass
+class PromptParts:
+    """One turn's prompt: cacheable prefix, per-turn system tail, chat history, query"""
+    prefix: str
+    knowledge: str
+    lead_info: str
+    summary: str
+    history: List[Dict[str, str]]
+    query: str
+
+    def volatile(self) -> str:
+        blocks = []
+        if self.knowledge:
+            blocks.append(f"Grade-Specific Knowledge Provided:\n{self.knowledge}")
+        blocks.append(f"Parent/Student Lead Info:\n\n{self.lead_info}")
+        if self.summary:
+            blocks.append(f"Summary of Earlier Conversation:\n{self.summary}")
+        return "\n\n".join(blocks)
+
+    def system_prompt(self) -> str:
+        return self.prefix + "\n\n" + self.volatile()
+
+    def transcript(self) -> str:
+        """History as text, for prompts that cannot carry chat messages"""
+        if not self.history:
+            return "(No conversation history yet)"
+        return "\n".join(
+            f"{'Vikalp AI' if m['role'] == 'assistant' else 'Parent/Student'}: {m['content']}"
+            for m in self.history
+        )
+
+    def messages(self) -> List[Dict[str, str]]:
+        """System prompt, recent turns as chat messages, then the query once"""
+        return (
+            [{"role": "system", "content": self.system_prompt()}]
+            + self.history
+            + [{"role": "user", "content": self.query}]
+        )
+
+    def sizes(self) -> Dict[str, dict]:
+        """Byte and approximate token size of each part"""
+        parts = {
+            "instructions": STATIC_INSTRUCTIONS,
+            "grade_header": self.prefix[len(STATIC_INSTRUCTIONS):],
+            "knowledge": self.knowledge,
+            "lead_info": self.lead_info,
+            "summary": self.summary,
+            "history": "".join(m["content"] for m in self.history),
+            "query": self.query,
+        }
+        sizes = {}
+        for name, text in parts.items():
+            size = len(text.encode("utf-8"))
+            sizes[name] = {"bytes": size, "approx_tokens": size // BYTES_PER_TOKEN}
+        sizes["history"]["messages"] = len(self.history)
+        return sizes
+
+
+# Sizes of the most recently built prompt (see prompt_stats)
+_last_sizes: Optional[Dict[str, dict]] = None
+
+
+def build_prompt_parts(session: Session, user_query: str, model: Optional[str] = None) -> PromptParts:
+    """Assemble the prompt parts for one turn (history sized to the model's budget)"""
+    global _last_sizes
+    knowledge = ""
+    if RETRIEVAL_ENABLED:
+        # No query (e.g. realtime instructions set once per call): use the whole file
+        knowledge = (retrieve_context(session.grade, user_query) if user_query else None) \
+            or _full_grade_context(session.grade)
+    parts = PromptParts(
+        prefix=get_prompt_prefix(session.grade, session.intent),
+        knowledge=knowledge,
+        lead_info=f"Name: {session.name}\n\nEmail: {session.email}\n\nMobile: {session.mobile}",
+        summary=summary_text(session),
+        history=select_history(session, user_query, history_budget(model)),
+        query=user_query,
+    )
+    _last_sizes = parts.sizes()
+    return parts
+
+
+def build_system_prompt(session: Session, user_query: str, model: Optional[str] = None) -> str:
+    """Build the complete system prompt using 5-part structure, history included as text"""
+    parts = build_prompt_parts(session, user_query, model)
+    prompt = parts.system_prompt() + "\n\nConversation Memory (Transcript so far):\n" + parts.transcript()
+    if user_query:
+        prompt += "\n\nCurrent Query:\n\n" + user_query
+    return prompt
+
+
+def prompt_stats() -> dict:
+    info = get_prompt_prefix.cache_info()
+    return {
+        "prefix_cache": {"hits": info.hits, "misses": info.misses, "entries": info.currsize},
+        "retrieval": get_index().stats() if RETRIEVAL_ENABLED else None,
+        "last_prompt": _last_sizes,
+    }
+
+
+def build_messages_for_llm(session: Session, user_query: str, model: Optional[str] = None) -> list:
     """Build messages array for LLM API call"""
-    system_prompt = build_system_prompt(session, user_query)
-    
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_query}
-    ]
-    
-    return messages
+    return build_prompt_parts(session, user_query, model).messages()
 
@@ -11,17 +11,66 @@ Transport: WebSocket
 """
 import os
 import json
+import time
+import random
 import asyncio
 import base64
-from typing import Optional, Callable, Any
+from collections import deque
+from typing import Optional, Callable, Any, Deque
 from dataclasses import dataclass
 import websockets
-from .voice_config import get_config
+from .voice_config import VoiceConfig, get_config
+from .audio_frames import b64_decoded_len
+from .audio_recorder import WavRecorder, REALTIME_RECORD_AUDIO
 from .session_manager import Session
+from .realtime_pool import RealtimePool
 
 
-# OpenAI Realtime API WebSocket endpoint
-OPENAI_REALTIME_WS = "wss://api.openai.com/v1/realtime"
+# OpenAI Realtime API WebSocket endpoint (overridable, e.g. for a local fake server)
+OPENAI_REALTIME_WS = os.getenv("REALTIME_WS_URL", "wss://api.openai.com/v1/realtime")
+
+# pcm16 output: 24 kHz mono, 2 bytes per sample
+PCM16_BYTES_PER_MS = 48
+
+# Reconnect after an upstream drop: exponential backoff from BASE up to MAX seconds
+REALTIME_RECONNECT_ATTEMPTS = int(os.getenv("REALTIME_RECONNECT_ATTEMPTS", "6"))
+REALTIME_RECONNECT_BASE_DELAY = 0.5
+REALTIME_RECONNECT_MAX_DELAY = 8.0
+
+# A spoken user turn whose transcript has not arrived after this long is skipped,
+# so it cannot hold back the turns recorded after it
+TRANSCRIPT_WAIT_SECONDS = 15
+
+
+def session_defaults(config: VoiceConfig) -> dict:
+    """Session settings shared by every conversation (everything but instructions)"""
+    return {
+        "modalities": ["text", "audio"],
+        "voice": config.realtime_voice,
+        "input_audio_format": "pcm16",
+        "output_audio_format": "pcm16",
+        "input_audio_transcription": {
+            "model": "whisper-1"
+        },
+        "turn_detection": {
+            "type": "server_vad",
+            "threshold": 0.5,
+            "prefix_padding_ms": 300,
+            "silence_duration_ms": 500
+        }
+    }
+
+
+async def open_realtime_socket(config: VoiceConfig) -> Any:
+    """Connect to the Realtime API and apply the session defaults (also used by the pool)"""
+    url = f"{OPENAI_REALTIME_WS}?model={config.realtime_model}"
+    headers = {
+        "Authorization": f"Bearer {config.openai_api_key}",
+        "OpenAI-Beta": "realtime=v1",
+    }
+    ws = await websockets.connect(url, additional_headers=headers)
+    await ws.send(json.dumps({"type": "session.update", "session": session_defaults(config)}))
+    return ws
 
 
 @dataclass
@@ -43,32 +92,64 @@ class RealtimeHandler:
     - Event handling
     """
     
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, record_dir: Optional[str] = None):
         self.session = session
+        # Reply audio is saved here as .wav (None = not recorded)
+        self.record_dir = record_dir if REALTIME_RECORD_AUDIO else None
         self.config = get_config()
         self.ws: Any = None
         self.is_connected = False
-        self._audio_callback: Optional[Callable[[bytes], Any]] = None
+        # Receives reply audio as base64 PCM16, exactly as upstream sent it
+        self._audio_callback: Optional[Callable[[str], Any]] = None
         self._text_callback: Optional[Callable[[str], Any]] = None
-    
-    async def connect(self) -> bool:
-        """Establish WebSocket connection to OpenAI Realtime API"""
+        self._turn_callback: Optional[Callable[[str, Optional[int], Optional[str]], Any]] = None
+        self._user_turn_callback: Optional[Callable[[str], Any]] = None
+        self._interrupt_callback: Optional[Callable[[int], Any]] = None
+        self._status_callback: Optional[Callable[[str, dict], Any]] = None
+
+        # Supervision: set while the upstream socket is usable (or for good closed),
+        # so sends during a reconnect wait instead of being lost
+        self._pool: Optional[RealtimePool] = None
+        self._online = asyncio.Event()
+        self._closing = False
+
+        # Latest response, tracked until the client has played it (for barge-in)
+        self._response_id: Optional[str] = None
+        self._response_active = False
+        self._item_id: Optional[str] = None
+        self._content_index = 0
+        self._audio_bytes = 0
+        self._playback_started: Optional[float] = None
+        self._transcript = ""
+        self._recorder: Optional[WavRecorder] = None
+        # Responses cancelled by barge-in; their late deltas are dropped
+        self._cancelled: set = set()
+        # Turns in conversation order, reported once complete: [role, item_id, args, ready, queued_at].
+        # Spoken user turns wait for their transcript, which can arrive after the reply started.
+        self._turn_log: Deque[list] = deque()
+
+        # Metrics
+        self.interruptions = 0
+        self.dropped_audio_bytes = 0
+        self.reconnects = 0
+
+    async def connect(self, pool: Optional[RealtimePool] = None) -> bool:
+        """Establish WebSocket connection to OpenAI Realtime API (prewarmed from the pool if given)"""
         if not self.config.openai_api_key:
             return False
         
-        url = f"{OPENAI_REALTIME_WS}?model={self.config.realtime_model}"
-        headers = {
-            "Authorization": f"Bearer {self.config.openai_api_key}",
-            "OpenAI-Beta": "realtime=v1",
-        }
-        
+        self._pool = pool
         try:
-            self.ws = await websockets.connect(url, extra_headers=headers)
+            if pool:
+                self.ws = await pool.acquire(self.config)
+            else:
+                self.ws = await open_realtime_socket(self.config)
             self.is_connected = True
             
-            # Configure session
+            # Arm the session with this conversation's instructions
             await self._configure_session()
             
+            self._online.set()
             return True
         except Exception as e:
             print(f"[Realtime] Connection failed: {e}")
@@ -76,7 +157,7 @@ class RealtimeHandler:
             return False
     
     async def _configure_session(self):
-        """Send session configuration to Realtime API"""
+        """Send this conversation's instructions (the socket already has the defaults)"""
         from .prompting import build_system_prompt
         
         system_prompt = build_system_prompt(self.session, "")
@@ -84,56 +165,77 @@ class RealtimeHandler:
         config_event = {
             "type": "session.update",
             "session": {
-                "modalities": ["text", "audio"],
-                "instructions": system_prompt,
-                "voice": self.config.realtime_voice,
-                "input_audio_format": "pcm16",
-                "output_audio_format": "pcm16",
-                "input_audio_transcription": {
-                    "model": "whisper-1"
-                },
-                "turn_detection": {
-                    "type": "server_vad",
-                    "threshold": 0.5,
-                    "prefix_padding_ms": 300,
-                    "silence_duration_ms": 500
-                }
+                "instructions": system_prompt
             }
         }
         
         await self.ws.send(json.dumps(config_event))
     
-    async def send_audio(self, audio_data: bytes):
-        """Send audio data to Realtime API"""
-        if not self.is_connected or not self.ws:
-            return
-        
-        # Encode audio as base64
-        audio_b64 = base64.b64encode(audio_data).decode("utf-8")
+    async def _resume_session(self):
+        """
+        Re-arm a replacement socket: instructions with the rolling summary, then
+        the recent turns (within the history budget) as conversation items.
+        """
+        from .prompting import build_prompt_parts
         
-        event = {
-            "type": "input_audio_buffer.append",
-            "audio": audio_b64
-        }
-        
-        await self.ws.send(json.dumps(event))
+        parts = build_prompt_parts(self.session, "", model=self.config.realtime_model)
+        await self.ws.send(json.dumps({
+            "type": "session.update",
+            "session": {"instructions": parts.system_prompt()}
+        }))
+        for message in parts.history:
+            user = message["role"] == "user"
+            await self.ws.send(json.dumps({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "message",
+                    "role": message["role"],
+                    "content": [{"type": "input_text" if user else "text", "text": message["content"]}]
+                }
+            }))
+    
+    async def _send(self, payload: str, wait: bool = True):
+        """
+        Send an event upstream. With wait, a send during a reconnect waits for
+        the new socket (the caller's queue buffers meanwhile); without it,
+        the event is dropped if the socket is gone.
+        """
+        while True:
+            if wait:
+                await self._online.wait()
+            if not self.is_connected or not self.ws:
+                return
+            ws = self.ws
+            try:
+                await ws.send(payload)
+                return
+            except websockets.exceptions.ConnectionClosed:
+                if not wait or self._closing:
+                    return
+                # The listener notices the drop and reconnects; a socket that
+                # run() already replaced must not take the new one offline
+                if self.ws is ws:
+                    self._online.clear()
+    
+    async def send_audio(self, audio_data: bytes):
+        """Send raw PCM16 audio to Realtime API"""
+        await self.send_audio_b64(base64.b64encode(audio_data).decode("ascii"))
+
+    async def send_audio_b64(self, audio_b64: str):
+        """Send base64 PCM16 audio to Realtime API (passed through as-is)"""
+        # Base64 needs no JSON escaping, so skip json.dumps on large payloads
+        await self._send('{"type":"input_audio_buffer.append","audio":"' + audio_b64 + '"}')
     
     async def commit_audio(self):
         """Commit audio buffer and request response"""
-        if not self.is_connected or not self.ws:
-            return
-        
         # Commit the audio buffer
-        await self.ws.send(json.dumps({"type": "input_audio_buffer.commit"}))
+        await self._send(json.dumps({"type": "input_audio_buffer.commit"}))
         
         # Request response
-        await self.ws.send(json.dumps({"type": "response.create"}))
+        await self._send(json.dumps({"type": "response.create"}))
     
     async def send_text(self, text: str):
         """Send text message to Realtime API"""
-        if not self.is_connected or not self.ws:
-            return
-        
         event = {
             "type": "conversation.item.create",
             "item": {
@@ -142,39 +244,194 @@ class RealtimeHandler:
                 "content": [{"type": "input_text", "text": text}]
             }
         }
-        await self.ws.send(json.dumps(event))
-        await self.ws.send(json.dumps({"type": "response.create"}))
+        await self._send(json.dumps(event))
+        # Logged once sent, so a resume during the send does not replay it twice
+        await self._log_user_text(None, text)
+        await self._send(json.dumps({"type": "response.create"}))
     
-    def on_audio(self, callback: Callable[[bytes], Any]):
-        """Set callback for audio output"""
+    def on_audio(self, callback: Callable[[str], Any]):
+        """Set callback for audio output (base64 PCM16, not decoded)"""
         self._audio_callback = callback
 
     def on_text(self, callback: Callable[[str], Any]):
         """Set callback for text output"""
         self._text_callback = callback
 
+    def on_turn(self, callback: Callable[[str, Optional[int], Optional[str]], Any]):
+        """Set callback recording a finished reply: (text heard, ms heard or None if played in full, audio file)"""
+        self._turn_callback = callback
+
+    def on_user_turn(self, callback: Callable[[str], Any]):
+        """Set callback recording a user turn (typed, or the transcript of a spoken one), in order"""
+        self._user_turn_callback = callback
+
+    def on_interrupt(self, callback: Callable[[int], Any]):
+        """Set callback for barge-in (ms of audio heard); the client should flush its playback"""
+        self._interrupt_callback = callback
+
+    def on_status(self, callback: Callable[[str, dict], Any]):
+        """Set callback for upstream status: reconnecting / reconnected / failed"""
+        self._status_callback = callback
+
+    async def _status(self, status: str, **info):
+        if self._status_callback:
+            await self._status_callback(status, info)
+
+    def _reset_response(self, response_id: Optional[str] = None):
+        self._response_id = response_id
+        self._response_active = response_id is not None
+        self._item_id = None
+        self._content_index = 0
+        self._audio_bytes = 0
+        self._playback_started = None
+        self._transcript = ""
+        self._recorder = None
+
+    def _sent_ms(self) -> int:
+        return self._audio_bytes // PCM16_BYTES_PER_MS
+
+    def _heard_ms(self) -> int:
+        """Audio the client has played so far: what we sent, capped by wall-clock time since it started"""
+        if self._playback_started is None:
+            return 0
+        elapsed_ms = int((time.monotonic() - self._playback_started) * 1000)
+        return min(self._sent_ms(), elapsed_ms)
+
+    def _heard_text(self, heard_ms: int) -> str:
+        """Transcript cut to roughly the share of audio that was heard"""
+        sent_ms = self._sent_ms()
+        if not self._transcript or heard_ms >= sent_ms:
+            return self._transcript.strip()
+        cut = int(len(self._transcript) * heard_ms / max(sent_ms, 1))
+        text = self._transcript[:cut].rsplit(" ", 1)[0].strip()
+        return text + "…" if text else ""
+
+    def _log_user_item(self, item_id: str):
+        """A spoken user turn was committed; its transcript follows later"""
+        self._turn_log.append(["user", item_id, None, False, time.monotonic()])
+
+    async def _log_user_text(self, item_id: Optional[str], text: Optional[str]):
+        """Transcript for a logged user item (None = transcription failed), or a typed turn"""
+        for entry in self._turn_log:
+            if entry[0] == "user" and item_id and entry[1] == item_id:
+                entry[2], entry[3] = text, True
+                break
+        else:
+            if item_id:
+                return  # Not ours (e.g. committed on a previous socket)
+            self._turn_log.append(["user", None, text, True, time.monotonic()])
+        await self._flush_turns()
+
+    async def _flush_turns(self, drop_pending: bool = False):
+        """Report turns from the head of the log while they are complete"""
+        while self._turn_log:
+            role, _, args, ready, queued_at = self._turn_log[0]
+            if not ready and not drop_pending and time.monotonic() - queued_at < TRANSCRIPT_WAIT_SECONDS:
+                return
+            self._turn_log.popleft()
+            if not ready or not args:
+                continue
+            if role == "user":
+                if self._user_turn_callback:
+                    await self._user_turn_callback(args)
+            elif self._turn_callback:
+                await self._turn_callback(*args)
+
+    async def _record_turn(self, recorder: Optional[WavRecorder], text: str, heard_ms: Optional[int]):
+        """Close the reply's recording (cut to what was heard) and report the turn"""
+        audio_file = None
+        if recorder:
+            if text:
+                max_bytes = None if heard_ms is None else heard_ms * PCM16_BYTES_PER_MS
+                path = await recorder.finish(max_bytes)
+                audio_file = os.path.relpath(path, self.record_dir) if path else None
+            else:
+                await recorder.discard()
+        if text:
+            self._turn_log.append(["assistant", None, (text, heard_ms, audio_file), True, time.monotonic()])
+            await self._flush_turns()
+
+    async def _finish_response(self, heard_ms: Optional[int] = None):
+        """Record the latest reply (in full, or cut at heard_ms) and forget it"""
+        if self._response_id is None:
+            return
+        text = self._heard_text(heard_ms) if heard_ms is not None else self._transcript.strip()
+        recorder = self._recorder
+        self._reset_response()
+        await self._record_turn(recorder, text, heard_ms)
+
+    async def interrupt(self):
+        """
+        Barge-in: if the latest reply is still generating or playing, cancel it,
+        truncate the assistant item to what was heard (so the model knows where
+        it was cut off) and stop forwarding its remaining audio.
+        """
+        if self._response_id is None:
+            return
+        heard_ms = self._heard_ms()
+        if not self._response_active and heard_ms >= self._sent_ms():
+            # Already played in full
+            await self._finish_response()
+            return
+
+        # Capture and clear state before awaiting, so a second barge-in is a no-op
+        active, item_id, content_index = self._response_active, self._item_id, self._content_index
+        recorder = self._recorder
+        self._cancelled.add(self._response_id)
+        self.interruptions += 1
+        heard_text = self._heard_text(heard_ms)
+        self._reset_response()
+
+        # Meaningless on a replacement socket, so never wait for a reconnect
+        if active:
+            await self._send(json.dumps({"type": "response.cancel"}), wait=False)
+        if item_id:
+            await self._send(json.dumps({
+                "type": "conversation.item.truncate",
+                "item_id": item_id,
+                "content_index": content_index,
+                "audio_end_ms": heard_ms,
+            }), wait=False)
+        if self._interrupt_callback:
+            await self._interrupt_callback(heard_ms)
+        await self._record_turn(recorder, heard_text, heard_ms)
+
     async def listen(self):
         """Listen for events from Realtime API"""
         if not self.is_connected or not self.ws:
             return
 
-        audio_buffer = b""
-        transcript = ""
-
         try:
             async for message in self.ws:
                 event = json.loads(message)
                 event_type = event.get("type", "")
 
                 # Handle different event types
-                if event_type == "response.audio.delta":
+                if event_type == "response.created":
+                    # The previous reply was not interrupted: record it in full
+                    await self._finish_response()
+                    self._reset_response(event.get("response", {}).get("id"))
+
+                elif event_type == "response.audio.delta":
                     # Audio chunk received
                     audio_b64 = event.get("delta", "")
+                    if event.get("response_id") in self._cancelled:
+                        # Stale audio from an interrupted response
+                        self.dropped_audio_bytes += b64_decoded_len(audio_b64)
+                        continue
                     if audio_b64:
-                        audio_chunk = base64.b64decode(audio_b64)
-                        audio_buffer += audio_chunk
+                        self._item_id = event.get("item_id", self._item_id)
+                        self._content_index = event.get("content_index", self._content_index)
+                        if self._playback_started is None:
+                            self._playback_started = time.monotonic()
+                        self._audio_bytes += b64_decoded_len(audio_b64)
                         if self._audio_callback:
-                            await self._audio_callback(audio_chunk)
+                            await self._audio_callback(audio_b64)
+                        if self.record_dir:
+                            if self._recorder is None:
+                                name = f"ai-realtime-{self._response_id or int(time.time() * 1000)}.wav"
+                                self._recorder = WavRecorder(os.path.join(self.record_dir, name))
+                            await self._recorder.add(base64.b64decode(audio_b64))
 
                 elif event_type == "response.audio.done":
                     # Full audio response complete
@@ -182,41 +439,114 @@ class RealtimeHandler:
 
                 elif event_type == "response.audio_transcript.delta":
                     # Transcript delta
-                    transcript += event.get("delta", "")
+                    if event.get("response_id") not in self._cancelled:
+                        self._transcript += event.get("delta", "")
 
                 elif event_type == "response.audio_transcript.done":
-                    # Full transcript
-                    full_transcript = event.get("transcript", transcript)
+                    # Full transcript (recorded once played, see _finish_response)
+                    if event.get("response_id") in self._cancelled:
+                        continue
+                    self._transcript = event.get("transcript", self._transcript)
                     if self._text_callback:
-                        await self._text_callback(full_transcript)
-                    transcript = ""
+                        await self._text_callback(self._transcript)
 
                 elif event_type == "response.done":
                     # Response complete
-                    audio_buffer = b""
+                    response_id = event.get("response", {}).get("id")
+                    self._cancelled.discard(response_id)
+                    if response_id == self._response_id:
+                        # Generation finished; the client may still be playing it
+                        self._response_active = False
 
                 elif event_type == "error":
-                    print(f"[Realtime] Error: {event.get('error', {})}")
+                    error = event.get("error", {})
+                    # Expected when the response finished just before a barge-in
+                    if error.get("code") != "response_cancel_not_active":
+                        print(f"[Realtime] Error: {error}")
 
                 elif event_type == "input_audio_buffer.speech_started":
-                    # User started speaking (VAD detected)
-                    pass
+                    # User started speaking (VAD detected): stop talking over them
+                    await self.interrupt()
 
                 elif event_type == "input_audio_buffer.speech_stopped":
                     # User stopped speaking (VAD detected)
                     pass
 
+                elif event_type == "input_audio_buffer.committed":
+                    # A spoken user turn: recorded in order once transcribed
+                    if event.get("item_id"):
+                        self._log_user_item(event["item_id"])
+
+                elif event_type == "conversation.item.input_audio_transcription.completed":
+                    await self._log_user_text(event.get("item_id"), event.get("transcript", "").strip())
+
+                elif event_type == "conversation.item.input_audio_transcription.failed":
+                    await self._log_user_text(event.get("item_id"), None)
+
         except websockets.exceptions.ConnectionClosed:
-            self.is_connected = False
+            pass
         except Exception as e:
             print(f"[Realtime] Listen error: {e}")
+        finally:
             self.is_connected = False
+            if not self._closing:
+                # Hold sends until run() has reconnected (or given up)
+                self._online.clear()
+            # Connection ended: record what was heard of the last reply. Transcripts
+            # still pending will not arrive on another socket, so those turns are skipped
+            heard_ms = self._heard_ms()
+            cut = self._response_active or heard_ms < self._sent_ms()
+            await self._finish_response(heard_ms if cut else None)
+            await self._flush_turns(drop_pending=True)
+
+    async def run(self):
+        """Listen until disconnect(), reconnecting with backoff whenever the upstream socket drops"""
+        while True:
+            await self.listen()
+            if self._closing:
+                return
+            if not await self._reconnect():
+                return
+
+    async def _reconnect(self) -> bool:
+        """Open a replacement socket and resume the conversation on it"""
+        for attempt in range(1, REALTIME_RECONNECT_ATTEMPTS + 1):
+            await self._status("reconnecting", attempt=attempt)
+            delay = min(REALTIME_RECONNECT_MAX_DELAY, REALTIME_RECONNECT_BASE_DELAY * 2 ** (attempt - 1))
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            if self._closing:
+                return False
+            try:
+                if self._pool:
+                    self.ws = await self._pool.acquire(self.config)
+                else:
+                    self.ws = await open_realtime_socket(self.config)
+                await self._resume_session()
+            except Exception as e:
+                print(f"[Realtime] Reconnect attempt {attempt} failed: {e}")
+                continue
+            if self._closing:
+                # disconnect() ran while this socket was opening
+                await self.ws.close()
+                return False
+            self.is_connected = True
+            self.reconnects += 1
+            self._online.set()
+            await self._status("reconnected", attempt=attempt)
+            return True
+        # Give up: release waiting senders (they see is_connected False)
+        self.is_connected = False
+        self._online.set()
+        await self._status("failed", attempts=REALTIME_RECONNECT_ATTEMPTS)
+        return False
 
     async def disconnect(self):
         """Close WebSocket connection"""
+        self._closing = True
         if self.ws:
             await self.ws.close()
         self.is_connected = False
+        self._online.set()
 
 
 async def create_realtime_session(session: Session) -> RealtimeHandler:
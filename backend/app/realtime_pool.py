@@ -0,0 +1,187 @@
+"""
+Prewarmed Realtime Connection Pool
+
+Opening an upstream Realtime socket costs a TLS + WebSocket handshake plus
+the session.update before the user can speak. The pool keeps a few sockets
+already open and configured (voice, audio formats, VAD); a browser
+connection checks one out and only has to send its session instructions.
+
+Idle sockets are pinged every REALTIME_POOL_HEALTH_SECONDS, closed after
+REALTIME_POOL_MAX_IDLE_SECONDS and replaced in the background. Sockets
+opened for a different model/voice/key (config reload) are discarded.
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Optional, Tuple
+
+from .voice_config import VoiceConfig, get_config
+
+
+REALTIME_POOL_SIZE = int(os.getenv("REALTIME_POOL_SIZE", "2"))
+REALTIME_POOL_MAX_IDLE_SECONDS = float(os.getenv("REALTIME_POOL_MAX_IDLE_SECONDS", "300"))
+REALTIME_POOL_HEALTH_SECONDS = float(os.getenv("REALTIME_POOL_HEALTH_SECONDS", "15"))
+PING_TIMEOUT_SECONDS = 5
+
+
+def _pool_key(config: VoiceConfig) -> Tuple[str, str, str]:
+    return (config.realtime_model, config.realtime_voice, config.openai_api_key)
+
+
+def _is_open(ws: Any) -> bool:
+    state = getattr(ws, "state", None)
+    return getattr(state, "name", "OPEN") == "OPEN"
+
+
+@dataclass
+class PooledConnection:
+    ws: Any
+    key: Tuple[str, str, str]
+    opened: float
+
+
+class RealtimePool:
+    """Keeps `size` configured upstream sockets ready for checkout"""
+
+    def __init__(
+        self,
+        open_connection: Callable[[VoiceConfig], Awaitable[Any]],
+        size: int = REALTIME_POOL_SIZE,
+        max_idle: float = REALTIME_POOL_MAX_IDLE_SECONDS,
+        health_interval: float = REALTIME_POOL_HEALTH_SECONDS,
+    ):
+        self._open = open_connection
+        self.size = size
+        self.max_idle = max_idle
+        self.health_interval = health_interval
+        self._idle: Deque[PooledConnection] = deque()
+        self._refill: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.opened = 0
+        self.open_failures = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.unhealthy = 0
+        self._waits: Deque[float] = deque(maxlen=256)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running or self.size <= 0:
+            return
+        self._refill = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._idle:
+            await self._close(self._idle.popleft())
+
+    async def acquire(self, config: VoiceConfig) -> Any:
+        """A configured socket: from the pool if one is ready, else opened now"""
+        if not self.running:
+            # First realtime use after a switch from chained mode
+            await self.start()
+        started = time.perf_counter()
+        key = _pool_key(config)
+        try:
+            while self._idle:
+                conn = self._idle.popleft()
+                if self._usable(conn, key):
+                    self.hits += 1
+                    return conn.ws
+                asyncio.create_task(self._close(conn))
+            self.misses += 1
+            return await self._open(config)
+        finally:
+            self._waits.append(time.perf_counter() - started)
+            if self._refill:
+                self._refill.set()
+
+    def _usable(self, conn: PooledConnection, key) -> bool:
+        if conn.key != key or not _is_open(conn.ws):
+            return False
+        if time.monotonic() - conn.opened > self.max_idle:
+            self.expired += 1
+            return False
+        return True
+
+    async def _close(self, conn: PooledConnection):
+        try:
+            await conn.ws.close()
+        except Exception:
+            pass
+
+    async def _run(self):
+        """Top the pool up, then health-check it until a checkout asks for a refill"""
+        while True:
+            self._refill.clear()
+            await self._top_up()
+            try:
+                await asyncio.wait_for(self._refill.wait(), self.health_interval)
+            except asyncio.TimeoutError:
+                await self._health_check()
+
+    async def _top_up(self):
+        config = get_config()
+        if not config.openai_api_key:
+            return
+        key = _pool_key(config)
+        while len(self._idle) < self.size:
+            try:
+                ws = await self._open(config)
+            except Exception as e:
+                self.open_failures += 1
+                print(f"[REALTIME-POOL] Prewarm failed: {e}")
+                return  # Retried after the next health interval
+            self.opened += 1
+            self._idle.append(PooledConnection(ws=ws, key=key, opened=time.monotonic()))
+
+    async def _health_check(self):
+        key = _pool_key(get_config())
+        for conn in list(self._idle):
+            healthy = self._usable(conn, key)
+            if healthy:
+                try:
+                    pong = await conn.ws.ping()
+                    await asyncio.wait_for(pong, PING_TIMEOUT_SECONDS)
+                except Exception:
+                    healthy = False
+                    self.unhealthy += 1
+            if not healthy and conn in self._idle:
+                self._idle.remove(conn)
+                await self._close(conn)
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        checkouts = self.hits + self.misses
+        return {
+            "running": self.running,
+            "size": self.size,
+            "idle": len(self._idle),
+            "opened": self.opened,
+            "open_failures": self.open_failures,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / checkouts, 3) if checkouts else 0.0,
+            "expired": self.expired,
+            "unhealthy": self.unhealthy,
+            "checkout_wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p95": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                "max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            },
+        }
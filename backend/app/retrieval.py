@@ -0,0 +1,258 @@
+"""
+Local Retrieval over Grade and Course Knowledge
+
+Instead of injecting a whole grade markdown file into every prompt, the
+files in grade_data/ and course_data/ (the context snapshot) are split into sections by heading and
+indexed with BM25 (NumPy). Each turn gets only the top-k sections for the
+query from the session's grade/course file. Other course files are added
+only when the query names the course or they outscore the session's own
+file by a clear margin, so unrelated course prices never reach the prompt.
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .grade_context import ContextSnapshot, get_snapshot, normalize_grade, on_context_loaded
+
+
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "true").lower() != "false"
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+
+# Sections longer than this are split at paragraph breaks
+MAX_CHUNK_CHARS = 1200
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# An unnamed course section must beat the best own-file hit by this factor
+COURSE_SCORE_MARGIN = 2.0
+# Drop hits scoring below this fraction of the best hit
+MIN_RELATIVE_SCORE = 0.4
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was",
+    "be", "it", "this", "that", "with", "as", "at", "by", "from", "what", "which",
+    "how", "do", "does", "can", "i", "my", "me", "you", "your", "we", "our", "please",
+    "tell", "about", "there", "any", "will", "would", "should", "could", "hai", "ka",
+    "ki", "ke", "kya", "hain",
+}
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """One heading-delimited section of a knowledge file"""
+    source: str  # Grade or course name, e.g. "Grade 5", "Coding"
+    kind: str  # "grade" or "course"
+    title: str
+    text: str
+
+    def render(self) -> str:
+        return f"### {self.title}\n{self.text}"
+
+
+def _stem(token: str) -> str:
+    """Minimal plural folding so "fees" matches "Fee Plan" """
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _split_long(text: str) -> List[str]:
+    if len(text) <= MAX_CHUNK_CHARS:
+        return [text]
+    parts, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        if current and len(current) + len(paragraph) > MAX_CHUNK_CHARS:
+            parts.append(current.strip())
+            current = ""
+        current += paragraph + "\n\n"
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def chunk_markdown(text: str, source: str, kind: str) -> List[Chunk]:
+    """Split markdown into sections titled by their heading path"""
+    chunks: List[Chunk] = []
+    headings: List[Tuple[int, str]] = []
+    lines: List[str] = []
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            title = " > ".join(h for _, h in headings) or source
+            for part in _split_long(body):
+                chunks.append(Chunk(source=source, kind=kind, title=title, text=part))
+        lines.clear()
+
+    for line in text.splitlines():
+        match = _HEADING.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, match.group(2)))
+        else:
+            lines.append(line)
+    flush()
+    return chunks
+
+
+def _load_chunks(snapshot: ContextSnapshot) -> List[Chunk]:
+    chunks: List[Chunk] = []
+    for doc in snapshot.documents:
+        chunks.extend(chunk_markdown(doc.text, doc.name, doc.kind))
+    return chunks
+
+
+class RetrievalIndex:
+    """BM25 over chunks, term frequencies held in a dense NumPy matrix"""
+
+    def __init__(self, chunks: List[Chunk], version: int = 0):
+        self.chunks = chunks
+        # Context snapshot version the chunks came from
+        self.version = version
+        self.vocab: Dict[str, int] = {}
+        # Section headings count twice: "## Fee Plan" is a strong signal
+        docs = [tokenize(c.title + "\n" + c.title.rsplit(" > ", 1)[-1] + "\n" + c.text) for c in chunks]
+        for tokens in docs:
+            for token in tokens:
+                self.vocab.setdefault(token, len(self.vocab))
+
+        self.tf = np.zeros((len(chunks), len(self.vocab)), dtype=np.float32)
+        for row, tokens in enumerate(docs):
+            for token in tokens:
+                self.tf[row, self.vocab[token]] += 1
+
+        n_docs = max(1, len(chunks))
+        doc_len = self.tf.sum(axis=1)
+        avg_len = float(doc_len.mean()) if len(chunks) else 1.0
+        df = (self.tf > 0).sum(axis=0)
+        self.idf = np.log((n_docs - df + 0.5) / (df + 0.5) + 1.0).astype(np.float32)
+        # Per-document length normalisation term of the BM25 denominator
+        self.norm = (BM25_K1 * (1 - BM25_B + BM25_B * doc_len / max(avg_len, 1e-6))).astype(np.float32)
+        self.sources = np.array([c.source for c in chunks], dtype=object)
+        self.source_names: Set[str] = {c.source for c in chunks}
+        self.course_sources: Set[str] = {c.source for c in chunks if c.kind == "course"}
+
+    def search(
+        self,
+        query: str,
+        top_k: int = RETRIEVAL_TOP_K,
+        sources: Optional[Set[str]] = None,
+    ) -> List[Tuple[Chunk, float]]:
+        """Top-k chunks for query, optionally restricted to some sources"""
+        terms = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not terms or not self.chunks:
+            return []
+        tf = self.tf[:, terms]
+        scores = (self.idf[terms] * tf * (BM25_K1 + 1) / (tf + self.norm[:, None])).sum(axis=1)
+        if sources is not None:
+            scores = np.where(np.isin(self.sources, list(sources)), scores, 0.0)
+        top = np.argsort(-scores)[:top_k]
+        return [(self.chunks[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def chunks_for(self, source: str) -> List[Chunk]:
+        return [c for c in self.chunks if c.source == source]
+
+    def stats(self) -> dict:
+        return {
+            "chunks": len(self.chunks),
+            "vocabulary": len(self.vocab),
+            "sources": len(self.source_names),
+            "matrix_bytes": int(self.tf.nbytes),
+        }
+
+
+_index: Optional[RetrievalIndex] = None
+# Built by the context watcher for a snapshot that is about to go live
+_prepared: Optional[RetrievalIndex] = None
+
+
+def build_index(snapshot: ContextSnapshot) -> RetrievalIndex:
+    index = RetrievalIndex(_load_chunks(snapshot), snapshot.version)
+    print(f"[RETRIEVAL] Indexed {len(index.chunks)} sections from {len(index.source_names)} files")
+    return index
+
+
+def get_index() -> RetrievalIndex:
+    """Index of the current snapshot (the app lifespan builds the first one at startup)"""
+    global _index
+    snapshot = get_snapshot()
+    if _index is None or _index.version != snapshot.version:
+        prepared = _prepared
+        if prepared is not None and prepared.version == snapshot.version:
+            _index = prepared
+        else:
+            _index = build_index(snapshot)
+    return _index
+
+
+def prepare_index(snapshot: ContextSnapshot):
+    """Build the next snapshot's index in the loading thread, so no request pays for it"""
+    global _prepared
+    _prepared = build_index(snapshot)
+
+
+def reset_index():
+    global _index, _prepared
+    _index = None
+    _prepared = None
+
+
+# Knowledge files changed: index them before the new snapshot is swapped in
+on_context_loaded(prepare_index)
+
+
+# Course-name words too common to name a course on their own ("math syllabus")
+_GENERIC_NAME_TOKENS = set(tokenize("1 class classes classical hobby languages math science computer"))
+
+
+def names_course(query_tokens: Set[str], course: str) -> bool:
+    """The query mentions the course: a distinctive word of its name, or all of it"""
+    name = set(tokenize(course))
+    return bool(name) and (bool((name - _GENERIC_NAME_TOKENS) & query_tokens) or name <= query_tokens)
+
+
+def retrieve_context(grade_or_course: str, query: str, top_k: int = RETRIEVAL_TOP_K) -> Optional[str]:
+    """
+    Most relevant sections for the query from the session's grade/course file,
+    plus other course files the query names (or that clearly outscore it).
+    Falls back to the file's opening sections when nothing matches. Returns
+    None if the grade/course has no knowledge file.
+    """
+    index = get_index()
+    source = normalize_grade(grade_or_course)
+    if source not in index.source_names:
+        source = grade_or_course.strip()
+    own = index.chunks_for(source)
+    if not own:
+        return None
+    results = index.search(query, top_k, {source})
+    best_own = results[0][1] if results else 0.0
+    query_tokens = set(tokenize(query))
+    others = index.course_sources - {source}
+    named = {c for c in others if names_course(query_tokens, c)}
+    if others:
+        results += [
+            (chunk, score) for chunk, score in index.search(query, top_k, others)
+            if chunk.source in named or (best_own > 0 and score >= best_own * COURSE_SCORE_MARGIN)
+        ]
+        results = sorted(results, key=lambda r: -r[1])[:top_k]
+    hits = [chunk for chunk, score in results if score >= results[0][1] * MIN_RELATIVE_SCORE]
+    if not hits:
+        hits = own[:min(top_k, len(own))]
+    return "\n\n".join(chunk.render() for chunk in hits)
@@ -0,0 +1,181 @@
+"""
+Bounded Send Queues for the Realtime Proxy
+
+Each direction of /ws/realtime (browser -> upstream, upstream -> browser)
+gets its own queue drained by a dedicated sender task, so a slow browser
+never stalls reading from the Realtime API and vice versa.
+
+Control messages (transcripts, commits, flushes, errors) are always kept
+and stay in order with the audio around them. Audio is merged into the
+previous queued chunk (fewer, larger frames) and, once more than max_bytes
+of audio is waiting, the oldest audio is dropped: late audio is worth less
+than current audio.
+"""
+import os
+import time
+import base64
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+
+# Audio allowed to wait per direction before the oldest is dropped (base64 bytes)
+REALTIME_DOWNSTREAM_MAX_KB = int(os.getenv("REALTIME_DOWNSTREAM_MAX_KB", "256"))
+REALTIME_UPSTREAM_MAX_KB = int(os.getenv("REALTIME_UPSTREAM_MAX_KB", "1024"))
+# Merged audio frames are capped so a drop never loses more than this
+MERGE_MAX_BYTES = 32 * 1024
+
+
+def merge_b64(first: str, second: str) -> str:
+    """Concatenate two base64 payloads (no decode unless the first one is padded)"""
+    if not first.endswith("="):
+        return first + second
+    return base64.b64encode(base64.b64decode(first) + base64.b64decode(second)).decode("ascii")
+
+
+class SendQueue:
+    """
+    Ordered queue of (kind, payload) drained by one sender task.
+
+    send(kind, payload) performs the actual write; kind "audio" items are
+    subject to merging and dropping, every other kind is delivered as-is.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        send: Callable[[str, Any], Awaitable[None]],
+        max_bytes: int,
+        merge: Optional[Callable[[Any, Any], Any]] = merge_b64,
+    ):
+        self.name = name
+        self._send = send
+        self.max_bytes = max_bytes
+        self._merge = merge
+        # [kind, payload, enqueued_at, size]
+        self._items: Deque[list] = deque()
+        self._audio_bytes = 0
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        # Metrics
+        self.sent = 0
+        self.merged = 0
+        self.dropped = 0
+        self.dropped_bytes = 0
+        self.flushed = 0
+        self.max_depth = 0
+        self._lag_total = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        self.closed = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def put(self, kind: str, payload: Any):
+        """Queue a control message (never dropped)"""
+        if self.closed:
+            return
+        self._items.append([kind, payload, time.monotonic(), 0])
+        self._queued()
+
+    def put_audio(self, payload: Any):
+        """Queue audio, merging into the previous chunk and dropping the oldest past max_bytes"""
+        if self.closed:
+            return
+        size = len(payload)
+        tail = self._items[-1] if self._items else None
+        if self._merge and tail and tail[0] == "audio" and tail[3] + size <= MERGE_MAX_BYTES:
+            tail[1] = self._merge(tail[1], payload)
+            tail[3] += size
+            self.merged += 1
+        else:
+            self._items.append(["audio", payload, time.monotonic(), size])
+        self._audio_bytes += size
+        while self._audio_bytes > self.max_bytes and self._drop_oldest_audio():
+            pass
+        self._queued()
+
+    def clear_audio(self) -> int:
+        """Discard all queued audio (barge-in); returns the bytes discarded"""
+        discarded = sum(item[3] for item in self._items if item[0] == "audio")
+        self._items = deque(item for item in self._items if item[0] != "audio")
+        self._audio_bytes = 0
+        self.flushed += discarded
+        return discarded
+
+    def _drop_oldest_audio(self) -> bool:
+        for index, item in enumerate(self._items):
+            if item[0] == "audio":
+                del self._items[index]
+                self._audio_bytes -= item[3]
+                self.dropped += 1
+                self.dropped_bytes += item[3]
+                return True
+        return False
+
+    def _queued(self):
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._ready.set()
+
+    async def _run(self):
+        while True:
+            while not self._items:
+                self._ready.clear()
+                await self._ready.wait()
+            kind, payload, enqueued, size = self._items.popleft()
+            self._audio_bytes -= size
+            lag = time.monotonic() - enqueued
+            self._lag_total += lag
+            self.max_lag = max(self.max_lag, lag)
+            try:
+                await self._send(kind, payload)
+            except Exception as e:
+                # Peer gone: stop accepting work, the connection handler cleans up
+                print(f"[SEND-QUEUE] {self.name} send failed: {e}")
+                self.closed = True
+                return
+            self.sent += 1
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._items),
+            "audio_bytes": self._audio_bytes,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "merged": self.merged,
+            "dropped": self.dropped,
+            "dropped_bytes": self.dropped_bytes,
+            "flushed_bytes": self.flushed,
+            "avg_lag_ms": round(self._lag_total / self.sent * 1000, 1) if self.sent else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+        }
+
+
+# Queues of open realtime connections, for /metrics
+_active: Dict[str, Dict[str, SendQueue]] = {}
+
+
+def register_queues(connection_id: str, **queues: SendQueue):
+    _active[connection_id] = queues
+
+
+def unregister_queues(connection_id: str):
+    _active.pop(connection_id, None)
+
+
+def send_queue_stats() -> dict:
+    return {
+        connection_id: {name: queue.stats() for name, queue in queues.items()}
+        for connection_id, queues in _active.items()
+    }
@@ -0,0 +1,192 @@
+"""
+Bounded In-memory Session Cache
+
+Hot sessions stay in RAM; idle ones are paged out after a TTL and the least
+recently used are paged out once the entry or byte budget is exceeded.
+Paged-out sessions are reloaded from the persistent store on the next
+lookup, so nothing is lost when they leave memory.
+
+A session with writes still queued for the background writer is never
+paged out, otherwise a reload could miss its newest turns.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "1000"))
+SESSION_CACHE_MAX_MB = float(os.getenv("SESSION_CACHE_MAX_MB", "64"))
+# Sessions untouched for this long are paged out by the sweep
+SESSION_CACHE_TTL_MINUTES = float(os.getenv("SESSION_CACHE_TTL_MINUTES", "30"))
+SESSION_CACHE_SWEEP_SECONDS = float(os.getenv("SESSION_CACHE_SWEEP_SECONDS", "60"))
+
+
+class SessionCache:
+    """LRU + idle-TTL map of session_id -> session, backed by a loader"""
+
+    def __init__(
+        self,
+        loader: Callable[[str], Optional[Any]],
+        size_of: Callable[[Any], int],
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        validate: Optional[Callable[[str, Any], bool]] = None,
+    ):
+        self._loader = loader
+        self._size_of = size_of
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # validate(session_id, session) -> False when another process changed the stored copy
+        self._validate = validate
+        # session_id -> (session, size, last_used), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        # Writes queued but not yet applied, per session (decremented from the writer thread)
+        self._pending: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_reloads = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def values(self):
+        return [entry[0] for entry in self._entries.values()]
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Return the session, reloading it from the store if it was paged out"""
+        if session_id in self._entries:
+            session = self._entries[session_id][0]
+            if self._validate is None or self._has_pending(session_id) or self._validate(session_id, session):
+                self.hits += 1
+                self.put(session_id, session)
+                return session
+            self.remove(session_id)
+            self.stale_reloads += 1
+        self.misses += 1
+        session = self._loader(session_id)
+        if session is not None:
+            self.loads += 1
+            self.put(session_id, session)
+        return session
+
+    async def aget(self, session_id: str) -> Optional[Any]:
+        """get() for the event loop: the revision check and store reload run in a thread"""
+        if session_id in self._entries:
+            session = self._entries[session_id][0]
+            if (
+                self._validate is None
+                or self._has_pending(session_id)
+                or await asyncio.to_thread(self._validate, session_id, session)
+            ):
+                # Re-read: the entry may have changed while the check ran
+                if session_id in self._entries:
+                    session = self._entries[session_id][0]
+                self.hits += 1
+                self.put(session_id, session)
+                return session
+            self.remove(session_id)
+            self.stale_reloads += 1
+        self.misses += 1
+        session = await asyncio.to_thread(self._loader, session_id)
+        if session is not None:
+            if session_id in self._entries:
+                # Put back by another coroutine while this one was loading
+                return self._entries[session_id][0]
+            self.loads += 1
+            self.put(session_id, session)
+        return session
+
+    def put(self, session_id: str, session: Any):
+        """Insert or refresh a session as most recently used"""
+        old = self._entries.pop(session_id, None)
+        if old:
+            self._bytes -= old[1]
+        size = self._size_of(session)
+        self._entries[session_id] = (session, size, time.monotonic())
+        self._bytes += size
+        self._evict()
+
+    def remove(self, session_id: str) -> bool:
+        old = self._entries.pop(session_id, None)
+        if old:
+            self._bytes -= old[1]
+        return old is not None
+
+    def write_queued(self, session_id: str):
+        with self._pending_lock:
+            self._pending[session_id] = self._pending.get(session_id, 0) + 1
+
+    def writes_applied(self, session_ids):
+        """Called once a batch of writes is in the store"""
+        with self._pending_lock:
+            for session_id in session_ids:
+                count = self._pending.get(session_id, 0) - 1
+                if count > 0:
+                    self._pending[session_id] = count
+                else:
+                    self._pending.pop(session_id, None)
+
+    def _has_pending(self, session_id: str) -> bool:
+        with self._pending_lock:
+            return session_id in self._pending
+
+    def _evict(self):
+        """Page out LRU sessions until within budget (skipping ones with queued writes)"""
+        if len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        for session_id in list(self._entries):
+            if len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+                break
+            if self._has_pending(session_id):
+                continue
+            self.remove(session_id)
+            self.evictions += 1
+
+    def sweep(self, expired: Callable[[Any], bool]) -> int:
+        """Drop expired sessions and page out idle ones; returns how many left memory"""
+        now = time.monotonic()
+        removed = 0
+        for session_id, (session, _, last_used) in list(self._entries.items()):
+            if expired(session):
+                self.remove(session_id)
+                self.expirations += 1
+                removed += 1
+            elif now - last_used > self.ttl and not self._has_pending(session_id):
+                self.remove(session_id)
+                self.evictions += 1
+                removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "pending_writes": pending,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_reloads": self.stale_reloads,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
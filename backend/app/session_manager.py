@@ -4,11 +4,25 @@ import uuid
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any
 from dataclasses import dataclass, field, asdict
 import json
+import time
 import asyncio
+from contextlib import contextmanager
+from . import db
+from .background_writer import background_writer
+from .session_store import create_session_store
+from .session_cache import (
+    SessionCache, SESSION_CACHE_MAX_ENTRIES, SESSION_CACHE_MAX_MB,
+    SESSION_CACHE_TTL_MINUTES, SESSION_CACHE_SWEEP_SECONDS
+)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: single-process dev server, no lock needed
 
 # Directory for data files
 ROOT = os.path.dirname(__file__)
@@ -16,7 +30,7 @@ PROJECT_ROOT = os.path.abspath(os.path.join(ROOT, "..", ".."))
 DATA_DIR = os.path.join(PROJECT_ROOT, "backend", "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
-# Leads file path
+# Legacy leads file, imported into the lead store once on first start
 LEADS_FILE = os.path.join(DATA_DIR, os.getenv("LEADS_FILE", "leads.json"))
 
 # Email configuration
@@ -27,77 +41,182 @@ SMTP_USER = os.getenv("SMTP_USER", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_FROM = os.getenv("SMTP_FROM", "")
 SMTP_FROM_NAME = os.getenv("SMTP_FROM_NAME", "Vikalp Online School")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() != "false"
 
-# Sessions stored in memory (can be replaced with DB later)
-_sessions: Dict[str, "Session"] = {}
-
-# Sessions file path for persistence
+# Legacy snapshot file, imported into the database once on first start
 SESSIONS_FILE = os.path.join(DATA_DIR, "sessions.json")
 
+# Held while importing legacy files, so only one of several workers does it
+MIGRATION_LOCK_FILE = os.path.join(DATA_DIR, ".migration.lock")
+
 # Session expiry in days
 SESSION_EXPIRY_DAYS = 7
 
+# How often expired sessions are purged and the WAL is checkpointed
+SESSION_COMPACT_INTERVAL_HOURS = float(os.getenv("SESSION_COMPACT_INTERVAL_HOURS", "6"))
 
-def _save_sessions_to_file():
-    """Save all sessions to JSON file for persistence"""
-    try:
-        sessions_data = {}
-        for sid, session in _sessions.items():
-            sessions_data[sid] = session.to_dict()
-        
-        with open(SESSIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(sessions_data, f, indent=2, ensure_ascii=False)
-        print(f"[SESSION] Saved {len(sessions_data)} sessions to {SESSIONS_FILE}")
-    except Exception as e:
-        print(f"[SESSION] Error saving sessions: {e}")
+
+def _expiry_cutoff() -> str:
+    return (datetime.utcnow() - timedelta(days=SESSION_EXPIRY_DAYS)).isoformat() + "Z"
+
+
+def _session_from_dict(data: dict) -> "Session":
+    """Rebuild a Session (and its turns) from a stored dict"""
+    conversation = [
+        ConversationTurn(**turn) for turn in data.get("conversation", [])
+    ]
+    return Session(
+        session_id=data["session_id"],
+        grade=data["grade"],
+        name=data["name"],
+        email=data["email"],
+        mobile=data["mobile"],
+        intent=data["intent"],
+        created_at=data["created_at"],
+        updated_at=data.get("updated_at") or data["created_at"],
+        conversation=conversation,
+        detected_language=data.get("detected_language"),
+        summary=data.get("summary"),
+        summary_upto=int(data.get("summary_upto") or 0)
+    )
+
+
+@contextmanager
+def _migration_lock():
+    """Exclusive lock across worker processes on this host"""
+    with open(MIGRATION_LOCK_FILE, "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
 
 
-def _load_sessions_from_file():
-    """Load sessions from JSON file on startup"""
-    global _sessions
-    if not os.path.exists(SESSIONS_FILE):
-        print("[SESSION] No sessions file found, starting fresh")
+def _migrate_sessions_file():
+    """One-time import of the old sessions.json snapshot into the session store"""
+    if not _store.persistent or not os.path.exists(SESSIONS_FILE) or _store.count() > 0:
         return
-    
     try:
         with open(SESSIONS_FILE, "r", encoding="utf-8") as f:
             sessions_data = json.load(f)
-        
-        loaded_count = 0
-        expired_count = 0
-        now = datetime.utcnow()
-        
-        for sid, data in sessions_data.items():
-            # Check if session is expired (older than 7 days)
-            created_at = datetime.fromisoformat(data["created_at"].replace("Z", ""))
-            age_days = (now - created_at).days
-            
-            if age_days > SESSION_EXPIRY_DAYS:
-                expired_count += 1
-                continue
-            
-            # Reconstruct session
-            conversation = [
-                ConversationTurn(**turn) for turn in data.get("conversation", [])
-            ]
-            session = Session(
-                session_id=data["session_id"],
-                grade=data["grade"],
-                name=data["name"],
-                email=data["email"],
-                mobile=data["mobile"],
-                intent=data["intent"],
-                created_at=data["created_at"],
-                updated_at=data.get("updated_at", data["created_at"]),
-                conversation=conversation,
-                detected_language=data.get("detected_language")
-            )
-            _sessions[sid] = session
-            loaded_count += 1
-        
-        print(f"[SESSION] Loaded {loaded_count} sessions, expired {expired_count}")
+        for data in sessions_data.values():
+            _store.insert(data, data.get("conversation", []))
+        os.replace(SESSIONS_FILE, SESSIONS_FILE + ".migrated")
+        print(f"[SESSION] Migrated {len(sessions_data)} sessions from {SESSIONS_FILE}")
+    except Exception as e:
+        print(f"[SESSION] Error migrating sessions file: {e}")
+
+
+def _load_session(session_id: str) -> Optional["Session"]:
+    """Cache loader: read a paged-out session back from the store"""
+    try:
+        data = _store.load(session_id, _expiry_cutoff())
+    except Exception as e:
+        print(f"[SESSION] Error loading session {session_id}: {e}")
+        return None
+    return _session_from_dict(data) if data else None
+
+
+def _session_size(session: "Session") -> int:
+    """Rough in-memory footprint of a session, for the cache byte budget"""
+    size = 512 + len(session.summary or "") * 2
+    for turn in session.conversation:
+        size += 160 + len(turn.text or "") * 2 + len(turn.audio_file or "")
+    return size
+
+
+def _is_expired(session: "Session") -> bool:
+    return session.created_at < _expiry_cutoff()
+
+
+def _is_current(session_id: str, session: "Session") -> bool:
+    """False if another worker changed (or deleted) the session since we cached it"""
+    try:
+        return _store.revision(session_id) == session.updated_at
+    except Exception as e:
+        print(f"[SESSION] Revision check failed for {session_id}: {e}")
+        return True
+
+
+# Where sessions live (memory / sqlite / redis, see session_store.py)
+_store = create_session_store(expiry_days=SESSION_EXPIRY_DAYS)
+
+# Hot sessions in memory; the rest are loaded from the store on demand
+_sessions = SessionCache(
+    _load_session,
+    _session_size,
+    SESSION_CACHE_MAX_ENTRIES,
+    int(SESSION_CACHE_MAX_MB * 1024 * 1024),
+    SESSION_CACHE_TTL_MINUTES * 60,
+    validate=_is_current if _store.shared else None,
+)
+
+
+def _init_session_store():
+    """Create tables, import legacy files and purge expired sessions on startup"""
+    try:
+        db.init_db()
+        _store.init()
+        # Workers start together: the first to get the lock imports, the
+        # rest then find the legacy files moved away (or the store filled)
+        with _migration_lock():
+            _migrate_sessions_file()
+            _migrate_leads_file()
+        expired_count = _store.compact(_expiry_cutoff())
+        print(f"[SESSION] {_store.count()} sessions stored ({type(_store).__name__}), expired {expired_count}")
     except Exception as e:
-        print(f"[SESSION] Error loading sessions: {e}")
+        print(f"[SESSION] Error initializing session store: {e}")
+
+
+def _op_session_id(op: tuple) -> str:
+    return op[1]["session_id"] if op[0] == "session" else op[1]
+
+
+async def _persist(*op):
+    """Queue a session write for the background writer (see db.apply_session_ops)"""
+    _sessions.write_queued(_op_session_id(op))
+    await background_writer.submit("session_ops", op)
+
+
+async def _persist_now(*op):
+    """Apply a session write before returning (in a thread, off the event loop)"""
+    _sessions.write_queued(_op_session_id(op))
+    await background_writer.run_now("session_ops", op)
+
+
+def _apply_session_ops(ops: List[tuple]):
+    """Writer handler: apply ops, then let the cache page those sessions out again"""
+    try:
+        _store.apply(ops)
+    finally:
+        _sessions.writes_applied([_op_session_id(op) for op in ops])
+
+
+def compact_sessions() -> int:
+    """Purge expired sessions from the store"""
+    removed = _store.compact(_expiry_cutoff())
+    print(f"[SESSION] Compaction removed {removed} expired sessions")
+    return removed
+
+
+def session_cache_stats() -> dict:
+    return _sessions.stats()
+
+
+async def run_session_maintenance():
+    """Background loop: cache TTL sweeps plus periodic compaction (started from the app lifespan)"""
+    last_compaction = time.monotonic()
+    while True:
+        await asyncio.sleep(SESSION_CACHE_SWEEP_SECONDS)
+        try:
+            _sessions.sweep(_is_expired)
+            if time.monotonic() - last_compaction >= SESSION_COMPACT_INTERVAL_HOURS * 3600:
+                last_compaction = time.monotonic()
+                await asyncio.to_thread(compact_sessions)
+        except Exception as e:
+            print(f"[SESSION] Maintenance error: {e}")
 
 @dataclass
 class ConversationTurn:
@@ -107,6 +226,8 @@ class ConversationTurn:
     audio_file: Optional[str] = None
     timestamp: str = field(default_factory=lambda: datetime.utcnow().isoformat() + "Z")
     language: Optional[str] = None
+    # Milliseconds of the reply's audio played before the user interrupted (None = heard in full)
+    heard_ms: Optional[int] = None
 
 @dataclass
 class Session:
@@ -121,14 +242,27 @@ class Session:
     updated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat() + "Z")
     conversation: List[ConversationTurn] = field(default_factory=list)
     detected_language: Optional[str] = None
+    # Rolling summary of conversation[:summary_upto] (see memory.py)
+    summary: Optional[str] = None
+    summary_upto: int = 0
     
-    def add_turn(self, role: str, text: str, audio_file: Optional[str] = None, language: Optional[str] = None):
+    async def add_turn(
+        self,
+        role: str,
+        text: str,
+        audio_file: Optional[str] = None,
+        language: Optional[str] = None,
+        heard_ms: Optional[int] = None,
+    ):
         """Add a conversation turn"""
-        turn = ConversationTurn(role=role, text=text, audio_file=audio_file, language=language)
+        turn = ConversationTurn(role=role, text=text, audio_file=audio_file, language=language, heard_ms=heard_ms)
         self.conversation.append(turn)
         self.updated_at = datetime.utcnow().isoformat() + "Z"
         if language:
             self.detected_language = language
+        # Keep a session that is in use hot (re-admits it if it was paged out)
+        _sessions.put(self.session_id, self)
+        await _persist("turn", self.session_id, asdict(turn), self.updated_at, language)
         return turn
 
     def get_memory_snippets(self, max_turns: int = 10) -> str:
@@ -155,110 +289,159 @@ class Session:
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "detected_language": self.detected_language,
+            "summary": self.summary,
+            "summary_upto": self.summary_upto,
             "conversation": [asdict(t) for t in self.conversation]
         }
 
-def _save_lead_to_json(lead_data: dict):
-    """Save lead data to JSON file"""
+def _save_leads(leads_batch: List[dict]):
+    """Append a batch of leads to the lead store (see db.insert_leads)"""
     try:
-        # Load existing leads
-        leads = []
-        if os.path.exists(LEADS_FILE):
-            with open(LEADS_FILE, "r", encoding="utf-8") as f:
-                try:
-                    leads = json.load(f)
-                except json.JSONDecodeError:
-                    leads = []
-
-        # Append new lead
-        leads.append(lead_data)
-
-        # Save back to file
-        with open(LEADS_FILE, "w", encoding="utf-8") as f:
-            json.dump(leads, f, indent=2, ensure_ascii=False)
-
-        print(f"[LEAD] Saved lead to {LEADS_FILE}")
+        db.insert_leads(leads_batch)
+        print(f"[LEAD] Saved {len(leads_batch)} lead(s)")
         return True
     except Exception as e:
-        print(f"[LEAD] Error saving lead to JSON: {e}")
+        print(f"[LEAD] Error saving leads: {e}")
         return False
 
 
-def _send_lead_email(lead_data: dict):
-    """Send lead notification email"""
-    if not LEAD_NOTIFICATION_EMAIL or not SMTP_USER or not SMTP_PASSWORD:
-        print("[LEAD] Email notification skipped - SMTP not configured")
-        return False
-
+def _migrate_leads_file():
+    """One-time import of the old leads.json array into the lead store"""
+    if not os.path.exists(LEADS_FILE) or db.count_leads() > 0:
+        return
     try:
-        # Create email content
-        subject = f"New Lead: {lead_data['name']} - {lead_data['grade']} - {lead_data['intent']}"
-
-        body_html = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; padding: 20px;">
-            <h2 style="color: #2563eb;">🎓 New Lead from Vikalp AI Voice Tutor</h2>
-            <table style="border-collapse: collapse; width: 100%; max-width: 500px;">
-                <tr style="background: #f3f4f6;">
-                    <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Name</td>
-                    <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['name']}</td>
-                </tr>
-                <tr>
-                    <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Email</td>
-                    <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['email']}</td>
-                </tr>
-                <tr style="background: #f3f4f6;">
-                    <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Mobile</td>
-                    <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['mobile']}</td>
-                </tr>
-                <tr>
-                    <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Grade</td>
-                    <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['grade']}</td>
-                </tr>
-                <tr style="background: #f3f4f6;">
-                    <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Looking For</td>
-                    <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['intent']}</td>
-                </tr>
-                <tr>
-                    <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Session ID</td>
-                    <td style="padding: 10px; border: 1px solid #e5e7eb; font-size: 12px;">{lead_data['session_id']}</td>
-                </tr>
-                <tr style="background: #f3f4f6;">
-                    <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Date/Time</td>
-                    <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['created_at']}</td>
-                </tr>
-            </table>
-            <p style="margin-top: 20px; color: #6b7280; font-size: 12px;">
-                This is an automated notification from Vikalp AI Voice Tutor.
-            </p>
-        </body>
-        </html>
-        """
-
-        # Create message
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = f"{SMTP_FROM_NAME} <{SMTP_FROM or SMTP_USER}>"
-        msg["To"] = LEAD_NOTIFICATION_EMAIL
-
-        # Attach HTML content
-        msg.attach(MIMEText(body_html, "html"))
-
-        # Send email
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
+        with open(LEADS_FILE, "r", encoding="utf-8") as f:
+            leads = json.load(f)
+        db.insert_leads(leads)
+        os.replace(LEADS_FILE, LEADS_FILE + ".migrated")
+        print(f"[LEAD] Migrated {len(leads)} leads from {LEADS_FILE}")
+    except Exception as e:
+        print(f"[LEAD] Error migrating leads file: {e}")
+
+
+def _build_lead_email(lead_data: dict) -> MIMEMultipart:
+    """Build the lead notification message"""
+    subject = f"New Lead: {lead_data['name']} - {lead_data['grade']} - {lead_data['intent']}"
+
+    body_html = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; padding: 20px;">
+        <h2 style="color: #2563eb;">🎓 New Lead from Vikalp AI Voice Tutor</h2>
+        <table style="border-collapse: collapse; width: 100%; max-width: 500px;">
+            <tr style="background: #f3f4f6;">
+                <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Name</td>
+                <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['name']}</td>
+            </tr>
+            <tr>
+                <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Email</td>
+                <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['email']}</td>
+            </tr>
+            <tr style="background: #f3f4f6;">
+                <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Mobile</td>
+                <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['mobile']}</td>
+            </tr>
+            <tr>
+                <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Grade</td>
+                <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['grade']}</td>
+            </tr>
+            <tr style="background: #f3f4f6;">
+                <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Looking For</td>
+                <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['intent']}</td>
+            </tr>
+            <tr>
+                <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Session ID</td>
+                <td style="padding: 10px; border: 1px solid #e5e7eb; font-size: 12px;">{lead_data['session_id']}</td>
+            </tr>
+            <tr style="background: #f3f4f6;">
+                <td style="padding: 10px; border: 1px solid #e5e7eb; font-weight: bold;">Date/Time</td>
+                <td style="padding: 10px; border: 1px solid #e5e7eb;">{lead_data['created_at']}</td>
+            </tr>
+        </table>
+        <p style="margin-top: 20px; color: #6b7280; font-size: 12px;">
+            This is an automated notification from Vikalp AI Voice Tutor.
+        </p>
+    </body>
+    </html>
+    """
+
+    # Create message
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = f"{SMTP_FROM_NAME} <{SMTP_FROM or SMTP_USER}>"
+    msg["To"] = LEAD_NOTIFICATION_EMAIL
+
+    # Attach HTML content
+    msg.attach(MIMEText(body_html, "html"))
+    return msg
+
+
+class LeadMailer:
+    """Sends lead emails over one authenticated SMTP connection, reused across batches"""
+
+    # Reconnect rather than trust a connection idle longer than this
+    IDLE_SECONDS = 60
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+        if SMTP_STARTTLS:
             server.starttls()
+        if server.has_extn("auth"):
             server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(msg)
-
-        print(f"[LEAD] Email notification sent to {LEAD_NOTIFICATION_EMAIL}")
-        return True
-    except Exception as e:
-        print(f"[LEAD] Error sending email: {e}")
-        return False
+        return server
+
+    def _get_server(self) -> smtplib.SMTP:
+        if self._server and time.monotonic() - self._last_used > self.IDLE_SECONDS:
+            self.close()
+        if not self._server:
+            self._server = self._connect()
+        return self._server
+
+    def send(self, leads: List[dict]) -> int:
+        """Send one email per lead; returns how many were sent"""
+        if not LEAD_NOTIFICATION_EMAIL or not SMTP_USER or not SMTP_PASSWORD:
+            print("[LEAD] Email notification skipped - SMTP not configured")
+            return 0
+
+        sent = 0
+        for lead_data in leads:
+            msg = _build_lead_email(lead_data)
+            # Retry once on a fresh connection if the reused one went stale
+            for attempt in range(2):
+                try:
+                    self._get_server().send_message(msg)
+                    self._last_used = time.monotonic()
+                    sent += 1
+                    break
+                except (smtplib.SMTPServerDisconnected, OSError) as e:
+                    self.close()
+                    if attempt:
+                        print(f"[LEAD] Error sending email: {e}")
+                except Exception as e:
+                    print(f"[LEAD] Error sending email: {e}")
+                    break
+
+        if sent:
+            print(f"[LEAD] {sent} email notification(s) sent to {LEAD_NOTIFICATION_EMAIL}")
+        return sent
+
+    def close(self):
+        if self._server:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+_lead_mailer = LeadMailer()
 
 
 async def save_and_notify_lead(session: "Session"):
-    """Save lead to JSON and send email notification (async)"""
+    """Queue the lead save and email notification for the background writer"""
     lead_data = {
         "session_id": session.session_id,
         "name": session.name,
@@ -269,13 +452,17 @@ async def save_and_notify_lead(session: "Session"):
         "created_at": session.created_at,
     }
 
-    # Run IO operations in thread pool
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _save_lead_to_json, lead_data)
-    await loop.run_in_executor(None, _send_lead_email, lead_data)
+    await background_writer.submit("lead", lead_data)
+    await background_writer.submit("lead_email", lead_data)
+
+
+background_writer.register("session_ops", _apply_session_ops)
+background_writer.register("lead", _save_leads)
+# Own lane: a slow SMTP server must not hold up session or lead writes
+background_writer.register("lead_email", _lead_mailer.send, close=_lead_mailer.close, lane="email")
 
 
-def create_session(grade: str, name: str, email: str, mobile: str, intent: str) -> Session:
+async def create_session(grade: str, name: str, email: str, mobile: str, intent: str) -> Session:
     """Create a new session"""
     session_id = str(uuid.uuid4())
     session = Session(
@@ -286,40 +473,50 @@ def create_session(grade: str, name: str, email: str, mobile: str, intent: str)
         mobile=mobile,
         intent=intent
     )
-    _sessions[session_id] = session
-    _save_sessions_to_file()  # Persist to file
+    _sessions.put(session_id, session)
+    # Written through on shared stores so another worker can serve the session right away
+    if _store.shared:
+        await _persist_now("session", session.to_dict())
+    else:
+        await _persist("session", session.to_dict())
     return session
 
 def get_session(session_id: str) -> Optional[Session]:
-    """Get session by ID"""
+    """Get session by ID (loaded from the database if not in memory)"""
     return _sessions.get(session_id)
 
-def update_session(session_id: str, **kwargs) -> Optional[Session]:
+async def get_session_async(session_id: str) -> Optional[Session]:
+    """get_session for async handlers: store reads and revision checks run in a thread"""
+    return await _sessions.aget(session_id)
+
+async def update_session(session_id: str, **kwargs) -> Optional[Session]:
     """Update session fields"""
-    session = _sessions.get(session_id)
+    session = await _sessions.aget(session_id)
     if session:
         for key, value in kwargs.items():
             if hasattr(session, key):
                 setattr(session, key, value)
         session.updated_at = datetime.utcnow().isoformat() + "Z"
+        await _persist("update", session_id, {**kwargs, "updated_at": session.updated_at})
     return session
 
-def delete_session(session_id: str) -> bool:
+async def delete_session(session_id: str) -> bool:
     """Delete a session"""
-    if session_id in _sessions:
-        del _sessions[session_id]
-        return True
-    return False
+    if await _sessions.aget(session_id) is None:
+        return False
+    _sessions.remove(session_id)
+    await _persist("delete", session_id)
+    return True
 
 def list_sessions() -> List[Session]:
-    """List all sessions"""
-    return list(_sessions.values())
+    """List all non-expired sessions (in-memory copies take precedence)"""
+    sessions = {data["session_id"]: _session_from_dict(data) for data in _store.load_all(_expiry_cutoff())}
+    for session in _sessions.values():
+        sessions[session.session_id] = session
+    return list(sessions.values())
 
-def get_transcript_text(session_id: str) -> Optional[str]:
+def get_transcript_text(session: Session) -> str:
     """Generate downloadable transcript text"""
-    session = get_session(session_id)
-    if not session:
-        return None
     
     lines = [
         "=" * 60,
@@ -344,6 +541,8 @@ def get_transcript_text(session_id: str) -> Optional[str]:
         role_label = "Parent/Student" if turn.role == "user" else "Vikalp AI"
         lines.append(f"[{turn.timestamp}] {role_label}:")
         lines.append(turn.text)
+        if turn.heard_ms is not None:
+            lines.append(f"(interrupted after {turn.heard_ms / 1000:.1f}s of audio)")
         lines.append("")
     
     lines.extend([
@@ -355,5 +554,5 @@ def get_transcript_text(session_id: str) -> Optional[str]:
     return "\n".join(lines)
 
 
-# Load sessions on module import (after all classes are defined)
-_load_sessions_from_file()
+# Prepare the session store on module import (after all classes are defined)
+_init_session_store()
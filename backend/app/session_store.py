@@ -0,0 +1,301 @@
+"""
+Pluggable Session Storage
+
+Session reads and writes go through a SessionStore so several uvicorn
+workers (or instances) can serve the same session:
+
+- memory: process-local dicts; single worker, nothing survives a restart
+- sqlite: the app database in WAL mode (default). Point DB_PATH at a shared
+  volume to share it between workers on one host
+- redis:  any Redis-protocol server (REDIS_URL), for multiple hosts.
+  Needs `pip install redis`; REDIS_URL=fakeredis:// runs against an
+  in-process stand-in (`pip install fakeredis`) for local testing
+
+Writes arrive as batches of ops, see db.apply_session_ops for the format.
+Stores that are shared report a cheap per-session revision (updated_at) so
+a worker can tell when its cached copy was changed by another worker.
+"""
+import os
+import json
+from copy import deepcopy
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from . import db
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_PREFIX = os.getenv("REDIS_PREFIX", "vikalp:")
+
+
+class SessionStore:
+    """Interface for session persistence"""
+
+    # True if other processes see the same data (enables revision checks)
+    shared = False
+    # True if sessions survive a restart (legacy files are imported into it)
+    persistent = False
+
+    def init(self):
+        pass
+
+    def apply(self, ops: List[tuple]):
+        raise NotImplementedError
+
+    def insert(self, session: Dict, turns: Optional[List[Dict]] = None):
+        self.apply([("session", session)] + [
+            ("turn", session["session_id"], turn, session.get("updated_at"), None) for turn in turns or []
+        ])
+
+    def load(self, session_id: str, created_after: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def load_all(self, created_after: str) -> List[Dict]:
+        raise NotImplementedError
+
+    def revision(self, session_id: str) -> Optional[str]:
+        """updated_at of the stored session, or None if it does not exist"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def compact(self, created_before: str) -> int:
+        return 0
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store (single worker, no persistence)"""
+
+    def __init__(self):
+        self._sessions: Dict[str, Dict] = {}
+
+    def apply(self, ops: List[tuple]):
+        for op in ops:
+            kind = op[0]
+            if kind == "session":
+                session = deepcopy(op[1])
+                session["conversation"] = list(session.get("conversation", []))
+                self._sessions[session["session_id"]] = session
+            elif kind == "turn":
+                _, session_id, turn, updated_at, language = op
+                session = self._sessions.get(session_id)
+                if session:
+                    session["conversation"].append(dict(turn))
+                    session["updated_at"] = updated_at
+                    if language:
+                        session["detected_language"] = language
+            elif kind == "update":
+                session = self._sessions.get(op[1])
+                if session:
+                    session.update({k: v for k, v in op[2].items() if k in db.SESSION_COLUMNS and k != "session_id"})
+            elif kind == "delete":
+                self._sessions.pop(op[1], None)
+
+    def load(self, session_id: str, created_after: str) -> Optional[Dict]:
+        session = self._sessions.get(session_id)
+        if session and session["created_at"] >= created_after:
+            return deepcopy(session)
+        return None
+
+    def load_all(self, created_after: str) -> List[Dict]:
+        return [deepcopy(s) for s in self._sessions.values() if s["created_at"] >= created_after]
+
+    def revision(self, session_id: str) -> Optional[str]:
+        session = self._sessions.get(session_id)
+        return session["updated_at"] if session else None
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+    def compact(self, created_before: str) -> int:
+        expired = [sid for sid, s in self._sessions.items() if s["created_at"] < created_before]
+        for sid in expired:
+            del self._sessions[sid]
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in the app database (see db.py); shareable via DB_PATH"""
+
+    shared = True
+    persistent = True
+
+    def init(self):
+        db.init_db()
+
+    def apply(self, ops: List[tuple]):
+        db.apply_session_ops(ops)
+
+    def insert(self, session: Dict, turns: Optional[List[Dict]] = None):
+        db.insert_session(session, turns)
+
+    def load(self, session_id: str, created_after: str) -> Optional[Dict]:
+        return db.load_session(session_id, created_after)
+
+    def load_all(self, created_after: str) -> List[Dict]:
+        return db.load_sessions(created_after)
+
+    def revision(self, session_id: str) -> Optional[str]:
+        return db.session_revision(session_id)
+
+    def count(self) -> int:
+        return db.count_sessions()
+
+    def compact(self, created_before: str) -> int:
+        return db.compact_sessions(created_before)
+
+
+def _epoch(timestamp: str) -> float:
+    return datetime.fromisoformat(timestamp.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions in Redis:
+      {prefix}session:{id}  hash of session fields
+      {prefix}turns:{id}    list of JSON-encoded turns
+      {prefix}sessions      sorted set of ids scored by created_at
+    Keys expire on their own once the session is past expiry_days.
+    """
+
+    shared = True
+    persistent = True
+
+    def __init__(self, client, prefix: str = REDIS_PREFIX, expiry_days: int = 7):
+        self._redis = client
+        self.prefix = prefix
+        self.expiry_days = expiry_days
+
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.prefix}session:{session_id}"
+
+    def _turns_key(self, session_id: str) -> str:
+        return f"{self.prefix}turns:{session_id}"
+
+    @property
+    def _index_key(self) -> str:
+        return f"{self.prefix}sessions"
+
+    def init(self):
+        self._redis.ping()
+
+    def apply(self, ops: List[tuple]):
+        # Turns and updates only touch sessions that still exist: WATCH their
+        # hashes, check EXISTS, and retry if another worker changed one meanwhile
+        watched = list({self._session_key(op[1]) for op in ops if op[0] in ("turn", "update")})
+        self._redis.transaction(lambda pipe: self._queue_ops(pipe, ops, watched), *watched)
+
+    def _queue_ops(self, pipe, ops: List[tuple], watched: List[str]):
+        exists = dict(zip(watched, [pipe.exists(key) for key in watched]))
+        pipe.multi()
+        for op in ops:
+            kind = op[0]
+            if kind in ("turn", "update") and not exists.get(self._session_key(op[1])):
+                # Deleted (or expired): writing would recreate a hash without an expiry
+                continue
+            if kind == "session":
+                session = op[1]
+                session_id = session["session_id"]
+                fields = {k: session.get(k) or "" for k in db.SESSION_COLUMNS}
+                expire_at = int(_epoch(session["created_at"]) + timedelta(days=self.expiry_days).total_seconds())
+                pipe.hset(self._session_key(session_id), mapping=fields)
+                pipe.expireat(self._session_key(session_id), expire_at)
+                pipe.zadd(self._index_key, {session_id: _epoch(session["created_at"])})
+                exists[self._session_key(session_id)] = True
+            elif kind == "turn":
+                _, session_id, turn, updated_at, language = op
+                fields = {"updated_at": updated_at}
+                if language:
+                    fields["detected_language"] = language
+                pipe.rpush(self._turns_key(session_id), json.dumps({k: turn.get(k) for k in db.TURN_COLUMNS}))
+                # Refreshed per turn, so turns outlive the session hash by at most expiry_days
+                pipe.expire(self._turns_key(session_id), int(timedelta(days=self.expiry_days).total_seconds()))
+                pipe.hset(self._session_key(session_id), mapping=fields)
+            elif kind == "update":
+                _, session_id, fields = op
+                fields = {k: v or "" for k, v in fields.items() if k in db.SESSION_COLUMNS and k != "session_id"}
+                if fields:
+                    pipe.hset(self._session_key(session_id), mapping=fields)
+            elif kind == "delete":
+                session_id = op[1]
+                pipe.delete(self._session_key(session_id), self._turns_key(session_id))
+                pipe.zrem(self._index_key, session_id)
+                exists[self._session_key(session_id)] = False
+
+    def _decode(self, fields: Dict, turns: List) -> Optional[Dict]:
+        fields = {(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+                  for k, v in fields.items()}
+        if not fields.get("session_id"):
+            return None
+        session = {k: fields.get(k) or None for k in db.SESSION_COLUMNS}
+        session["conversation"] = [json.loads(t) for t in turns]
+        return session
+
+    def load(self, session_id: str, created_after: str) -> Optional[Dict]:
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.hgetall(self._session_key(session_id))
+        pipe.lrange(self._turns_key(session_id), 0, -1)
+        fields, turns = pipe.execute()
+        session = self._decode(fields, turns)
+        if session and session["created_at"] >= created_after:
+            return session
+        return None
+
+    def load_all(self, created_after: str) -> List[Dict]:
+        ids = self._redis.zrangebyscore(self._index_key, _epoch(created_after), "+inf")
+        pipe = self._redis.pipeline(transaction=False)
+        for session_id in ids:
+            session_id = session_id.decode() if isinstance(session_id, bytes) else session_id
+            pipe.hgetall(self._session_key(session_id))
+            pipe.lrange(self._turns_key(session_id), 0, -1)
+        results = pipe.execute()
+        sessions = []
+        for i in range(0, len(results), 2):
+            session = self._decode(results[i], results[i + 1])
+            if session:
+                sessions.append(session)
+        return sessions
+
+    def revision(self, session_id: str) -> Optional[str]:
+        value = self._redis.hget(self._session_key(session_id), "updated_at")
+        if value is None:
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def count(self) -> int:
+        return self._redis.zcard(self._index_key)
+
+    def compact(self, created_before: str) -> int:
+        # Session keys expire by themselves; only the index needs trimming
+        return self._redis.zremrangebyscore(self._index_key, "-inf", f"({_epoch(created_before)}")
+
+
+def create_session_store(backend: str = SESSION_BACKEND, expiry_days: int = 7) -> SessionStore:
+    """Build the configured store, falling back to SQLite if Redis is unavailable"""
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "redis":
+        if REDIS_URL.startswith("fakeredis://"):
+            if fakeredis is None:
+                print("[SESSION] REDIS_URL=fakeredis:// but the fakeredis package is not installed, using sqlite")
+            else:
+                return RedisSessionStore(fakeredis.FakeRedis(), expiry_days=expiry_days)
+        elif redis is None:
+            print("[SESSION] SESSION_BACKEND=redis but the redis package is not installed, using sqlite")
+        else:
+            return RedisSessionStore(redis.Redis.from_url(REDIS_URL), expiry_days=expiry_days)
+    elif backend != "sqlite":
+        print(f"[SESSION] Unknown SESSION_BACKEND={backend}, using sqlite")
+    return SQLiteSessionStore()
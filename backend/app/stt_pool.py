@@ -0,0 +1,217 @@
+"""
+Local Whisper Worker Pool
+
+Keeps faster-whisper warm in memory and runs transcriptions on a dedicated
+thread pool sized to the CPU, fed by a bounded queue. When the queue is full
+callers get STTPoolBusy instead of piling more work onto a saturated CPU.
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Any, List
+
+from .voice_config import get_config, VoiceConfig
+
+
+# Max seconds a caller waits for a queue slot before giving up
+STT_QUEUE_WAIT_SECONDS = float(os.getenv("STT_QUEUE_WAIT_SECONDS", "2"))
+
+# Compute types to try, in order, if the configured one cannot be loaded
+_COMPUTE_FALLBACKS = ["int8", "float32"]
+
+
+class STTPoolBusy(Exception):
+    """Raised when the transcription queue is full"""
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class WhisperWorkerPool:
+    """N workers sharing one faster-whisper model (CTranslate2 runs them in parallel)"""
+
+    def __init__(self, model_name: str, compute_type: str, workers: int, queue_size: int, beam_size: int = 5):
+        cores = os.cpu_count() or 1
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.workers = workers if workers > 0 else max(1, min(4, cores // 2))
+        self.cpu_threads = max(1, cores // self.workers)
+        self.beam_size = beam_size
+        # Constructor arguments, to tell whether a new config needs a new pool
+        self.settings = (model_name, compute_type, workers, queue_size)
+        self.model: Any = None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stt")
+        self._tasks: List[asyncio.Task] = []
+
+        # Metrics
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_ms: deque = deque(maxlen=200)
+        self._run_ms: deque = deque(maxlen=200)
+
+    def _load_model(self):
+        from faster_whisper import WhisperModel
+
+        last_error = None
+        for compute_type in [self.compute_type] + [c for c in _COMPUTE_FALLBACKS if c != self.compute_type]:
+            try:
+                model = WhisperModel(
+                    self.model_name,
+                    device="cpu",
+                    compute_type=compute_type,
+                    cpu_threads=self.cpu_threads,
+                    num_workers=self.workers,
+                )
+                self.compute_type = compute_type
+                return model
+            except Exception as e:
+                print(f"[STT] compute_type={compute_type} failed: {e}")
+                last_error = e
+        raise last_error
+
+    async def start(self):
+        """Load the model (off the event loop) and start the workers"""
+        loop = asyncio.get_running_loop()
+        self.model = await loop.run_in_executor(self._executor, self._load_model)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"[STT] faster-whisper ready: {self.model_name} ({self.compute_type}), "
+              f"{self.workers} workers x {self.cpu_threads} threads")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def transcribe(self, audio: Any) -> str:
+        """Queue audio (file path or float32 array) and wait for the text"""
+        future = asyncio.get_running_loop().create_future()
+        job = (audio, future, time.perf_counter())
+        try:
+            await asyncio.wait_for(self._queue.put(job), timeout=STT_QUEUE_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise STTPoolBusy(f"STT queue full ({self._queue.qsize()} jobs waiting)")
+        return await future
+
+    def _run(self, audio: Any) -> str:
+        segs, _ = self.model.transcribe(audio, beam_size=self.beam_size)
+        return " ".join([s.text for s in segs]).strip()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            audio, future, enqueued_at = await self._queue.get()
+            started = time.perf_counter()
+            self._wait_ms.append((started - enqueued_at) * 1000)
+            try:
+                text = await loop.run_in_executor(self._executor, self._run, audio)
+                self.completed += 1
+                if not future.done():
+                    future.set_result(text)
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._run_ms.append((time.perf_counter() - started) * 1000)
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        wait = list(self._wait_ms)
+        run = list(self._run_ms)
+        return {
+            "model": self.model_name,
+            "compute_type": self.compute_type,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize(),
+            "queue_max": self._queue.maxsize,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_ms_p50": round(_percentile(wait, 50), 1),
+            "wait_ms_p95": round(_percentile(wait, 95), 1),
+            "run_ms_p50": round(_percentile(run, 50), 1),
+            "run_ms_p95": round(_percentile(run, 95), 1),
+        }
+
+
+_pool: Optional[WhisperWorkerPool] = None
+_pool_lock: Optional[asyncio.Lock] = None
+# Config version the running pool was checked against
+_pool_version: Optional[int] = None
+_retiring: set = set()
+
+
+def _pool_settings(config: VoiceConfig) -> tuple:
+    return (config.local_whisper_model, config.local_whisper_compute_type, config.stt_workers, config.stt_queue_size)
+
+
+async def _retire(pool: WhisperWorkerPool):
+    """Stop a replaced pool once the jobs already queued on it are done"""
+    try:
+        await pool._queue.join()
+    finally:
+        await pool.stop()
+        print(f"[STT] Retired pool for {pool.model_name}")
+
+
+async def get_stt_pool(config: Optional[VoiceConfig] = None) -> Optional[WhisperWorkerPool]:
+    """
+    Get the running pool, starting it on first use; None if the model cannot
+    load. A config reload that changes the Whisper settings swaps in a new pool.
+    """
+    global _pool, _pool_lock, _pool_version
+    config = config or get_config()
+    # A request still holding an older snapshot must not roll the pool back
+    if _pool and config.version <= _pool_version:
+        return _pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool and config.version <= _pool_version:
+            return _pool
+        settings = _pool_settings(config)
+        if _pool and _pool.settings == settings:
+            _pool_version = config.version
+            return _pool
+        pool = WhisperWorkerPool(*settings)
+        try:
+            await pool.start()
+        except Exception as e:
+            print(f"[STT] faster-whisper failed: {e}")
+            await pool.stop()
+            # Keep serving with the old model rather than none
+            return _pool
+        old, _pool, _pool_version = _pool, pool, config.version
+        if old:
+            task = asyncio.create_task(_retire(old))
+            _retiring.add(task)
+            task.add_done_callback(_retiring.discard)
+        return _pool
+
+
+async def shutdown_stt_pool():
+    """Stop workers and release the model"""
+    global _pool, _pool_version
+    for task in list(_retiring):
+        task.cancel()
+    await asyncio.gather(*_retiring, return_exceptions=True)
+    if _pool:
+        await _pool.stop()
+        _pool = None
+        _pool_version = None
+
+
+def stt_pool_stats() -> Optional[dict]:
+    return _pool.stats() if _pool else None
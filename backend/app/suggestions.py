@@ -114,3 +114,10 @@ def get_contextual_suggestions(conversation_history: list = None) -> list[dict]:
 def get_multilingual_starters() -> list[dict]:
     """Get multilingual welcome suggestions"""
     return MULTILINGUAL_STARTERS
+
+
+def get_all_starter_texts() -> set[str]:
+    """Texts of every conversation starter (questions that stand on their own)"""
+    groups = [DEFAULT_GRADE_STARTERS, MULTILINGUAL_STARTERS]
+    groups += list(GRADE_STARTERS.values()) + list(INTENT_STARTERS.values())
+    return {item["text"] for group in groups for item in group}
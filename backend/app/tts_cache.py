@@ -0,0 +1,199 @@
+"""
+Content-addressed TTS Audio Cache
+
+Synthesized mp3 files are stored under data/tts_cache/ and named by a hash of
+(normalized text, provider, model, voice), so repeated answers are served
+from disk instead of calling OpenAI TTS or gTTS again. The cache is bounded
+by total size and evicts least recently used files first.
+
+An evicted file is deleted only after TTS_CACHE_EVICT_GRACE_SECONDS: an
+audio_url already sent to a client, or a join in progress, may still point
+at it. Filesystem calls run in a thread, off the event loop.
+"""
+import os
+import re
+import time
+import uuid
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Directory for data files
+ROOT = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(ROOT, "..", ".."))
+DATA_DIR = os.path.join(PROJECT_ROOT, "backend", "data")
+TTS_CACHE_DIR = os.path.join(DATA_DIR, "tts_cache")
+os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+
+# Size budget for cached audio
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "256"))
+# Evicted files stay on disk this long before they are deleted
+TTS_CACHE_EVICT_GRACE_SECONDS = float(os.getenv("TTS_CACHE_EVICT_GRACE_SECONDS", "600"))
+
+
+def normalize_tts_text(text: str) -> str:
+    """Collapse whitespace so trivially different texts share an entry"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def tts_cache_key(text: str, provider: str, model: str, voice: str) -> str:
+    """Hash of everything that affects the rendered audio"""
+    raw = "\x1f".join([normalize_tts_text(text), provider, model, voice])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Size-bounded LRU of mp3 files keyed by content hash"""
+
+    def __init__(self, directory: str, max_bytes: int, grace: float = TTS_CACHE_EVICT_GRACE_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.grace = grace
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._bytes = 0
+        # Evicted but not yet deleted: key -> (delete after, size)
+        self._doomed: Dict[str, Tuple[float, int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rescued = 0
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from file mtimes (hits touch the mtime)"""
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".part"):
+                # Leftover from an interrupted write
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(".mp3"):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, name[:-4], st.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+        # Nothing can reference these yet (startup)
+        self._delete_paths(self._expired_doomed(float("inf")))
+        print(f"[TTS-CACHE] Loaded {len(self._entries)} entries ({self._bytes // 1024} KB)")
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def temp_path_for(self, key: str) -> str:
+        """Unique temp path to synthesize into before commit()"""
+        return os.path.join(self.directory, f"{key}.{uuid.uuid4().hex[:8]}.part")
+
+    async def lookup(self, key: str) -> Optional[str]:
+        """Return the cached mp3 path for key, or None on a miss"""
+        if key in self._doomed:
+            # Evicted but still on disk: take it back
+            _, size = self._doomed.pop(key)
+            self._entries[key] = size
+            self._bytes += size
+            self.rescued += 1
+        if key in self._entries:
+            path = self.path_for(key)
+            try:
+                await asyncio.to_thread(os.utime, path)
+            except OSError:
+                # File removed behind our back
+                if key in self._entries:
+                    self._bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            if key not in self._entries:
+                # Evicted while the touch ran; its file lives out the grace period
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._evict()
+            return path
+        self.misses += 1
+        return None
+
+    async def commit(self, key: str, temp_path: str) -> Optional[str]:
+        """Move a finished temp file into the cache and return its path"""
+        path = self.path_for(key)
+        # Replacing the file: a pending delete would now remove the new one
+        self._doomed.pop(key, None)
+        size = await asyncio.to_thread(self._move, temp_path, path)
+        if size is None:
+            return None
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)
+        self._doomed.pop(key, None)
+        self._entries[key] = size
+        self._bytes += size
+        self._evict()
+        await self.purge()
+        return path if key in self._entries else None
+
+    @staticmethod
+    def _move(temp_path: str, path: str) -> Optional[int]:
+        if not os.path.exists(temp_path):
+            return None
+        os.replace(temp_path, path)
+        return os.path.getsize(path)
+
+    async def discard(self, temp_path: str):
+        """Remove a temp file after a failed synthesis"""
+        await asyncio.to_thread(self._delete_paths, [temp_path])
+
+    def _evict(self):
+        """Drop LRU entries past the budget; their files are deleted after the grace period"""
+        deadline = time.monotonic() + self.grace
+        while self._bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            self._doomed[key] = (deadline, size)
+
+    def _expired_doomed(self, now: float) -> List[str]:
+        expired = [key for key, (deadline, _) in self._doomed.items() if deadline <= now]
+        for key in expired:
+            del self._doomed[key]
+        return [self.path_for(key) for key in expired]
+
+    async def purge(self):
+        """Delete evicted files whose grace period is over"""
+        paths = self._expired_doomed(time.monotonic())
+        if paths:
+            await asyncio.to_thread(self._delete_paths, paths)
+
+    @staticmethod
+    def _delete_paths(paths: List[str]):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "pending_deletes": len(self._doomed),
+            "rescued": self.rescued,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+tts_cache = TTSCache(TTS_CACHE_DIR, int(TTS_CACHE_MAX_MB * 1024 * 1024))
@@ -0,0 +1,157 @@
+"""
+Sentence-level TTS Pipeline for Chained Architecture
+
+Splits streaming LLM output at sentence boundaries and starts TTS for each
+sentence as soon as it is complete, while the LLM is still generating the
+next one. Finished segments are delivered strictly in order, so the client
+can start playing the first sentence long before the full reply is ready.
+"""
+import re
+import asyncio
+from typing import Optional, Callable, Awaitable, List, Tuple
+
+
+# Sentence end: . ! ? or Hindi danda, optionally followed by closing quotes/brackets, then whitespace
+_SENTENCE_END = re.compile(r'([.!?।]+["\')\]]*)(\s+)')
+
+# Abbreviations that end with a period but do not end a sentence
+_ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "rs.", "e.g.", "i.e.", "etc.", "vs.", "st.", "no."}
+
+# Segments shorter than this are merged with the next one (avoids choppy audio)
+MIN_SEGMENT_CHARS = 24
+
+# Max TTS requests in flight per reply
+MAX_PARALLEL_TTS = 2
+
+
+def clean_text_for_tts(text: str) -> str:
+    """Remove emojis and markdown so they are not read aloud"""
+    # Remove emojis (regex for common ranges)
+    text = re.sub(r'[\U00010000-\U0010ffff]', '', text)
+    # Remove markdown asterisks (bold/italic) and hashes
+    text = text.replace('*', '').replace('#', '')
+    return text.strip()
+
+
+class SentenceSplitter:
+    """Incrementally split streamed text into sentences"""
+
+    def __init__(self, min_chars: int = MIN_SEGMENT_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add a delta and return any sentences it completed"""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            end = match.end(1)
+            candidate = self._buffer[start:end].strip()
+            last_word = candidate.rsplit(None, 1)[-1].lower() if candidate else ""
+            if last_word in _ABBREVIATIONS or len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        # Paragraph breaks end a segment too (list items, headings)
+        pos = start
+        while True:
+            newline = self._buffer.find("\n", pos)
+            if newline == -1:
+                break
+            candidate = self._buffer[start:newline].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = newline + 1
+            pos = newline + 1
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left once the stream ends"""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest or None
+
+
+class TTSPipeline:
+    """
+    Run TTS per sentence while the LLM keeps streaming.
+
+    synthesize(text, index) returns an audio filename (or None on failure);
+    on_segment(index, text, filename) is awaited for each segment in order.
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[[str, int], Awaitable[Optional[str]]],
+        on_segment: Callable[[int, str, Optional[str]], Awaitable[None]],
+        max_parallel: int = MAX_PARALLEL_TTS,
+    ):
+        self._synthesize = synthesize
+        self._on_segment = on_segment
+        self._splitter = SentenceSplitter()
+        self._limit = asyncio.Semaphore(max_parallel)
+        self._pending: asyncio.Queue = asyncio.Queue()
+        self._results: List[Tuple[int, str, Optional[str]]] = []
+        self._index = 0
+        self._sender = asyncio.create_task(self._send_in_order())
+
+    def feed(self, delta: str):
+        """Feed an LLM delta; completed sentences start TTS immediately"""
+        for sentence in self._splitter.feed(delta):
+            self._schedule(sentence)
+
+    async def finish(self) -> List[Tuple[int, str, Optional[str]]]:
+        """Flush the tail, wait for every segment and return them in order"""
+        rest = self._splitter.flush()
+        if rest:
+            self._schedule(rest)
+        self._pending.put_nowait(None)
+        await self._sender
+        return self._results
+
+    async def cancel(self):
+        """Abort outstanding TTS work (e.g. when the LLM stream fails)"""
+        self._sender.cancel()
+        while not self._pending.empty():
+            item = self._pending.get_nowait()
+            if item:
+                item[2].cancel()
+        try:
+            await self._sender
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    def _schedule(self, text: str):
+        index = self._index
+        self._index += 1
+        task = asyncio.create_task(self._run(text, index))
+        self._pending.put_nowait((index, text, task))
+
+    async def _run(self, text: str, index: int) -> Optional[str]:
+        async with self._limit:
+            try:
+                return await self._synthesize(text, index)
+            except Exception as e:
+                print(f"[TTS] Segment {index} failed: {e}")
+                return None
+
+    async def _send_in_order(self):
+        while True:
+            item = await self._pending.get()
+            if item is None:
+                return
+            index, text, task = item
+            filename = await task
+            self._results.append((index, text, filename))
+            await self._on_segment(index, text, filename)
+
+
+def join_segments(paths: List[str], output_path: str) -> bool:
+    """Concatenate MP3 segments into one file (MP3 frames concatenate cleanly)"""
+    with open(output_path, "wb") as out:
+        for path in paths:
+            with open(path, "rb") as f:
+                out.write(f.read())
+    return bool(paths)
@@ -9,9 +9,10 @@ Supports two architectures:
    Model: gpt-4o-realtime-preview
 """
 import os
+import threading
 from enum import Enum
-from dataclasses import dataclass
-from typing import Literal
+from dataclasses import dataclass, fields, replace
+from typing import Literal, Optional
 
 
 class ArchitectureMode(str, Enum):
@@ -34,9 +35,9 @@ class TTSProvider(str, Enum):
     GTTS = "gtts"  # Google TTS (free fallback)
 
 
-@dataclass
+@dataclass(frozen=True)
 class VoiceConfig:
-    """Configuration for voice agent"""
+    """Configuration for voice agent (immutable snapshot)"""
     # Architecture mode
     architecture: ArchitectureMode = ArchitectureMode.CHAINED
     
@@ -67,6 +68,12 @@ class VoiceConfig:
     
     # Local Whisper Configuration (fallback)
     local_whisper_model: str = "small"
+    local_whisper_compute_type: str = "int8"  # Options: int8, int8_float16, float32
+    stt_workers: int = 0  # 0 = derive from CPU cores
+    stt_queue_size: int = 16
+    
+    # Snapshot version, bumped on every reload/update
+    version: int = 0
 
 
 def load_config() -> VoiceConfig:
@@ -104,21 +111,47 @@ def load_config() -> VoiceConfig:
         
         # Local Whisper (fallback)
         local_whisper_model=os.getenv("TRANSCRIBE_MODEL", "small").strip(),
+        local_whisper_compute_type=os.getenv("WHISPER_COMPUTE_TYPE", "int8").strip(),
+        stt_workers=int(os.getenv("STT_WORKERS", "0")),
+        stt_queue_size=int(os.getenv("STT_QUEUE_SIZE", "16")),
     )
 
 
-# Global config instance - always reload fresh for development
+# Process-wide config snapshot. Readers get an immutable object, so a turn that
+# grabbed a snapshot keeps a consistent view even if the config changes mid-turn.
+_config: Optional[VoiceConfig] = None
+_version = 0
+_overrides: dict = {}
+_lock = threading.RLock()
+
+
 def get_config() -> VoiceConfig:
-    """Get or create the global config instance - reloads each time for dev"""
-    return load_config()
+    """Get the current config snapshot (loaded from env on first use)"""
+    config = _config
+    if config is None:
+        config = reload_config()
+    return config
+
+
+def reload_config(clear_overrides: bool = False) -> VoiceConfig:
+    """Re-read environment variables, keeping runtime overrides unless cleared"""
+    global _config, _version
+    with _lock:
+        if clear_overrides:
+            _overrides.clear()
+        _version += 1
+        _config = replace(load_config(), version=_version, **_overrides)
+        return _config
 
 
 def update_config(**kwargs) -> VoiceConfig:
     """Update config at runtime (useful for API-driven changes)"""
-    global _config
-    config = get_config()
-    for key, value in kwargs.items():
-        if hasattr(config, key):
-            setattr(config, key, value)
-    return config
-
+    global _config, _version
+    names = {f.name for f in fields(VoiceConfig)} - {"version"}
+    updates = {key: value for key, value in kwargs.items() if key in names}
+    with _lock:
+        current = get_config()
+        _overrides.update(updates)
+        _version += 1
+        _config = replace(current, version=_version, **updates)
+        return _config
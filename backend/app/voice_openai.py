@@ -7,10 +7,12 @@ Implements:
 - TTS: Text-to-Speech using tts-1, tts-1-hd, gpt-4o-mini-tts
 """
 import os
+import json
 import asyncio
-import httpx
-from typing import Optional
-from .voice_config import get_config, STTProvider, LLMProvider, TTSProvider
+from typing import Optional, AsyncIterator, Union
+from .voice_config import get_config, VoiceConfig, STTProvider, LLMProvider, TTSProvider
+from .http_clients import get_http_client, STAGE_TIMEOUTS
+from .audio_decode import guess_audio_format
 
 
 # OpenAI API endpoints
@@ -20,15 +22,21 @@ OPENAI_CHAT_ENDPOINT = f"{OPENAI_API_BASE}/chat/completions"
 OPENAI_TTS_ENDPOINT = f"{OPENAI_API_BASE}/audio/speech"
 
 
-async def transcribe_audio_openai(audio_path: str, language: Optional[str] = None) -> str:
+class LLMNotConfigured(RuntimeError):
+    """The LLM provider has no API key; raised instead of replying with placeholder text"""
+
+
+async def transcribe_audio_openai(audio: Union[str, bytes], language: Optional[str] = None, config: Optional[VoiceConfig] = None) -> str:
     """
     Transcribe audio using OpenAI's Whisper API.
     
+    `audio` is a file path or the raw bytes of an uploaded recording.
+    
     Models:
     - whisper-1: Standard Whisper model
     - gpt-4o-transcribe: Enhanced transcription (coming soon)
     """
-    config = get_config()
+    config = config or get_config()
     
     if not config.openai_api_key:
         return "(no OPENAI_API_KEY set)"
@@ -37,28 +45,40 @@ async def transcribe_audio_openai(audio_path: str, language: Optional[str] = Non
         "Authorization": f"Bearer {config.openai_api_key}",
     }
     
-    # Read audio file
-    with open(audio_path, "rb") as audio_file:
+    # Upload straight from memory when we already have the bytes
+    if isinstance(audio, bytes):
+        filename, mime = guess_audio_format(audio)
+        audio_file = None
+        upload = (filename, audio, mime)
+    else:
+        audio_file = open(audio, "rb")
+        upload = (os.path.basename(audio), audio_file, "audio/wav")
+    
+    try:
         files = {
-            "file": (os.path.basename(audio_path), audio_file, "audio/wav"),
+            "file": upload,
             "model": (None, config.stt_model),
         }
         if language:
             files["language"] = (None, language)
         
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                OPENAI_TRANSCRIPTION_ENDPOINT,
-                headers=headers,
-                files=files
-            )
-            response.raise_for_status()
-            result = response.json()
+        client = get_http_client("openai")
+        response = await client.post(
+            OPENAI_TRANSCRIPTION_ENDPOINT,
+            headers=headers,
+            files=files,
+            timeout=STAGE_TIMEOUTS["stt"]
+        )
+        response.raise_for_status()
+        result = response.json()
+    finally:
+        if audio_file:
+            audio_file.close()
     
     return result.get("text", "")
 
 
-async def chat_completion_openai(messages: list[dict], temperature: float = 0.7) -> str:
+async def chat_completion_openai(messages: list[dict], temperature: float = 0.7, config: Optional[VoiceConfig] = None) -> str:
     """
     Generate chat completion using OpenAI's API.
     
@@ -67,10 +87,10 @@ async def chat_completion_openai(messages: list[dict], temperature: float = 0.7)
     - gpt-4.1: Enhanced reasoning
     - gpt-4o-mini: Faster, cheaper
     """
-    config = get_config()
+    config = config or get_config()
     
     if not config.openai_api_key:
-        return "(no OPENAI_API_KEY set)"
+        raise LLMNotConfigured("no OPENAI_API_KEY set")
     
     headers = {
         "Authorization": f"Bearer {config.openai_api_key}",
@@ -83,19 +103,54 @@ async def chat_completion_openai(messages: list[dict], temperature: float = 0.7)
         "temperature": temperature,
     }
     
-    async with httpx.AsyncClient(timeout=90.0) as client:
-        response = await client.post(
-            OPENAI_CHAT_ENDPOINT,
-            headers=headers,
-            json=data
-        )
-        response.raise_for_status()
-        result = response.json()
+    client = get_http_client("openai")
+    response = await client.post(
+        OPENAI_CHAT_ENDPOINT,
+        headers=headers,
+        json=data,
+        timeout=STAGE_TIMEOUTS["llm"]
+    )
+    response.raise_for_status()
+    result = response.json()
     
     return result.get("choices", [{}])[0].get("message", {}).get("content", "")
 
 
-async def text_to_speech_openai(text: str, output_path: str) -> bool:
+async def stream_chat_completion_openai(messages: list[dict], temperature: float = 0.7, config: Optional[VoiceConfig] = None) -> AsyncIterator[str]:
+    """
+    Stream a chat completion from OpenAI, yielding content deltas as they arrive.
+    """
+    config = config or get_config()
+    
+    if not config.openai_api_key:
+        raise LLMNotConfigured("no OPENAI_API_KEY set")
+    
+    headers = {
+        "Authorization": f"Bearer {config.openai_api_key}",
+        "Content-Type": "application/json",
+    }
+    
+    data = {
+        "model": config.llm_model,
+        "messages": messages,
+        "temperature": temperature,
+        "stream": True,
+    }
+    
+    client = get_http_client("openai")
+    async with client.stream(
+        "POST",
+        OPENAI_CHAT_ENDPOINT,
+        headers=headers,
+        json=data,
+        timeout=STAGE_TIMEOUTS["llm"]
+    ) as response:
+        response.raise_for_status()
+        async for delta in _iter_sse_deltas(response):
+            yield delta
+
+
+async def text_to_speech_openai(text: str, output_path: str, config: Optional[VoiceConfig] = None) -> bool:
     """
     Convert text to speech using OpenAI's TTS API.
     
@@ -106,7 +161,7 @@ async def text_to_speech_openai(text: str, output_path: str) -> bool:
     
     Voices: alloy, echo, fable, onyx, nova, shimmer
     """
-    config = get_config()
+    config = config or get_config()
     
     if not config.openai_api_key:
         return False
@@ -123,28 +178,29 @@ async def text_to_speech_openai(text: str, output_path: str) -> bool:
         "response_format": "mp3",
     }
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(
-            OPENAI_TTS_ENDPOINT,
-            headers=headers,
-            json=data
-        )
-        response.raise_for_status()
-        
-        # Write audio to file
-        with open(output_path, "wb") as f:
-            f.write(response.content)
+    client = get_http_client("openai")
+    response = await client.post(
+        OPENAI_TTS_ENDPOINT,
+        headers=headers,
+        json=data,
+        timeout=STAGE_TIMEOUTS["tts"]
+    )
+    response.raise_for_status()
+    
+    # Write audio to file
+    with open(output_path, "wb") as f:
+        f.write(response.content)
     
     return os.path.exists(output_path)
 
 
 # OpenRouter fallback for LLM
-async def chat_completion_openrouter(messages: list[dict], temperature: float = 0.7) -> str:
+async def chat_completion_openrouter(messages: list[dict], temperature: float = 0.7, config: Optional[VoiceConfig] = None) -> str:
     """Fallback LLM using OpenRouter API"""
-    config = get_config()
+    config = config or get_config()
     
     if not config.openrouter_api_key:
-        return "(no OPENROUTER_API_KEY set)"
+        raise LLMNotConfigured("no OPENROUTER_API_KEY set")
     
     headers = {
         "Authorization": f"Bearer {config.openrouter_api_key}",
@@ -159,10 +215,56 @@ async def chat_completion_openrouter(messages: list[dict], temperature: float =
     
     endpoint = f"{config.openrouter_base}/v1/chat/completions"
     
-    async with httpx.AsyncClient(timeout=90.0) as client:
-        response = await client.post(endpoint, headers=headers, json=data)
-        response.raise_for_status()
-        result = response.json()
+    client = get_http_client("openrouter")
+    response = await client.post(endpoint, headers=headers, json=data, timeout=STAGE_TIMEOUTS["llm"])
+    response.raise_for_status()
+    result = response.json()
     
     return result.get("choices", [{}])[0].get("message", {}).get("content", "")
 
+
+async def stream_chat_completion_openrouter(messages: list[dict], temperature: float = 0.7, config: Optional[VoiceConfig] = None) -> AsyncIterator[str]:
+    """Streaming variant of the OpenRouter fallback LLM"""
+    config = config or get_config()
+    
+    if not config.openrouter_api_key:
+        raise LLMNotConfigured("no OPENROUTER_API_KEY set")
+    
+    headers = {
+        "Authorization": f"Bearer {config.openrouter_api_key}",
+        "Content-Type": "application/json",
+    }
+    
+    data = {
+        "model": config.openrouter_model,
+        "messages": messages,
+        "temperature": temperature,
+        "stream": True,
+    }
+    
+    endpoint = f"{config.openrouter_base}/v1/chat/completions"
+    
+    client = get_http_client("openrouter")
+    async with client.stream("POST", endpoint, headers=headers, json=data, timeout=STAGE_TIMEOUTS["llm"]) as response:
+        response.raise_for_status()
+        async for delta in _iter_sse_deltas(response):
+            yield delta
+
+
+async def _iter_sse_deltas(response) -> AsyncIterator[str]:
+    """Parse an OpenAI-style SSE stream and yield the content deltas"""
+    async for line in response.aiter_lines():
+        # Skip blank keep-alive lines and ": comment" lines (OpenRouter sends these)
+        if not line.startswith("data:"):
+            continue
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            break
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            continue
+        choices = chunk.get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            yield delta
@@ -0,0 +1,129 @@
+"""
+Benchmark: pooled provider client vs a fresh httpx.AsyncClient per call
+
+Starts a local stub of the chat completions endpoint, then issues the same
+number of LLM calls two ways and reports how many TCP connections the stub
+accepted and the mean latency per call.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_http_pool --requests 200
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import httpx
+
+from backend.app.http_clients import get_http_client, close_http_clients
+from backend.app.voice_openai import chat_completion_openrouter
+
+
+STUB_REPLY = json.dumps({
+    "choices": [{"message": {"role": "assistant", "content": "Fees are listed on the admissions page."}}]
+}).encode()
+
+
+class StubServer:
+    """Minimal keep-alive HTTP/1.1 server that counts accepted connections"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def reset(self):
+        self.connections = 0
+        self.requests = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(STUB_REPLY)).encode() + b"\r\n"
+                    b"Connection: keep-alive\r\n\r\n" + STUB_REPLY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _fresh_client_call(endpoint: str, messages: list[dict]) -> str:
+    """The pre-pool behaviour: one client (and connection) per call"""
+    async with httpx.AsyncClient(timeout=90.0) as client:
+        response = await client.post(endpoint, json={"messages": messages})
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+async def _run(label: str, server: StubServer, call, count: int, concurrency: int):
+    server.reset()
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    total = time.perf_counter() - start
+    mean_ms = sum(latencies) / len(latencies) * 1000
+    print(f"{label:<14} requests={server.requests:<5} connections={server.connections:<5} "
+          f"mean={mean_ms:7.2f} ms  total={total:6.2f} s")
+
+
+async def main(count: int, concurrency: int, latency_ms: float):
+    server = StubServer(latency_ms)
+    port = await server.start()
+    base = f"http://127.0.0.1:{port}"
+    os.environ["OPENROUTER_BASE"] = base
+    os.environ["OPENROUTER_API_KEY"] = "bench"
+    messages = [{"role": "user", "content": "What are the fees?"}]
+
+    try:
+        await _run("fresh-client", server,
+                   lambda: _fresh_client_call(f"{base}/v1/chat/completions", messages),
+                   count, concurrency)
+        get_http_client("openrouter")
+        await _run("pooled-client", server,
+                   lambda: chat_completion_openrouter(messages),
+                   count, concurrency)
+    finally:
+        await close_http_clients()
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="artificial stub latency")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency_ms))
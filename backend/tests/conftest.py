@@ -0,0 +1,7 @@
+"""Point the app database at a temporary file before any app module is imported"""
+import os
+import tempfile
+
+_data = tempfile.mkdtemp(prefix="vikalp-tests-")
+os.environ.setdefault("DB_PATH", os.path.join(_data, "agent.db"))
+os.environ.setdefault("SESSION_BACKEND", "sqlite")
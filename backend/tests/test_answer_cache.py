@@ -0,0 +1,53 @@
+"""Opening questions are answered from a lead-free prompt and shared across sessions"""
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.answer_cache import answer_cache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    prompts = []
+
+    async def fake_stream(messages, config=None):
+        prompts.append(messages)
+        yield "Fees are listed on the fee plan."
+
+    async def no_audio(text, config=None):
+        return None
+
+    monkeypatch.setattr(main, "stream_llm", fake_stream)
+    monkeypatch.setattr(main, "tts_save", no_audio)
+    monkeypatch.setattr(main, "update_memory_summary", lambda session, config: None)
+    answer_cache.clear()
+    client = TestClient(main.app)
+    client.prompts = prompts
+    yield client
+    answer_cache.clear()
+
+
+def _ask(client, name: str, text: str) -> dict:
+    session = client.post("/sessions", json={
+        "grade": "Grade 5", "name": name, "email": f"{name.lower()}@example.com",
+        "mobile": "9999999999", "intent": "Fees",
+    }).json()
+    with client.websocket_connect(f"/ws?session_id={session['session_id']}") as ws:
+        ws.send_json({"type": "text", "text": text})
+        while True:
+            frame = ws.receive_json()
+            if frame["type"] in ("final", "error"):
+                return frame
+
+
+def test_second_session_hits_cache(client):
+    first = _ask(client, "Asha", "What are the fees for Grade 5?")
+    assert first["type"] == "final" and not first["cached"]
+    # The shared answer was generated without the lead's details
+    assert "Asha" not in client.prompts[0][0]["content"]
+
+    second = _ask(client, "Ravi", "What are the fees for Grade 5?")
+    assert second["cached"]
+    assert second["text"] == first["text"]
+    assert len(client.prompts) == 1
+    assert answer_cache.stats()["stores"] >= 1
@@ -0,0 +1,119 @@
+"""Lead creation must not wait on SMTP: email runs on its own writer lane"""
+import asyncio
+import socket
+import threading
+import time
+
+from backend.app.background_writer import BackgroundWriter
+
+
+def test_stalled_email_lane_does_not_block_db_lane():
+    stall = threading.Event()
+    sending = threading.Event()
+    written = []
+
+    def send(leads):
+        sending.set()
+        stall.wait(5)
+
+    async def run():
+        writer = BackgroundWriter(100, 10, 0.01)
+        writer.register("session_ops", written.extend)
+        writer.register("lead_email", send, lane="email")
+        await writer.start()
+        try:
+            await writer.submit("lead_email", {"name": "Asha"})
+            assert await asyncio.to_thread(sending.wait, 2)
+
+            started = time.perf_counter()
+            await writer.run_now("session_ops", "inline")
+            assert time.perf_counter() - started < 0.5
+
+            await writer.submit("session_ops", "queued")
+            for _ in range(100):
+                if "queued" in written:
+                    break
+                await asyncio.sleep(0.01)
+            assert written == ["inline", "queued"]
+            assert writer.stats()["lanes"]["email"] == 0
+        finally:
+            stall.set()
+            await writer.stop()
+        assert writer.processed == 3
+
+    asyncio.run(run())
+
+
+class _StallingSMTP:
+    """Accepts connections but holds back the greeting until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.connections = 0
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            self.release.wait(10)
+            conn.sendall(b"421 closing\r\n")
+            conn.close()
+
+    def close(self):
+        self.release.set()
+        self.sock.close()
+
+
+def test_lead_creation_does_not_wait_for_smtp(monkeypatch):
+    from backend.app import db, session_manager
+    from backend.app.background_writer import background_writer
+
+    smtp = _StallingSMTP()
+    monkeypatch.setattr(session_manager, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(session_manager, "SMTP_PORT", smtp.port)
+    monkeypatch.setattr(session_manager, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(session_manager, "SMTP_USER", "bot@example.com")
+    monkeypatch.setattr(session_manager, "SMTP_PASSWORD", "secret")
+    monkeypatch.setattr(session_manager, "LEAD_NOTIFICATION_EMAIL", "leads@example.com")
+
+    async def create_lead(name: str) -> float:
+        started = time.perf_counter()
+        session = await session_manager.create_session("Grade 5", name, "a@example.com", "9999999999", "Fees")
+        await session_manager.save_and_notify_lead(session)
+        return time.perf_counter() - started
+
+    async def run():
+        leads_before = db.count_leads()
+        await background_writer.start()
+        try:
+            # First lead's email is now stuck waiting for the SMTP greeting
+            await create_lead("Lead 0")
+            for _ in range(200):
+                if smtp.connections:
+                    break
+                await asyncio.sleep(0.01)
+            assert smtp.connections == 1
+
+            timings = [await create_lead(f"Lead {i}") for i in range(1, 4)]
+            assert max(timings) < 0.5, timings
+
+            # Their leads reach the database while the SMTP server is still stalled
+            for _ in range(200):
+                if db.count_leads() == leads_before + 4:
+                    break
+                await asyncio.sleep(0.01)
+            assert db.count_leads() == leads_before + 4
+            assert smtp.connections == 1
+        finally:
+            smtp.close()
+            await background_writer.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,137 @@
+"""Realtime handler and prewarmed pool against a local fake Realtime server"""
+import asyncio
+import json
+from dataclasses import replace
+
+import pytest
+import websockets
+
+from backend.app import realtime_handler, realtime_pool
+from backend.app.realtime_handler import RealtimeHandler, open_realtime_socket
+from backend.app.realtime_pool import RealtimePool
+from backend.app.session_manager import ConversationTurn, Session
+from backend.app.voice_config import get_config
+
+
+class FakeRealtimeServer:
+    """Accepts Realtime sockets and records the events each one receives"""
+
+    def __init__(self):
+        self.sockets = []
+        self.events = []  # One list of received events per connection
+        self._server = None
+
+    async def __aenter__(self):
+        self._server = await websockets.serve(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, ws):
+        events = []
+        self.sockets.append(ws)
+        self.events.append(events)
+        async for message in ws:
+            events.append(json.loads(message))
+
+    async def wait_for(self, predicate, timeout: float = 3.0):
+        async def poll():
+            while not predicate():
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.fixture
+def config(monkeypatch):
+    config = replace(get_config(), openai_api_key="test-key")
+    monkeypatch.setattr(realtime_pool, "get_config", lambda: config)
+    monkeypatch.setattr(realtime_handler, "REALTIME_RECONNECT_BASE_DELAY", 0.01)
+    return config
+
+
+def _session() -> Session:
+    session = Session(session_id="rt-test", grade="Grade 5", name="Asha", email="a@example.com",
+                      mobile="9999999999", intent="Fees")
+    session.conversation = [
+        ConversationTurn(role="user", text="What are the fees?"),
+        ConversationTurn(role="assistant", text="The Grade 5 fee plan is on our website."),
+    ]
+    return session
+
+
+def _handler(config) -> RealtimeHandler:
+    handler = RealtimeHandler(_session())
+    handler.config = config
+    return handler
+
+
+def _instructions(events) -> list:
+    return [e for e in events if e["type"] == "session.update" and "instructions" in e["session"]]
+
+
+def test_pool_checkout_uses_prewarmed_socket(config, monkeypatch):
+    async def run():
+        async with FakeRealtimeServer() as server:
+            monkeypatch.setattr(realtime_handler, "OPENAI_REALTIME_WS", server.url)
+            pool = RealtimePool(open_realtime_socket, size=1, max_idle=60, health_interval=60)
+            await pool.start()
+            try:
+                # Prewarmed socket already carries the session defaults
+                await server.wait_for(lambda: server.events and server.events[0])
+                assert server.events[0][0]["session"]["voice"] == config.realtime_voice
+
+                handler = _handler(config)
+                assert await handler.connect(pool)
+                await server.wait_for(lambda: _instructions(server.events[0]))
+                assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 0
+                assert "Grade 5" in _instructions(server.events[0])[0]["session"]["instructions"]
+
+                # The checkout triggers a refill in the background
+                await server.wait_for(lambda: len(server.sockets) == 2)
+                await handler.disconnect()
+            finally:
+                await pool.stop()
+
+    asyncio.run(run())
+
+
+def test_reconnect_resumes_conversation(config, monkeypatch):
+    async def run():
+        async with FakeRealtimeServer() as server:
+            monkeypatch.setattr(realtime_handler, "OPENAI_REALTIME_WS", server.url)
+            handler = _handler(config)
+            statuses = []
+
+            async def on_status(status, info):
+                statuses.append(status)
+
+            handler.on_status(on_status)
+            assert await handler.connect()
+            runner = asyncio.create_task(handler.run())
+            await server.wait_for(lambda: server.events and _instructions(server.events[0]))
+
+            # Upstream drops the socket: the handler reconnects and replays history
+            await server.sockets[0].close()
+            await server.wait_for(lambda: len(server.events) == 2 and len(server.events[1]) >= 3)
+            resumed = server.events[1]
+            assert _instructions(resumed)
+            items = [e["item"] for e in resumed if e["type"] == "conversation.item.create"]
+            assert [(i["role"], i["content"][0]["text"]) for i in items] == [
+                ("user", "What are the fees?"),
+                ("assistant", "The Grade 5 fee plan is on our website."),
+            ]
+
+            # Sends after the reconnect go to the new socket
+            await handler.send_text("Is there a sibling discount?")
+            await server.wait_for(lambda: any(e["type"] == "response.create" for e in server.events[1]))
+            assert statuses[:1] == ["reconnecting"] and "reconnected" in statuses
+            assert handler.reconnects == 1
+
+            await handler.disconnect()
+            await asyncio.wait_for(runner, 3)
+
+    asyncio.run(run())
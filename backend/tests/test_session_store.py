@@ -0,0 +1,77 @@
+"""RedisSessionStore against an in-process Redis stand-in (fakeredis)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from backend.app.session_store import MemorySessionStore, RedisSessionStore
+
+
+def _iso(days_ago: float = 0) -> str:
+    return (datetime.utcnow() - timedelta(days=days_ago)).isoformat() + "Z"
+
+
+# Redis keys expire expiry_days after created_at, so timestamps are relative to now
+CREATED = _iso()
+LATER = _iso(-1 / 86400)
+
+
+def _session(session_id: str = "s1") -> dict:
+    return {
+        "session_id": session_id,
+        "grade": "Grade 5",
+        "name": "Asha",
+        "email": "asha@example.com",
+        "mobile": "9999999999",
+        "intent": "Fees",
+        "created_at": CREATED,
+        "updated_at": CREATED,
+    }
+
+
+def _turn(text: str) -> dict:
+    return {"role": "user", "text": text, "audio_file": None, "timestamp": CREATED, "language": None, "heard_ms": None}
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return MemorySessionStore()
+    return RedisSessionStore(fakeredis.FakeRedis())
+
+
+def test_round_trip(store):
+    store.apply([
+        ("session", _session()),
+        ("turn", "s1", _turn("What are the fees?"), LATER, "en"),
+        ("update", "s1", {"summary": "Asked about fees", "summary_upto": 1}),
+    ])
+    loaded = store.load("s1", _iso(7))
+    assert loaded["grade"] == "Grade 5"
+    assert loaded["updated_at"] == LATER
+    assert loaded["detected_language"] == "en"
+    assert loaded["summary"] == "Asked about fees"
+    assert [t["text"] for t in loaded["conversation"]] == ["What are the fees?"]
+    assert store.revision("s1") == LATER
+    assert store.count() == 1
+
+
+def test_writes_after_delete_do_not_recreate(store):
+    store.apply([("session", _session()), ("delete", "s1")])
+    store.apply([
+        ("turn", "s1", _turn("late turn"), LATER, None),
+        ("update", "s1", {"summary": "late"}),
+    ])
+    assert store.load("s1", _iso(7)) is None
+    assert store.revision("s1") is None
+    if isinstance(store, RedisSessionStore):
+        assert store._redis.keys() == []
+
+
+def test_compact_and_expiry_window(store):
+    store.apply([("session", {**_session("old"), "created_at": _iso(3)}), ("session", _session("new"))])
+    assert store.load("old", _iso(1)) is None
+    assert [s["session_id"] for s in store.load_all(_iso(1))] == ["new"]
+    store.compact(_iso(1))
+    assert store.count() == 1